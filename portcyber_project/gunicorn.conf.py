@@ -0,0 +1,135 @@
+"""gunicorn settings, read from the working directory (the Dockerfile's /app).
+
+Workers are sized from the CPUs this process may use: the container's cgroup
+CPU quota and its CPU affinity, not the host's core count. The worker class
+comes from GUNICORN_WORKER_CLASS:
+
+- sync (the default; serves wsgi.py): 2 x CPUs + 1 workers, one request at a
+  time each;
+- gthread (wsgi.py): CPUs + 1 workers of GUNICORN_THREADS threads (4);
+- uvicorn (serves asgi.py: the async read views and the live stats stream):
+  one event loop per CPU.
+
+The live stats stream (/api/site-stats/stream/, server-sent events) needs
+uvicorn: a sync or gthread worker can't hold the connection open, so it
+answers 204 and the quest panel polls /api/site-stats/ instead. LIVE_STATS=True
+makes uvicorn the default class (set STATS_BROKER_URL to Redis as well, so
+a claim reaches clients connected to the other workers).
+
+WEB_CONCURRENCY sets the number of workers outright. Every worker holds its
+own database connection (or DATABASE_POOL_SIZE of them), its own write-behind
+buffers and its own local caches, so more isn't free.
+
+The app is imported once in the master (preload_app) and warmed up there
+(portfolio/warmup.py: templates, static fragments, URL patterns, lookups), so a
+worker forks ready to serve and shares those pages with the others (the
+master freezes them out of garbage collection, see gc.freeze()). Each
+worker then opens its database connection before taking requests. Preloaded
+code is not reloaded on SIGHUP: restart the server to deploy. Set
+GUNICORN_PRELOAD=False to import the app in each worker instead.
+
+Workers are recycled after GUNICORN_MAX_REQUESTS requests, plus a random
+share of up to a fifth more per worker so they don't all restart together.
+Recycling forks from the warm master, so it costs a few milliseconds.
+
+The master logs how it was sized and how long it took to be ready, and each
+worker how long it took from fork to its first request; manage.py
+bench_startup compares startup and first-request latency with gunicorn's
+defaults.
+"""
+import gc
+import math
+import os
+import time
+from pathlib import Path
+
+STARTED = time.monotonic()
+
+# GUNICORN_WORKER_CLASS -> (worker class, app, workers for a number of CPUs, threads)
+WORKER_CLASSES = {
+    'sync': ('sync', 'portcyber_project.wsgi:application', lambda cpus: 2 * cpus + 1, 1),
+    'gthread': ('gthread', 'portcyber_project.wsgi:application', lambda cpus: cpus + 1, 4),
+    'uvicorn': ('uvicorn.workers.UvicornWorker', 'portcyber_project.asgi:application', lambda cpus: cpus, 1),
+}
+
+
+def env(name, default, cast=str):
+    value = os.environ.get(name, '')
+    return cast(value) if value else default
+
+
+def flag(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def cpu_limit():
+    """CPUs available to this process, counting a cgroup (v2 or v1) CPU quota"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+    for quota_file, period_file in [
+        ('/sys/fs/cgroup/cpu.max', None),
+        ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us', '/sys/fs/cgroup/cpu/cpu.cfs_period_us'),
+    ]:
+        try:
+            if period_file is None:
+                quota, period = Path(quota_file).read_text().split()
+            else:
+                quota, period = Path(quota_file).read_text().strip(), Path(period_file).read_text().strip()
+            if quota not in ('max', '-1'):
+                return max(1, min(cpus, math.ceil(int(quota) / int(period))))
+        except (OSError, ValueError):
+            continue
+    return max(1, cpus)
+
+
+kind = env('GUNICORN_WORKER_CLASS', 'uvicorn' if env('LIVE_STATS', False, flag) else 'sync')
+if kind not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {kind!r}")
+worker_class, wsgi_app, workers_for, default_threads = WORKER_CLASSES[kind]
+cpus = cpu_limit()
+
+bind = [f"0.0.0.0:{env('PORT', 8000, int)}"]
+workers = env('WEB_CONCURRENCY', workers_for(cpus), int)
+threads = env('GUNICORN_THREADS', default_threads, int)
+preload_app = env('GUNICORN_PRELOAD', True, flag)
+max_requests = env('GUNICORN_MAX_REQUESTS', 1000, int)
+max_requests_jitter = max_requests // 5
+timeout = env('GUNICORN_TIMEOUT', 30, int)
+graceful_timeout = 30  # Time for the write-behind buffers (portfolio/ingest.py) to flush on exit
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'  # Heartbeat files off the container's overlay filesystem
+
+
+def when_ready(server):
+    """In the master, before the first fork"""
+    if server.cfg.preload_app:
+        from portfolio import warmup
+        server.log.info("Warmed up the app: %s", warmup.summary(warmup.run(databases=False)))
+        # Keep the workers' garbage collector off the objects they inherit: it
+        # would copy their pages, and go through all of them when a worker exits
+        gc.freeze()
+    cfg = server.cfg
+    server.log.info(
+        "Ready in %.0f ms: %d %s workers of %d threads for %d CPUs, %s, recycled after %d-%d requests",
+        (time.monotonic() - STARTED) * 1000, cfg.workers, cfg.worker_class_str, cfg.threads, cpus,
+        'app preloaded' if cfg.preload_app else 'app loaded per worker',
+        cfg.max_requests, cfg.max_requests + cfg.max_requests_jitter,
+    )
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    """In each worker, once the app is loaded and before its first request"""
+    from django.conf import settings
+    from portfolio import warmup
+
+    # Other worker classes serve requests from threads with their own
+    # connections; only a pool is shared by all of them
+    databases = worker.cfg.worker_class_str == 'sync' or bool(settings.DATABASE_POOL_SIZE)
+    report = warmup.run(databases=databases)
+    worker.log.info(
+        "Worker %s ready %.0f ms after fork: %s",
+        worker.pid, (time.monotonic() - worker.forked_at) * 1000, warmup.summary(report),
+    )
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,7 +45,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'portfolio.middleware.StaticFilesMiddleware',  # WhiteNoise, async-capable
+    'portfolio.middleware.InstrumentationMiddleware',
+    'portfolio.middleware.DatabaseRoutingMiddleware',  # Only with read replicas
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,7 +60,7 @@ ROOT_URLCONF = 'portcyber_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'portfolio.instrumentation.DjangoTemplates',  # Times rendering per request
         'DIRS': [BASE_DIR / 'portfolio' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,15 +76,138 @@ TEMPLATES = [
 WSGI_APPLICATION = 'portcyber_project.wsgi.application'
 
 
+# Route the read views to their async versions (portfolio/views.py). asgi.py
+# turns this on; leave it off for WSGI, where async views only add overhead.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# With DATABASE_POOL_SIZE set, each worker keeps a psycopg 3 connection pool
+# (PostgreSQL only) that checks a connection before handing it out. Otherwise
+# connections are persistent and checked before they are reused.
+DATABASE_POOL_SIZE = config('DATABASE_POOL_SIZE', default=0, cast=int)
+
+def database(settings_dict):
+    settings_dict['CONN_HEALTH_CHECKS'] = True
+    if DATABASE_POOL_SIZE and settings_dict['ENGINE'] == 'django.db.backends.postgresql':
+        from psycopg_pool import ConnectionPool
+        settings_dict['CONN_MAX_AGE'] = 0  # Connections go back to the pool instead
+        settings_dict.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': 1,
+            'max_size': DATABASE_POOL_SIZE,
+            'timeout': 10,
+            'check': ConnectionPool.check_connection,
+        }
+    return settings_dict
+
 DATABASES = {
-    'default': dj_database_url.config(
+    'default': database(dj_database_url.config(
         default=f"sqlite:///{os.path.join(BASE_DIR, 'db.sqlite3')}",
-        conn_max_age=600
-    )
+        # Persistent connections leak under ASGI, where each request's queries
+        # run in a thread of their own
+        conn_max_age=0 if ASYNC_VIEWS else 600
+    ))
+}
+
+# Read replicas, as comma-separated database URLs. The read-only views read from
+# them and everything else uses the primary (portfolio/routers.py); a client
+# that has just written reads from the primary for REPLICA_STICKY_SECONDS.
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{index}'] = database(dj_database_url.parse(url, conn_max_age=0 if ASYNC_VIEWS else 600))
+    DATABASES[f'replica{index}']['TEST'] = {'MIRROR': 'default'}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['portfolio.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# The cache behind the fragment cache, throttles, metrics and the shared tier of
+# portfolio/tiered.py. CACHE_URL redis://host:6379/0 shares it between workers;
+# file:///path (on one host) and locmem:// (each worker its own, the default)
+# stand in for it.
+def cache_backend(url):
+    scheme, _, location = url.partition('://')
+    if scheme in ('redis', 'rediss', 'unix'):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if scheme == 'file':
+        return {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+    return {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location}
+
+CACHES = {'default': cache_backend(config('CACHE_URL', default='locmem://'))}
+
+# Whether every worker sees the same CACHES. When they don't (locmem://), an
+# invalidation reaches one worker only, so the log fragment cache also keys on
+# the logs' watermark and the stats cache keeps values for the local TTL only.
+SHARED_CACHE = CACHES['default']['BACKEND'] != 'django.core.cache.backends.locmem.LocMemCache'
+
+# Reward claims are spread across this many counter rows (portfolio/counters.py)
+# so concurrent claims don't queue on a single row lock. Use 1 to disable sharding.
+REWARD_COUNTER_SHARDS = config('REWARD_COUNTER_SHARDS', default=8, cast=int)
+
+# The current stats are cached for STATS_CACHE_TIMEOUT seconds in CACHES and
+# for STATS_CACHE_LOCAL_TTL in each worker's memory (portfolio/tiered.py). A
+# claim updates both in its own worker. With a shared CACHE_URL the others
+# catch up within the local TTL; without one (SHARED_CACHE off) each worker's
+# CACHES is its own, so the stats are kept there for the local TTL only too.
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=300, cast=float)
+STATS_CACHE_LOCAL_TTL = config('STATS_CACHE_LOCAL_TTL', default=1.0, cast=float)
+
+# Pub/sub behind /api/site-stats/stream/ (portfolio/events.py). memory:// only
+# reaches clients on the same worker; use redis://host:6379/0 with several workers.
+# The stream needs ASGI (uvicorn workers: LIVE_STATS=True or
+# GUNICORN_WORKER_CLASS=uvicorn, see gunicorn.conf.py). Under WSGI, the
+# shipped default, it answers 204 and the quest panel polls instead.
+STATS_BROKER_URL = config('STATS_BROKER_URL', default='memory://')
+
+# ETag for the static content fragments (portfolio/conditional.py). Set it to the
+# release's git commit; left empty, the module templates are hashed at startup.
+DEPLOY_HASH = config('DEPLOY_HASH', default='')
+
+# Render the static module fragments once per process and keep them gzip/brotli
+# compressed in memory (portfolio/fragments.py), and keep the rendered logs home
+# and log detail fragments in the cache (portfolio/logcache.py). Off by default
+# while developing so template edits show up without a restart.
+FRAGMENT_CACHE = config('FRAGMENT_CACHE', default=not DEBUG, cast=bool)
+
+# Contact submissions are queued and written in batches (portfolio/ingest.py):
+# once CONTACT_BATCH_SIZE are waiting, and at least every CONTACT_FLUSH_INTERVAL
+# seconds. Past CONTACT_QUEUE_SIZE waiting, new ones get a 503.
+CONTACT_BATCH_SIZE = config('CONTACT_BATCH_SIZE', default=50, cast=int)
+CONTACT_FLUSH_INTERVAL = config('CONTACT_FLUSH_INTERVAL', default=1.0, cast=float)
+CONTACT_QUEUE_SIZE = config('CONTACT_QUEUE_SIZE', default=1000, cast=int)
+
+# Module views (portfolio/analytics.py) are counted in each worker's memory and
+# added to hourly rollups every ANALYTICS_FLUSH_INTERVAL seconds, or once
+# ANALYTICS_BATCH_SIZE (hour, module, id) counters are waiting. Past
+# ANALYTICS_QUEUE_SIZE counters waiting, further views are dropped.
+ANALYTICS_BATCH_SIZE = config('ANALYTICS_BATCH_SIZE', default=500, cast=int)
+ANALYTICS_FLUSH_INTERVAL = config('ANALYTICS_FLUSH_INTERVAL', default=60.0, cast=float)
+ANALYTICS_QUEUE_SIZE = config('ANALYTICS_QUEUE_SIZE', default=5000, cast=int)
+
+# Token buckets per client IP (portfolio/throttle.py): 'burst' requests at once,
+# refilled at 'per_minute'. A burst of 0 turns a scope off. The client IP comes
+# from CF-Connecting-IP / X-Forwarded-For only when the request arrives from one
+# of TRUSTED_PROXIES (addresses or networks), like the Cloudflare tunnel.
+THROTTLES = {
+    'contact': {
+        'burst': config('CONTACT_THROTTLE_BURST', default=5, cast=int),
+        'per_minute': config('CONTACT_THROTTLE_PER_MINUTE', default=6, cast=float),
+    },
 }
+TRUSTED_PROXIES = config('TRUSTED_PROXIES', default='127.0.0.1,::1', cast=Csv())
+
+# Prerendered /api/content/ fragments (portfolio/export.py): export_fragments
+# writes them here and WhiteNoise serves them at FRAGMENT_EXPORT_URL, cached
+# for good. Run it after deploying and after editing logs.
+FRAGMENT_EXPORT_ROOT = config('FRAGMENT_EXPORT_ROOT', default=str(BASE_DIR / 'fragments'))
+FRAGMENT_EXPORT_URL = '/fragments/'
+
+# Per-request SQL/template timings, Server-Timing headers and the Prometheus
+# histograms at /api/metrics/ (portfolio/instrumentation.py). Requests slower
+# than SLOW_REQUEST_MS are logged with their queries. /api/metrics/ is open to
+# staff and to "Authorization: Bearer <METRICS_TOKEN>" when a token is set.
+INSTRUMENTATION = config('INSTRUMENTATION', default=True, cast=bool)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=500, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -128,9 +253,12 @@ STATICFILES_DIRS = [
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Replace your current STATICFILES_STORAGE line with this:
+# (WhiteNoise's CompressedManifestStaticFilesStorage, plus the responsive image
+# variants from portfolio/images.py and the shell bundle / critical CSS from
+# portfolio/assets.py)
 STORAGES = {
     "staticfiles": {
-        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        "BACKEND": "portfolio.storage.PortfolioStaticStorage",
     },
 }
 
@@ -1,18 +1,100 @@
-from django.contrib import admin
-from .models import SiteStats, ContactSubmission, LogEntry, LogSection
+import codecs
+import time
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .models import SiteStats, ContactSubmission, LogEntry, LogSection, ModuleViewRollup
+from . import analytics, counters, logcache, transfer
 
 class SiteStatsAdmin(admin.ModelAdmin):
     list_display = ('level', 'trophies', 'coins', 'last_daily_reduction_check')
+    actions = ['rollup_reward_counters', 'show_stats_cache_stats']
+
+    @admin.action(description="Roll up pending reward counters")
+    def rollup_reward_counters(self, request, queryset):
+        site_stats = counters.rollup()
+        self.message_user(request, f"Rolled up: level {site_stats.level}, {site_stats.trophies} trophies, {site_stats.coins} coins")
+
+    @admin.action(description="Show stats cache hit/miss counts per tier")
+    def show_stats_cache_stats(self, request, queryset):
+        tiers = counters.stats_cache.stats()
+        self.message_user(request, "Stats cache: " + "; ".join(
+            f"{tier} {stats['hits']} hits, {stats['misses']} misses ({stats['hit_ratio']:.1%} hit ratio)"
+            for tier, stats in tiers.items()
+        ))
 
     def has_add_permission(self, request):
         # Prevent adding new instances of SiteStats
         return not SiteStats.objects.exists()
 
-class ContactSubmissionAdmin(admin.ModelAdmin):
+class TransferAdmin(admin.ModelAdmin):
+    """Streaming JSON Lines/CSV export actions and an import page (portfolio/transfer.py)"""
+    transfer_kind = None  # A key of transfer.KINDS
+    transfer_actions = ['export_jsonl', 'export_csv']
+    change_list_template = 'admin/portfolio/transfer_change_list.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('import/', self.admin_site.admin_view(self.import_view), name=f'{opts.app_label}_{opts.model_name}_import'),
+            *super().get_urls(),
+        ]
+
+    @admin.action(description="Export selected as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return self.export(request, queryset, 'jsonl')
+
+    @admin.action(description="Export selected as CSV")
+    def export_csv(self, request, queryset):
+        return self.export(request, queryset, 'csv')
+
+    def export(self, request, queryset, format):
+        _, export, _ = transfer.KINDS[self.transfer_kind]
+        content = export(queryset, format)
+        if isinstance(request, ASGIRequest):
+            content = transfer.aiterate(content)  # Django would read a sync iterator into memory first
+        response = StreamingHttpResponse(content, content_type=transfer.FORMATS[format])
+        response['Content-Disposition'] = f'attachment; filename="{self.transfer_kind}.{format}"'
+        return response
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        upload = request.FILES.get('file')
+        if request.method == 'POST' and upload:
+            _, _, load = transfer.KINDS[self.transfer_kind]
+            started = time.perf_counter()
+            try:
+                lines = codecs.iterdecode(upload, 'utf-8')  # A chunk at a time, however large the upload
+                count = load(transfer.read(lines, transfer.format_for(upload.name)))
+            except (transfer.InvalidRecord, UnicodeDecodeError) as error:
+                imported = getattr(error, 'imported', 0)
+                self.message_user(request, f"Import stopped after {imported} {self.transfer_kind}: {error}", messages.ERROR)
+            else:
+                elapsed = time.perf_counter() - started
+                self.message_user(request, f"Imported {count} {self.transfer_kind} in {elapsed:.1f}s ({count / elapsed:.0f}/s)")
+            return redirect(f'admin:{self.model._meta.app_label}_{self.model._meta.model_name}_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.model._meta.verbose_name_plural}",
+        }
+        return TemplateResponse(request, 'admin/portfolio/import.html', context)
+
+class ContactSubmissionAdmin(TransferAdmin):
     list_display = ('name', 'email', 'submitted_at')
     search_fields = ('name', 'email')
     list_filter = ('submitted_at',)
     readonly_fields = ('name', 'email', 'message', 'submitted_at')
+    transfer_kind = 'contacts'
+    actions = TransferAdmin.transfer_actions
 
     # Make the message field more readable
     fieldsets = (
@@ -28,8 +110,8 @@ class LogSectionInline(admin.TabularInline):
     model = LogSection
     extra = 1  # Number of extra forms to display
 
-class LogEntryAdmin(admin.ModelAdmin):
-    list_display = ('title', 'log_date', 'status', 'entry_type', 'is_pinned', 'created_at')
+class LogEntryAdmin(TransferAdmin):
+    list_display = ('title', 'log_date', 'status', 'entry_type', 'is_pinned', 'section_count', 'created_at')
     search_fields = ('title', 'status', 'entry_type')
     list_filter = ('is_pinned', 'status', 'entry_type', 'created_at')
     inlines = [LogSectionInline]
@@ -39,7 +121,57 @@ class LogEntryAdmin(admin.ModelAdmin):
             'fields': ('title', 'log_date', 'status', 'entry_type', 'is_pinned')
         }),
     )
+    transfer_kind = 'logs'
+    actions = ['show_fragment_cache_stats', *TransferAdmin.transfer_actions]
+
+    @admin.action(description="Show rendered-fragment cache hit/miss counts")
+    def show_fragment_cache_stats(self, request, queryset):
+        stats = logcache.stats()
+        self.message_user(request, f"Fragment cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_ratio']:.1%} hit ratio)")
+
+class ModuleViewRollupAdmin(admin.ModelAdmin):
+    """Hourly module view rollups (portfolio/analytics.py), read-only, with a report page"""
+    list_display = ('hour', 'module', 'object_id', 'views', 'unique_visitors')
+    list_filter = ('module',)
+    date_hierarchy = 'hour'
+    exclude = ('visitors',)
+    change_list_template = 'admin/portfolio/moduleviewrollup_change_list.html'
+    report_periods = {'1': "Last 24 hours", '7': "Last 7 days", '30': "Last 30 days"}
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('report/', self.admin_site.admin_view(self.report_view), name=f'{opts.app_label}_{opts.model_name}_report'),
+            *super().get_urls(),
+        ]
+
+    @admin.display(description="Unique visitors (est.)")
+    def unique_visitors(self, obj):
+        return analytics.HyperLogLog(obj.visitors).count()
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def report_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        days = request.GET.get('days', '7')
+        if days not in self.report_periods:
+            days = '7'
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Module views",
+            'periods': self.report_periods,
+            'days': days,
+            'report': analytics.report(timezone.now() - timedelta(days=int(days))),
+        }
+        return TemplateResponse(request, 'admin/portfolio/module_view_report.html', context)
 
 admin.site.register(SiteStats, SiteStatsAdmin)
 admin.site.register(ContactSubmission, ContactSubmissionAdmin)
 admin.site.register(LogEntry, LogEntryAdmin)
+admin.site.register(ModuleViewRollup, ModuleViewRollupAdmin)
@@ -0,0 +1,263 @@
+"""Which modules get viewed, counted without a database write per view.
+
+navigation.js reports each module it shows, and each log it opens, with a
+beacon to record_view (views.py), naming the /api/content/ fragment. That
+includes fragments it had cached or exported and so never asked Django for,
+and leaves out its prefetches. The view resolves the fragment to a module
+("dashboard", "log-detail", ...) and an object id (the log's pk, the
+service's id, or '') and counts it here, in this worker's memory:
+
+- views, per hour, module and id;
+- unique visitors, as a HyperLogLog sketch of (client IP, user agent).
+  Neither is stored: the sketch only keeps, per register, the longest run
+  of zero bits seen in the hashes.
+
+ViewBuffer flushes the counts with the write-behind machinery contacts use
+(portfolio/ingest.py): every ANALYTICS_FLUSH_INTERVAL seconds, when
+ANALYTICS_BATCH_SIZE counters are waiting, and at exit. A flush adds the
+views to the ModuleViewRollup rows for those hours and merges the sketches
+into theirs, so every worker's visitors end up in one sketch. Past
+ANALYTICS_QUEUE_SIZE counters waiting, views are dropped rather than queued.
+
+The admin report (report()) reads only the rollups. A sketch of 2**PRECISION
+registers estimates uniques to within about 1.6%, and merging the sketches
+of several hours or modules counts a visitor seen in more than one once.
+"""
+import hashlib
+import logging
+import math
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .ingest import WriteBehind
+from .models import LogEntry, ModuleViewRollup
+from .throttle import client_ip
+
+logger = logging.getLogger(__name__)
+
+PRECISION = 12
+REGISTERS = 2 ** PRECISION
+# A register holds a run length of at most 64 - PRECISION + 1, so one byte
+# each with the top bit always clear, which merge() relies on
+LANE_HIGH_BITS = int.from_bytes(b'\x80' * REGISTERS, 'big')
+
+
+def merge(a, b):
+    """The register-wise maximum of two sketches' registers (b'' is an empty sketch).
+
+    Done on the registers as two big integers, a byte per lane, rather than
+    one register at a time: the report merges thousands of sketches.
+    """
+    if not a or not b:
+        return bytes(a or b)
+    x, y = int.from_bytes(a, 'big'), int.from_bytes(b, 'big')
+    # No lane borrows from its neighbour: each is (x | 0x80) - y with y < 0x80
+    x_larger = ((x | LANE_HIGH_BITS) - y) & LANE_HIGH_BITS
+    mask = (x_larger >> 7) * 0xFF
+    return ((x & mask) | (y & ~mask)).to_bytes(REGISTERS, 'big')
+
+
+class HyperLogLog:
+    """A HyperLogLog sketch (Flajolet et al.) of 2**PRECISION one-byte registers"""
+
+    def __init__(self, registers=b''):
+        self.registers = bytearray(registers or REGISTERS)
+
+    @staticmethod
+    def position(value):
+        """(register, run length) for a value; worth working out before taking a lock"""
+        digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+        rest = digest & ((1 << (64 - PRECISION)) - 1)
+        return digest >> (64 - PRECISION), 64 - PRECISION - rest.bit_length() + 1
+
+    def add(self, position):
+        register, run = position
+        if run > self.registers[register]:
+            self.registers[register] = run
+
+    def update(self, other):
+        self.registers[:] = merge(self.registers, bytes(other))
+
+    def count(self):
+        zeros = self.registers.count(0)
+        total = sum(self.registers.count(run) * 2.0 ** -run for run in range(0, 66 - PRECISION))
+        estimate = 0.7213 / (1 + 1.079 / REGISTERS) * REGISTERS ** 2 / total
+        if estimate <= 2.5 * REGISTERS and zeros:
+            estimate = REGISTERS * math.log(REGISTERS / zeros)  # Linear counting, for small counts
+        return round(estimate)
+
+    def __bytes__(self):
+        return bytes(self.registers)
+
+
+class Tally:
+    """Views and visitors of one (hour, module, object id) since the last flush"""
+
+    def __init__(self):
+        self.views = 0
+        self.visitors = HyperLogLog()
+
+    def merge(self, other):
+        self.views += other.views
+        self.visitors.update(other.visitors)
+
+
+class ViewBuffer(WriteBehind):
+    """A WriteBehind whose pending items are Tallies by key rather than a list"""
+
+    def __init__(self, write, batch_size, flush_interval, max_pending):
+        super().__init__(write, batch_size, flush_interval, max_pending)
+        self.pending = {}
+
+    def put(self, key, visitor):
+        """Count a view; False if it was dropped because the buffer is full"""
+        position = HyperLogLog.position(visitor)
+        with self.lock:
+            tally = self.pending.get(key)
+            if tally is None:
+                if len(self.pending) >= self.max_pending:
+                    return False
+                tally = self.pending[key] = Tally()
+            tally.views += 1
+            tally.visitors.add(position)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+        else:
+            self.start()
+        return True
+
+    def take(self):
+        batch, self.pending = self.pending, {}
+        return batch
+
+    def put_back(self, batch):
+        for key, tally in self.pending.items():
+            if key in batch:
+                batch[key].merge(tally)
+            else:
+                batch[key] = tally
+        self.pending = batch
+
+    def lost(self, batch):
+        logger.error(
+            "Exiting with %d unwritten view counters (%d views)", len(batch), sum(tally.views for tally in batch.values()),
+        )
+
+
+def write_rollups(tallies):
+    """Add flushed Tallies to their hourly rollup rows, creating the missing ones"""
+    with transaction.atomic():
+        ModuleViewRollup.objects.bulk_create(
+            [ModuleViewRollup(hour=hour, module=module, object_id=object_id) for hour, module, object_id in tallies],
+            ignore_conflicts=True,
+        )
+        rows = ModuleViewRollup.objects.select_for_update().filter(
+            hour__in={hour for hour, _, _ in tallies},
+            module__in={module for _, module, _ in tallies},
+            object_id__in={object_id for _, _, object_id in tallies},
+        )
+        changed = []
+        for row in rows:
+            tally = tallies.get((row.hour, row.module, row.object_id))
+            if tally is not None:
+                row.views += tally.views
+                row.visitors = merge(row.visitors, bytes(tally.visitors))
+                changed.append(row)
+        ModuleViewRollup.objects.bulk_update(changed, ['views', 'visitors'])
+
+
+views = ViewBuffer(
+    write_rollups,
+    batch_size=settings.ANALYTICS_BATCH_SIZE,
+    flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+    max_pending=settings.ANALYTICS_QUEUE_SIZE,
+)
+
+
+known_logs = set()  # Ids of logs seen to exist; a missing one may be created later, so it's looked up again
+
+
+def module_for(path):
+    """(module, object id) of an /api/content/ fragment path, or None for anything else"""
+    key = fragment_for(path)
+    if key is None:
+        return None
+    module, object_id = key
+    # Only real logs and services, so made-up ids can't fill the table with rows
+    if module == 'log-detail' and object_id not in known_logs:
+        if not LogEntry.objects.filter(pk=object_id).exists():
+            return None
+        known_logs.add(object_id)
+    return key
+
+
+@lru_cache(maxsize=4096)
+def fragment_for(path):
+    """module_for() before the log lookup, cached per path: resolving it needs no database"""
+    if not path.startswith('/api/content/'):
+        return None
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if not match.url_name or match.url_name == 'api-content-batch':
+        return None
+    module, object_id = match.url_name.removeprefix('api-'), str(next(iter(match.kwargs.values()), ''))
+    if module == 'service-detail':
+        from .views import SERVICE_DETAILS  # views imports this module
+        if object_id not in SERVICE_DETAILS:
+            return None
+    return module, object_id
+
+
+def visitor(request):
+    return f"{client_ip(request)}|{request.META.get('HTTP_USER_AGENT', '')}"
+
+
+def record(path, request):
+    """Count a view of the fragment at path by request's visitor; False if path isn't a fragment"""
+    key = module_for(path.partition('?')[0])
+    if key is None:
+        return False
+    hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    views.put((hour, *key), visitor(request))
+    return True
+
+
+def report(since):
+    """Views and estimated unique visitors since a time, per module and object and per day.
+
+    Reads the rollups only, so views still in the workers' buffers aren't in it.
+    """
+    modules, days, everyone, total = {}, {}, HyperLogLog(), 0
+    rows = ModuleViewRollup.objects.filter(hour__gte=since).values_list('hour', 'module', 'object_id', 'views', 'visitors')
+    for hour, module, object_id, count, visitors in rows.iterator():
+        visitors = bytes(visitors)
+        for tally in (
+            modules.setdefault((module, object_id), Tally()),
+            days.setdefault(timezone.localdate(hour), Tally()),
+        ):
+            tally.views += count
+            tally.visitors.update(visitors)
+        everyone.update(visitors)
+        total += count
+    return {
+        'modules': sorted(
+            (
+                {'module': module, 'object_id': object_id, 'views': tally.views, 'visitors': tally.visitors.count()}
+                for (module, object_id), tally in modules.items()
+            ),
+            key=lambda row: (-row['views'], row['module'], row['object_id']),
+        ),
+        'days': [
+            {'day': day, 'views': tally.views, 'visitors': tally.visitors.count()}
+            for day, tally in sorted(days.items(), reverse=True)
+        ],
+        'views': total,
+        'visitors': everyone.count(),
+    }
@@ -0,0 +1,387 @@
+"""Shell asset pipeline, run by collectstatic (see portfolio/storage.py).
+
+The shell's scripts are concatenated in SHELL_SCRIPTS order and minified into
+js/shell.bundle.js, which the manifest then content-hashes like any other file.
+For index.html and each modules/_*_fragment.html, the theme.css rules that can
+match its markup are written to css/critical/<name>.css, so the shell inlines
+them and loads the full stylesheet without blocking first paint. assets.json
+records the bundle order, the critical files and a size report for the
+{% shell_styles %} / {% shell_scripts %} tags.
+"""
+import gzip
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+MANIFEST_NAME = 'assets.json'
+BUNDLE_NAME = 'js/shell.bundle.js'
+STYLESHEET = 'css/theme.css'
+CRITICAL_DIR = 'css/critical/'
+
+# Dependency order: each script may use globals defined by the ones before it.
+# three-background.js stays a separate <script>: it needs the three.js CDN
+# global, and a failed CDN load must not stop the rest of the shell.
+SHELL_SCRIPTS = [
+    'js/system-state.js',
+    'js/boot.js',
+    'js/navigation.js',
+    'js/settings.js',
+    'js/system-feedback.js',
+    'js/interactions.js',
+    'js/quest.js',
+    'js/sound.js',
+    'js/log-detail.js',
+]
+STANDALONE_SCRIPTS = ['js/three-background.js']
+
+# Markup produced by template tags, which a plain scan of the template can't see
+TAG_MARKUP = {
+    'responsive_image': {'classes': {'responsive-image'}, 'tags': {'picture', 'source', 'img'}},
+}
+
+
+# JavaScript ------------------------------------------------------------------
+
+IDENTIFIER = re.compile(r'[\w$\u0080-\uffff]+')
+# After these a "/" starts a regex literal rather than a division
+REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+
+
+def _is_word(ch):
+    return ch.isalnum() or ch in '_$' or ord(ch) > 127
+
+
+def minify_js(source):
+    """Drop comments and collapse whitespace, keeping line breaks that ASI may need.
+
+    A conservative tokenizer rather than a compressor: strings, template
+    literals and regex literals are copied verbatim and no code is rewritten.
+    """
+    out = []
+    i, n = 0, len(source)
+    space = ''  # Pending whitespace: '', ' ' or '\n'
+    last = ''  # Last significant token, to tell regex literals from division
+    templates = []  # Open "${" depth per enclosing template literal
+
+    def emit(token):
+        nonlocal space
+        prev = out[-1][-1] if out else ''
+        if space == '\n' and prev and prev not in '{;,\n' and token[0] not in '})':
+            out.append('\n')
+        elif space and prev and (
+            (_is_word(prev) and _is_word(token[0]))
+            or (prev in '+-' and token[0] in '+-')
+            or (prev.isdigit() and token[0] == '.')
+        ):
+            out.append(' ')
+        space = ''
+        out.append(token)
+
+    def copy_template(start):
+        """Copy template literal text from start to its closing ` or next ${"""
+        j = start
+        while j < n:
+            if source[j] == '\\':
+                j += 2
+            elif source[j] == '`':
+                return j + 1, False
+            elif source.startswith('${', j):
+                return j + 2, True
+            else:
+                j += 1
+        return n, False
+
+    while i < n:
+        ch = source[i]
+        if ch.isspace():
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            space = '\n' if '\n' in source[i:j] or space == '\n' else ' '
+            i = j
+        elif source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j == -1 else j
+        elif source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            j = n if j == -1 else j + 2
+            if not space or '\n' in source[i:j]:
+                space = '\n' if '\n' in source[i:j] else ' '
+            i = j
+        elif ch in '\'"':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            last, i = 'str', j + 1
+        elif ch == '`' or (ch == '}' and templates and templates[-1] == 0):
+            if ch == '}':
+                templates.pop()
+            j, opened = copy_template(i + 1)
+            emit(source[i:j])
+            if opened:
+                templates.append(0)
+                last = '{'
+            else:
+                last = 'str'
+            i = j
+        elif ch == '/' and (last in REGEX_KEYWORDS or (len(last) == 1 and last in '(,=:[!&|?{};+-*%<>~^') or not last):
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/') and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            j += 1
+            while j < n and _is_word(source[j]):
+                j += 1
+            emit(source[i:j])
+            last, i = 'regex', j
+        elif _is_word(ch):
+            word = IDENTIFIER.match(source, i).group()
+            # Numbers like 1.5e-3 are a word, a dot and a word: fine for emit()
+            emit(word)
+            last, i = word, i + len(word)
+        else:
+            if templates:
+                if ch == '{':
+                    templates[-1] += 1
+                elif ch == '}':
+                    templates[-1] -= 1
+            emit(ch)
+            last, i = ch, i + 1
+    return ''.join(out).strip() + '\n'
+
+
+def bundle_js(sources):
+    """[(name, source)] -> one script; ';' guards files that end without one"""
+    return ''.join(f'/* {name} */\n{minify_js(source)};\n' for name, source in sources)
+
+
+def duplicate_functions(sources):
+    """Top-level function names declared by more than one bundled file"""
+    seen, duplicates = {}, {}
+    for name, source in sources:
+        for function in re.findall(r'^function\s+([\w$]+)', source, re.M):
+            if function in seen and seen[function] != name:
+                duplicates[function] = [seen[function], name]
+            seen.setdefault(function, name)
+    return duplicates
+
+
+# CSS -------------------------------------------------------------------------
+
+def strip_css_comments(text):
+    return re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+
+
+def parse_css(text):
+    """Nested [(prelude, body)] where body is a str of declarations or a list of children"""
+    nodes, stack, start, i, n = [], [], 0, 0, len(text)
+    current = nodes
+    while i < n:
+        ch = text[i]
+        if ch in '\'"':
+            i = text.index(ch, i + 1) + 1
+            continue
+        if ch == '{':
+            prelude = text[start:i].strip()
+            if prelude.startswith('@') and not prelude.startswith(('@font-face', '@page')) and 'keyframes' not in prelude:
+                children = []
+                current.append((prelude, children))
+                stack.append(current)
+                current = children
+                start = i + 1
+            else:
+                depth, j = 1, i + 1
+                while depth:
+                    depth += {'{': 1, '}': -1}.get(text[j], 0)
+                    j += 1
+                current.append((prelude, text[i + 1:j - 1].strip()))
+                start = i = j
+                continue
+        elif ch == '}':
+            current = stack.pop() if stack else nodes
+            start = i + 1
+        elif ch == ';' and not stack and text[start:i].strip().startswith('@'):
+            current.append((text[start:i].strip(), None))  # @import / @charset
+            start = i + 1
+        i += 1
+    return nodes
+
+
+def markup_tokens(html):
+    """Classes, ids and tag names a template's markup can contain"""
+    tokens = {'classes': set(), 'ids': set(), 'tags': {'html', 'body'}}
+    plain = re.sub(r'{%.*?%}|{{.*?}}', ' ', html)
+    for value in re.findall(r'\bclass\s*=\s*["\']([^"\']*)["\']', plain):
+        tokens['classes'].update(value.split())
+    tokens['ids'].update(re.findall(r'\bid\s*=\s*["\']([^"\'\s]+)["\']', plain))
+    tokens['tags'].update(tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', plain))
+    for tag, markup in TAG_MARKUP.items():
+        if re.search(r'{%\s*' + tag + r'\b', html):
+            for kind, names in markup.items():
+                tokens[kind].update(names)
+    return tokens
+
+
+def selector_matches(selector, tokens):
+    """Whether any selector in a comma list could match the markup (state classes aside)"""
+    for part in selector.split(','):
+        part = re.sub(r'::?[\w-]+(\([^)]*\))?', '', part)  # Pseudo-classes and -elements
+        part = re.sub(r'\[[^\]]*\]', '', part)  # Attribute selectors
+        classes = set(re.findall(r'\.([\w-]+)', part))
+        ids = set(re.findall(r'#([\w-]+)', part))
+        tags = {tag.lower() for tag in re.findall(r'(?:^|[\s>+~])([a-zA-Z][\w-]*)', part)}
+        if classes <= tokens['classes'] and ids <= tokens['ids'] and tags <= tokens['tags']:
+            return True
+    return False
+
+
+def critical_css(nodes, tokens):
+    """The rules that can apply to the markup, plus the keyframes they animate with"""
+    def select(nodes):
+        kept = []
+        for prelude, body in nodes:
+            if body is None or prelude.startswith(('@font-face', '@charset', '@import')):
+                kept.append((prelude, body))
+            elif isinstance(body, list):
+                children = select(body)
+                if children:
+                    kept.append((prelude, children))
+            elif not prelude.startswith('@') and selector_matches(prelude, tokens):
+                kept.append((prelude, body))
+        return kept
+
+    def walk(nodes):
+        for prelude, body in nodes:
+            if isinstance(body, list):
+                yield from walk(body)
+            else:
+                yield prelude, body
+
+    kept = select(nodes)
+    used = ' '.join(body for prelude, body in walk(kept) if isinstance(body, str))
+    for prelude, body in nodes:
+        if 'keyframes' in prelude and re.search(r'\b' + re.escape(prelude.split()[-1]) + r'\b', used):
+            kept.append((prelude, body))
+    return serialize_css(kept)
+
+
+CSS_STRING = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')')
+
+
+def minify_css(text):
+    """Collapse whitespace outside strings (data: URIs included)"""
+    parts = CSS_STRING.split(strip_css_comments(text))
+    for index in range(0, len(parts), 2):  # Even parts are outside strings
+        parts[index] = re.sub(r'\s*([{};,>])\s*', r'\1', re.sub(r'\s+', ' ', parts[index])).replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def serialize_css(nodes):
+    parts = []
+    for prelude, body in nodes:
+        if body is None:
+            parts.append(f'{prelude};')
+        elif isinstance(body, list):
+            parts.append(f'{prelude}{{{serialize_css(body)}}}')
+        else:
+            parts.append(f'{prelude}{{{body}}}')
+    return minify_css(''.join(parts))
+
+
+# Build -----------------------------------------------------------------------
+
+def read(paths, name):
+    source_storage, source_path = paths[name]
+    with source_storage.open(source_path) as f:
+        return f.read().decode()
+
+
+def critical_templates():
+    """(key, template path) for the shell and every module fragment"""
+    yield 'index', TEMPLATE_DIR / 'index.html'
+    for path in sorted((TEMPLATE_DIR / 'modules').glob('_*_fragment.html')):
+        yield path.stem[1:-len('_fragment')], path
+
+
+def gzip_size(text):
+    return len(gzip.compress(text.encode(), mtime=0))
+
+
+def build(storage, paths):
+    """Write the bundle, the critical CSS and assets.json; returns the new names"""
+    if not all(name in paths for name in SHELL_SCRIPTS + [STYLESHEET]):
+        return []
+
+    scripts = [(name, read(paths, name)) for name in SHELL_SCRIPTS]
+    bundle = bundle_js(scripts)
+    names = {BUNDLE_NAME: bundle}
+
+    stylesheet = read(paths, STYLESHEET)
+    nodes = parse_css(strip_css_comments(stylesheet))
+    critical = {}
+    for key, template in critical_templates():
+        name = f'{CRITICAL_DIR}{key}.css'
+        names[name] = critical_css(nodes, markup_tokens(template.read_text(encoding='utf-8')))
+        critical[key] = name
+
+    for name, content in names.items():
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(content.encode()))
+
+    scripts_bytes = sum(len(source.encode()) for name, source in scripts)
+    report = {
+        'scripts': {'files': len(scripts), 'bytes': scripts_bytes, 'gzip': sum(gzip_size(s) for n, s in scripts)},
+        'bundle': {'bytes': len(bundle.encode()), 'gzip': gzip_size(bundle)},
+        'blocking_css': {'before': len(stylesheet.encode()), 'after': len(names[critical['index']].encode())},
+        'requests': {'before': len(scripts) + 1, 'after': 1},
+        'duplicate_functions': duplicate_functions(scripts),
+    }
+    manifest = {'bundle': BUNDLE_NAME, 'scripts': SHELL_SCRIPTS, 'critical': critical, 'report': report}
+    if storage.exists(MANIFEST_NAME):
+        storage.delete(MANIFEST_NAME)
+    storage.save(MANIFEST_NAME, ContentFile(json.dumps(manifest, indent=2).encode()))
+
+    logger.info(
+        "Shell assets: %d scripts -> 1 bundle, %d -> %d bytes (%d -> %d gzipped); "
+        "render-blocking CSS %d -> %d bytes inline; %d -> %d blocking requests",
+        len(scripts), scripts_bytes, report['bundle']['bytes'], report['scripts']['gzip'],
+        report['bundle']['gzip'], report['blocking_css']['before'], report['blocking_css']['after'],
+        report['requests']['before'], report['requests']['after'],
+    )
+    for function, files in report['duplicate_functions'].items():
+        logger.warning("%s is defined in both %s and %s; the later one wins", function, *files)
+    return list(names)
+
+
+@lru_cache(maxsize=None)
+def manifest():
+    """assets.json from the last collectstatic, or {} (e.g. in development)"""
+    try:
+        with staticfiles_storage.open(MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@lru_cache(maxsize=None)
+def inline_css(name):
+    with staticfiles_storage.open(name) as f:
+        return f.read().decode()
@@ -0,0 +1,279 @@
+"""HTTP load benchmarks against a local gunicorn process.
+
+Shared by the bench_http, bench_asgi and loadtest_rewards commands: start a
+server on a free port, replay requests from client threads and summarize the
+latencies. bench_http also compares its results with a stored baseline.
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import psutil
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+# gunicorn arguments per deployment: sync workers serving wsgi.py, or uvicorn
+# workers serving asgi.py (which routes the read views to their async versions)
+SERVERS = {
+    'wsgi': ['portcyber_project.wsgi'],
+    'asgi': ['--worker-class', 'uvicorn.workers.UvicornWorker', 'portcyber_project.asgi:application'],
+}
+
+# The settings the Dockerfile's server runs with (preload, warm-up, recycling).
+# serve() sets the worker count and class on top of them.
+CONFIG = settings.BASE_DIR / 'gunicorn.conf.py'
+
+# Result metric -> (better direction, share of the threshold it may move by).
+# Tail latencies rest on a handful of samples, so they get more slack; query
+# counts are deterministic, so any increase is a regression.
+METRICS = {
+    'p50_ms': ('lower', 1),
+    'p95_ms': ('lower', 1.5),
+    'p99_ms': ('lower', 2),
+    'rps': ('higher', 1),
+    'peak_rss_mb': ('lower', 1),
+    'queries': ('lower', 0),
+}
+
+# Bearer token the servers are started with, for the /api/metrics/ scenario
+METRICS_TOKEN = 'bench'
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = 'GET'
+    body: bytes = b''
+    content_type: str = ''
+    csrf: bool = False  # Needs a CSRF cookie and header (non-exempt POST)
+    stream: bool = False  # Event stream: timed up to the first event
+    headers: dict = field(default_factory=dict)
+
+
+def scenarios(log_pk, next_cursor):
+    """One or more scenarios for every route in portfolio/urls.py"""
+    shell = ['index', 'landing', 'dashboard', 'achievements', 'logs', 'all_logs', 'creations', 'services', 'connect']
+    fragments = ['api-dashboard', 'api-achievements', 'api-logs', 'api-creations', 'api-services', 'api-connect', 'api-profile']
+    batch = '&'.join(f'path={reverse(name)}' for name in ['api-dashboard', 'api-logs', 'api-services'])
+    return [
+        *(Scenario(name, reverse(name)) for name in shell),
+        *(Scenario(name, reverse(name)) for name in fragments),
+        Scenario('api-log-detail', reverse('api-log-detail', kwargs={'pk': log_pk})),
+        Scenario('api-all-logs', reverse('api-all-logs')),
+        Scenario('api-all-logs-search', reverse('api-all-logs') + '?q=latency&search_content=on'),
+        Scenario('api-all-logs-page-2', reverse('api-all-logs') + f'?cursor={next_cursor}'),
+        Scenario('api-service-detail', reverse('api-service-detail', kwargs={'service_id': 'web_dev'})),
+        Scenario('api-content-batch', reverse('api-content-batch') + f'?{batch}'),
+        Scenario(
+            'api-submit-contact', reverse('api-submit-contact'), 'POST',
+            b'name=Bench&email=bench%40example.com&message=Load+test', 'application/x-www-form-urlencoded', csrf=True,
+        ),
+        Scenario('api-claim-reward', reverse('api-claim-reward'), 'POST', b'{"reward_type": "trophy"}', 'application/json'),
+        Scenario(
+            'api-record-view', reverse('api-record-view'), 'POST',
+            f"path={reverse('api-dashboard')}".encode(), 'application/x-www-form-urlencoded',
+        ),
+        Scenario('api-site-stats', reverse('api-site-stats')),
+        Scenario('api-site-stats-stream', reverse('api-site-stats-stream'), stream=True),
+        Scenario('api-metrics', reverse('api-metrics'), headers={'Authorization': f'Bearer {METRICS_TOKEN}'}),
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server at {url} did not come up within {timeout}s")
+
+
+@contextmanager
+def serve(mode='wsgi', workers=4, env=None, config=CONFIG):
+    """Run gunicorn on a free port; yields (base URL, server process)"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f"127.0.0.1:{port}",
+            '--workers', str(workers),
+            '--log-level', 'warning',
+            '--config', str(config),
+            *SERVERS[mode],
+        ],
+        cwd=settings.BASE_DIR,
+        env=env or os.environ.copy(),
+    )
+    try:
+        wait_for_server(f"{base_url}{reverse('api-site-stats')}")
+        yield base_url, server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def database_url(connection):
+    """URL of a connection's database for server processes (dj-database-url syntax)"""
+    settings_dict = connection.settings_dict
+    if connection.vendor == 'sqlite':
+        return f"sqlite:///{settings_dict['NAME']}"
+    if connection.vendor == 'postgresql':
+        return (
+            f"postgres://{settings_dict['USER']}:{settings_dict['PASSWORD']}"
+            f"@{settings_dict['HOST'] or 'localhost'}:{settings_dict['PORT'] or 5432}/{settings_dict['NAME']}"
+        )
+    raise CommandError(f"Don't know how to point the servers at a {connection.vendor} database")
+
+
+class RssSampler(threading.Thread):
+    """Peak resident memory of a process and its children, sampled in the background"""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def sample(self):
+        total = 0
+        for process in [self.process, *self.process.children(recursive=True)]:
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass  # A worker restarting between listing and reading
+        self.peak = max(self.peak, total)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sample()
+        return self.peak
+
+
+def csrf_token(base_url):
+    """A CSRF token and its cookie, as a browser would get with the connect form"""
+    with urllib.request.urlopen(base_url + reverse('api-connect'), timeout=30) as response:
+        for header in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';')[0].partition('=')
+            if name == settings.CSRF_COOKIE_NAME:
+                return value
+    raise CommandError("The connect fragment did not set a CSRF cookie")
+
+
+def send(base_url, scenario, token=None):
+    """Latency in seconds, or None if the request failed"""
+    request = urllib.request.Request(
+        base_url + scenario.path, data=scenario.body or None, headers=scenario.headers, method=scenario.method,
+    )
+    if scenario.content_type:
+        request.add_header('Content-Type', scenario.content_type)
+    if scenario.csrf and token:
+        request.add_header('Cookie', f'{settings.CSRF_COOKIE_NAME}={token}')
+        request.add_header('X-CSRFToken', token)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            if scenario.stream and response.status == 200:
+                while response.readline() not in (b'\n', b''):
+                    pass
+            else:
+                response.read()
+    except OSError:
+        return None
+    return time.perf_counter() - started
+
+
+def replay(base_url, scenario, requests, concurrency, token=None):
+    """Send a scenario requests times from concurrency threads; (latencies, elapsed seconds)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda _: send(base_url, scenario, token), range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, elapsed):
+    ok = sorted(latency for latency in latencies if latency is not None)
+    return {
+        'requests': len(latencies),
+        'errors': len(latencies) - len(ok),
+        'rps': round(len(ok) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ok, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ok, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ok, 0.99) * 1000, 2),
+    }
+
+
+def median(summaries):
+    """Per-metric median of repeated runs; errors are summed"""
+    result = {metric: statistics.median(summary[metric] for summary in summaries) for metric in summaries[0]}
+    result['requests'] = sum(summary['requests'] for summary in summaries)
+    result['errors'] = sum(summary['errors'] for summary in summaries)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Regressions of results against a baseline, as readable lines.
+
+    Timings, throughput and memory may be worse by up to threshold (a
+    fraction, scaled per metric by METRICS); query counts and error-free runs
+    must not get worse at all.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result.get('errors') and not before.get('errors'):
+            regressions.append(f"{name}: {result['errors']} failed requests")
+        for metric, (better, slack) in METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            allowed = threshold * slack
+            worse = new > old * (1 + allowed) if better == 'lower' else new < old * (1 - allowed)
+            if worse:
+                regressions.append(f"{name}: {metric} {old} -> {new}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, config, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'config': config, 'results': results}, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -0,0 +1,200 @@
+import random
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import tiered
+from .models import SiteStats, RewardCounterShard
+
+# Reward amounts granted per claim (see claim_reward in views.py)
+REWARDS = {
+    'trophy': {'trophies': 5},
+    'coin': {'coins': 25},
+}
+
+TROPHIES_PER_LEVEL = 100
+DAILY_COIN_REDUCTION = 5
+
+
+def shard_count():
+    """Number of counter rows claims are spread across"""
+    return max(1, getattr(settings, 'REWARD_COUNTER_SHARDS', 1))
+
+
+def today():
+    return timezone.now().date()
+
+
+def increment(reward_type):
+    """Atomically add a reward to one counter shard for today.
+
+    The increment happens inside the database (UPDATE ... SET x = x + n), so
+    concurrent claims never overwrite each other and never touch the SiteStats
+    row. Raises KeyError for an unknown reward type. Drops the cached stats;
+    claim() caches the new ones.
+    """
+    deltas = REWARDS[reward_type]
+    shard = random.randrange(shard_count())
+    day = today()
+    updates = {field: F(field) + amount for field, amount in deltas.items()}
+    updates['version'] = F('version') + 1
+
+    if not RewardCounterShard.objects.filter(shard=shard, day=day).update(**updates):
+        # First claim that landed on this shard today; create the row and retry.
+        # The SiteStats row too, on the first claim ever: readers never create
+        # it, and its coins decay from when it was.
+        SiteStats.load()
+        RewardCounterShard.objects.get_or_create(shard=shard, day=day)
+        RewardCounterShard.objects.filter(shard=shard, day=day).update(**updates)
+    forget()
+
+
+def pending():
+    """Per-day totals of the increments not yet folded into SiteStats"""
+    return list(pending_totals())
+
+
+def pending_totals():
+    return (
+        RewardCounterShard.objects.values('day')
+        .annotate(trophies=Sum('trophies'), coins=Sum('coins'), version=Sum('version'))
+        .order_by('day')
+    )
+
+
+def normalize(level, trophies):
+    """Apply level rollover: every 100 trophies is one level"""
+    levels, trophies = divmod(trophies, TROPHIES_PER_LEVEL)
+    return level + levels, trophies
+
+
+def decay(coins, since, until):
+    """Apply the daily coin reduction for every day between two dates"""
+    days = max(0, (until - since).days)
+    return max(0, coins - days * DAILY_COIN_REDUCTION)
+
+
+def fold(site_stats, pending_days, until):
+    """Replay pending per-day claims on top of the stored anchor.
+
+    Equivalent to reducing the balance once per elapsed day and adding each
+    day's claims after that day's reduction, which is what the shell used to
+    do by saving the decayed balance on the first visit of each day.
+    """
+    trophies = site_stats.trophies
+    coins, anchor = site_stats.coins, site_stats.last_daily_reduction_check
+    if isinstance(anchor, datetime):
+        # Freshly created rows still hold the timezone.now default
+        anchor = anchor.date()
+    for bucket in pending_days:
+        trophies += bucket['trophies']
+        if bucket['coins']:
+            coins = decay(coins, anchor, bucket['day']) + bucket['coins']
+            anchor = max(anchor, bucket['day'])
+    level, trophies = normalize(site_stats.level, trophies)
+    return {
+        'level': level,
+        'trophies': trophies,
+        'coins': decay(coins, anchor, until),
+    }
+
+
+# Today's state(), for up to STATS_CACHE_LOCAL_TTL seconds in each worker and
+# STATS_CACHE_TIMEOUT in the shared cache (the local TTL again if CACHES isn't
+# shared, see TieredCache.shared_timeout). claim() writes it through; other
+# increments, rollup() and saving SiteStats (signals.py) invalidate it.
+stats_cache = tiered.TieredCache(
+    'stats',
+    timeout=settings.STATS_CACHE_TIMEOUT,
+    local_size=8,  # One key per day
+    local_ttl=settings.STATS_CACHE_LOCAL_TTL,
+)
+
+
+def state(site_stats=None):
+    """Current stats plus a version that grows whenever they may have changed.
+
+    Read-only: never writes to the database (not even the SiteStats row, so a
+    replica can serve it). Cached unless site_stats is given.
+    """
+    if site_stats is not None:
+        return current(site_stats, pending())
+    return stats_cache.get(today().isoformat(), read_state)
+
+
+async def astate():
+    """state() for async views"""
+    return await stats_cache.aget(today().isoformat(), read_state)
+
+
+def read_state():
+    return current(SiteStats.read(), pending())
+
+
+def current(site_stats, pending_days):
+    version = site_stats.version + sum(bucket['version'] for bucket in pending_days)
+    return fold(site_stats, pending_days, today()), version
+
+
+def snapshot(site_stats=None):
+    """Current level/trophies/coins"""
+    return state(site_stats)[0]
+
+
+def claim(reward_type):
+    """Record a reward claim and return the resulting stats, cached for the next reader"""
+    increment(reward_type)
+    return stats_cache.refresh(today().isoformat(), read_state)[0]
+
+
+def forget():
+    """Drop the cached stats after a change made other than through claim()"""
+    stats_cache.invalidate(today().isoformat())
+
+
+def rollup():
+    """Fold the shard totals into the SiteStats row and re-anchor it to today.
+
+    Shards are decremented by exactly the amounts that were read, so claims
+    that land while the rollup is running stay in their shard for the next one.
+    """
+    until = today()
+    with transaction.atomic():
+        SiteStats.load()
+        site_stats = SiteStats.objects.select_for_update().get(pk=1)
+        shards = list(
+            RewardCounterShard.objects.select_for_update()
+            .exclude(trophies=0, coins=0)
+            .order_by('day')
+        )
+
+        buckets = {}
+        for shard in shards:
+            RewardCounterShard.objects.filter(pk=shard.pk).update(
+                trophies=F('trophies') - shard.trophies,
+                coins=F('coins') - shard.coins,
+            )
+            bucket = buckets.setdefault(shard.day, {'day': shard.day, 'trophies': 0, 'coins': 0})
+            bucket['trophies'] += shard.trophies
+            bucket['coins'] += shard.coins
+
+        stats = fold(site_stats, buckets.values(), until)
+        site_stats.level = stats['level']
+        site_stats.trophies = stats['trophies']
+        site_stats.coins = stats['coins']
+        site_stats.last_daily_reduction_check = until
+        site_stats.save()
+
+        # Earlier days can no longer receive claims; drop their emptied rows,
+        # keeping their claim counts so the stats version never goes backwards.
+        emptied = RewardCounterShard.objects.filter(day__lt=until, trophies=0, coins=0)
+        retired = emptied.aggregate(version=Sum('version'))['version'] or 0
+        emptied.delete()
+        if retired:
+            SiteStats.objects.filter(pk=1).update(version=F('version') + retired)
+            site_stats.refresh_from_db(fields=['version'])
+    forget()
+    return site_stats
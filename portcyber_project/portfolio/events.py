@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+STATS_CHANNEL = 'site-stats'
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySubscription:
+    def __init__(self, broker, channel, maxsize=16):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Runs on the subscriber's event loop. A slow client only needs the
+        # latest stats, so the oldest queued message is dropped when full.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Next message, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class MemoryBroker:
+    """In-process pub/sub. Only reaches clients connected to the same worker."""
+
+    def __init__(self, url=None):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, channel, message):
+        """Safe to call from sync views, which run outside the event loop"""
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Event loop already closed; the subscription is going away.
+                self.unsubscribe(subscription)
+
+    async def subscribe(self, channel):
+        subscription = MemorySubscription(self, channel)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.get(subscription.channel, set()).discard(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode() if isinstance(data, bytes) else data
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Redis pub/sub, so every worker's clients see every claim"""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        import redis
+
+        try:
+            self.client.publish(channel, message)
+        except redis.RedisError as e:
+            # A missed push is harmless: the stats are already saved and
+            # clients resync on their next connection.
+            logger.warning("Could not publish to %s: %s", channel, e)
+
+    async def subscribe(self, channel):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub)
+
+
+BROKERS = {
+    'memory': 'portfolio.events.MemoryBroker',
+    'redis': 'portfolio.events.RedisBroker',
+    'rediss': 'portfolio.events.RedisBroker',
+}
+
+_broker = None
+
+
+def get_broker():
+    """Broker selected by the scheme of settings.STATS_BROKER_URL"""
+    global _broker
+    if _broker is None:
+        url = getattr(settings, 'STATS_BROKER_URL', 'memory://')
+        scheme = url.split('://', 1)[0]
+        _broker = import_string(BROKERS[scheme])(url)
+    return _broker
+
+
+def publish(channel, message):
+    get_broker().publish(channel, message)
@@ -0,0 +1,198 @@
+"""Static export of the /api/content/ fragments that only depend on the database.
+
+export_fragments renders the static modules, every service detail, the logs
+home and one detail per LogEntry into FRAGMENT_EXPORT_ROOT, each under a name
+carrying a hash of its content (log/12.3f2a9c0d1e4b.html) and precompressed
+next to it. StaticFilesMiddleware serves them at FRAGMENT_EXPORT_URL with
+far-future immutable caching. navigation.js fetches those files instead of
+asking Django, which is left with the connect form (a per-visitor CSRF
+token), the all-logs search and pages, and the APIs. The shell lists the
+fixed routes ({% exported_fragments %}), whose number doesn't grow with the
+archive; the log details are listed in a log index (logs.<hash>.json, API
+path -> URL), which navigation.js fetches the first time it needs a log.
+
+manifest.json records, for each route, the file and a hash of what it was
+rendered from: the deploy hash, plus the rows of the log (and its sections)
+for a log detail, or of the logs it shows for the logs home. A rebuild renders
+only the routes whose inputs changed and deletes the files nothing refers to
+any more.
+
+Saving or deleting a LogEntry or LogSection drops its routes from the manifest
+and writes a new log index (signals.py), so clients go back to Django for them
+until the next export. Each process keeps the parsed manifest until the file
+changes, so the shell costs a stat() rather than a read.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .conditional import deploy_hash
+from .fragments import RenderedFragment
+from .models import LogEntry
+
+MANIFEST_NAME = 'manifest.json'
+LOG_INDEX_PREFIX = 'logs.'
+STATIC_ROUTES = ['api-dashboard', 'api-achievements', 'api-creations', 'api-services', 'api-profile']
+
+parsed = (None, None)  # (manifest file's identity, its contents)
+
+
+def root():
+    return Path(settings.FRAGMENT_EXPORT_ROOT)
+
+
+def manifest():
+    """The last export's manifest, or an empty one. Shared by every caller: don't modify it"""
+    global parsed
+    path = root() / MANIFEST_NAME
+    try:
+        stat = path.stat()
+    except OSError:
+        return {'routes': {}}
+    # write() replaces the file, so a new manifest is a new inode
+    identity = (str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if parsed[0] != identity:
+        try:
+            with open(path) as f:
+                parsed = (identity, json.load(f))
+        except (OSError, ValueError):
+            return {'routes': {}}
+    return parsed[1]
+
+
+def url(entry):
+    return settings.FRAGMENT_EXPORT_URL + entry['file']
+
+
+def is_log_detail(entry):
+    return entry['file'].startswith('log/')
+
+
+def exported_urls():
+    """API path -> URL of its exported file, for every exported route"""
+    return {path: url(entry) for path, entry in manifest()['routes'].items()}
+
+
+def shell_fragments():
+    """What the shell inlines: the fixed routes' URLs, and the log index's (or None)"""
+    data = manifest()
+    index = data.get('log_index')
+    return {
+        'routes': {path: url(entry) for path, entry in data['routes'].items() if not is_log_detail(entry)},
+        'logs': settings.FRAGMENT_EXPORT_URL + index if index else None,
+        'log_prefix': reverse('api-log-detail', kwargs={'pk': 0}).removesuffix('0/'),
+    }
+
+
+def row(instance):
+    return [str(getattr(instance, field.attname)) for field in instance._meta.concrete_fields]
+
+
+def log_inputs(log):
+    return [row(log), *(row(section) for section in log.sections.all())]
+
+
+def routes():
+    """(API path, file name stem, what its output depends on) for every exported route"""
+    from .views import SERVICE_DETAILS
+
+    base = deploy_hash()
+    for name in STATIC_ROUTES:
+        yield reverse(name), name.removeprefix('api-'), [base]
+    for service_id in SERVICE_DETAILS:
+        yield reverse('api-service-detail', kwargs={'service_id': service_id}), f'service/{service_id}', [base]
+
+    logs = LogEntry.objects.order_by('-created_at').prefetch_related('sections')
+    for log in logs:
+        yield reverse('api-log-detail', kwargs={'pk': log.pk}), f'log/{log.pk}', [base, log_inputs(log)]
+    # The same selection as LogsView
+    home = [log for log in logs if log.is_pinned] + [log for log in logs if not log.is_pinned][:3]
+    yield reverse('api-logs'), 'logs', [base, [row(log) for log in home]]
+
+
+def digest(inputs):
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def write(path, data):
+    """Write a file atomically, so a server never serves half of it"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def write_manifest(routes):
+    """Write the log index for routes, then the manifest pointing to it"""
+    logs = {path: url(entry) for path, entry in routes.items() if is_log_detail(entry)}
+    data = json.dumps(logs, separators=(',', ':'), sort_keys=True).encode()
+    index = f"{LOG_INDEX_PREFIX}{hashlib.sha256(data).hexdigest()[:12]}.json"
+    if not (root() / index).exists():
+        write(root() / index, data)
+    contents = {'routes': routes, 'log_index': index}
+    write(root() / MANIFEST_NAME, json.dumps(contents, indent=2, sort_keys=True).encode())
+    return index
+
+
+def build(force=False):
+    """Export every route whose inputs changed (all of them with force); returns counts"""
+    from .views import content_fragment
+
+    old = manifest()['routes']
+    new = {}
+    counts = {'rendered': 0, 'unchanged': 0, 'skipped': 0, 'removed': 0}
+    request = RequestFactory().get('/')
+    for path, stem, inputs in routes():
+        inputs = digest(inputs)
+        entry = old.get(path)
+        if not force and entry and entry['inputs'] == inputs and (root() / entry['file']).exists():
+            new[path] = entry
+            counts['unchanged'] += 1
+            continue
+        fragment = content_fragment(request, path)
+        if fragment['status'] != 200:
+            counts['skipped'] += 1
+            continue
+        rendered = RenderedFragment(fragment['html'])
+        name = f"{stem}.{hashlib.sha256(rendered.raw).hexdigest()[:12]}.html"
+        write(root() / name, rendered.raw)
+        for encoding, suffix in (('gzip', '.gz'), ('br', '.br')):
+            if encoding in rendered.encoded:
+                write(root() / (name + suffix), rendered.encoded[encoding])
+        new[path] = {'file': name, 'inputs': inputs}
+        counts['rendered'] += 1
+    index = write_manifest(new)
+
+    # Files the manifest no longer refers to: superseded, or forgotten since
+    current = {entry['file'] for entry in new.values()}
+    for path in root().rglob('*.html'):
+        name = path.relative_to(root()).as_posix()
+        if name not in current:
+            for suffix in ('', '.gz', '.br'):
+                (root() / (name + suffix)).unlink(missing_ok=True)
+            counts['removed'] += 1
+    # Log indexes written since the last build, as logs changed
+    for path in root().glob(f'{LOG_INDEX_PREFIX}*.json'):
+        if path.name != index:
+            path.unlink(missing_ok=True)
+    return counts
+
+
+def forget(paths):
+    """Drop routes from the manifest, so they're served by Django until the next export"""
+    routes = manifest()['routes']
+    if any(path in routes for path in paths):
+        write_manifest({path: entry for path, entry in routes.items() if path not in paths})
+
+
+def log_changed(pk):
+    logs_changed([pk])
+
+
+def logs_changed(pks):
+    forget([*(reverse('api-log-detail', kwargs={'pk': pk}) for pk in pks), reverse('api-logs')])
@@ -0,0 +1,126 @@
+"""Render-once cache for the static module fragments, stored precompressed."""
+import gzip
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+
+from .conditional import deploy_hash
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+# Rendered in place of the CSRF token and swapped for the real one per request,
+# so a cached fragment never carries another visitor's token.
+CSRF_PLACEHOLDER = 'CSRF0PLACEHOLDER0TOKEN'
+
+# For one-off responses: quick, for a body compressed once and sent once
+COMPRESSORS = {'gzip': lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    COMPRESSORS['br'] = lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=5)
+
+# For bodies that are kept and sent many times: the best ratio, whatever it costs
+BEST_COMPRESSORS = {'gzip': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+if brotli is not None:
+    BEST_COMPRESSORS['br'] = lambda data: brotli.compress(data, mode=brotli.MODE_TEXT)
+
+
+class RenderedFragment:
+    """A rendered fragment, and its compressed copies if it's kept.
+
+    A kept fragment (in the cache, or exported) is compressed once, in every
+    encoding, with BEST_COMPRESSORS. One that isn't is served once, so only
+    the encoding the client accepts is made, with the quicker COMPRESSORS.
+    """
+
+    def __init__(self, html, kept=True):
+        self.raw = html.encode()
+        self.needs_csrf = CSRF_PLACEHOLDER.encode() in self.raw
+        self.kept = kept
+        self.encoded = {}
+        if kept and not self.needs_csrf:
+            self.encoded = {encoding: compress_with(self.raw) for encoding, compress_with in BEST_COMPRESSORS.items()}
+
+    def encode(self, encoding):
+        if encoding in self.encoded:
+            return self.encoded[encoding]
+        return COMPRESSORS[encoding](self.raw)
+
+    def response(self, request):
+        if self.needs_csrf:
+            # Per-request token: serve uncompressed (the connect form is ~2 KB)
+            body = self.raw.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+            return HttpResponse(body)
+
+        available = self.encoded if self.kept else COMPRESSORS
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available)
+        response = HttpResponse(self.encode(encoding) if encoding else self.raw)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = len(response.content)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def choose_encoding(accept_encoding, available):
+    """Pick the best available encoding the client accepts (br over gzip)"""
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ('br', 'gzip'):
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and quality > 0:
+            return encoding
+    return None
+
+
+def compress(request, response):
+    """Compress a one-off response (e.g. a batch of fragments) if the client accepts it"""
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), COMPRESSORS)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if encoding:
+        response.content = COMPRESSORS[encoding](response.content)
+        response['Content-Encoding'] = encoding
+        response['Content-Length'] = len(response.content)
+    return response
+
+
+_cache = {}
+
+
+def get(template_name, context=None, key=None):
+    """The fragment rendered once per process and deploy.
+
+    Output must depend only on the template and context; the request is
+    deliberately not passed to the template.
+    """
+    cache_key = (template_name, key, deploy_hash())
+    fragment = _cache.get(cache_key)
+    if fragment is None:
+        context = dict(context or {}, csrf_token=CSRF_PLACEHOLDER)
+        kept = getattr(settings, 'FRAGMENT_CACHE', True)
+        fragment = RenderedFragment(render_to_string(template_name, context), kept=kept)
+        if kept:
+            _cache[cache_key] = fragment
+    return fragment
+
+
+def serve(request, template_name, context=None, key=None):
+    return get(template_name, context, key).response(request)
+
+
+def clear():
+    _cache.clear()
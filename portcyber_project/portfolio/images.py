@@ -0,0 +1,111 @@
+"""Responsive variants of the images under static/images.
+
+collectstatic (see portfolio/storage.py) encodes every source image to AVIF
+and WebP at a few widths. Variants are named after the source's content hash,
+so byte-identical copies share one set, and an unchanged image is never
+re-encoded while its variants are still in STATIC_ROOT. responsive-images.json
+maps each source path to its size and variants for {% responsive_image %}.
+"""
+import hashlib
+import io
+import json
+import logging
+from functools import lru_cache
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = 'images/'
+VARIANT_DIR = 'images/variants/'
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+WIDTHS = (320, 640, 960, 1280)
+# Best first: browsers take the first <source> type they support
+FORMATS = {
+    'avif': {'quality': 50},
+    'webp': {'quality': 80, 'method': 6},
+}
+MAP_NAME = 'responsive-images.json'
+
+
+def is_source(path):
+    return path.startswith(SOURCE_DIR) and not path.startswith(VARIANT_DIR) and path.lower().endswith(SOURCE_EXTENSIONS)
+
+
+def widths_for(width):
+    """Target widths for an image, never upscaling past its own width"""
+    widths = [w for w in WIDTHS if w < width]
+    if width <= WIDTHS[-1]:
+        widths.append(width)
+    return widths
+
+
+def encode(image, width, fmt):
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, fmt.upper(), **FORMATS[fmt])
+    return buffer.getvalue()
+
+
+def build(storage, paths):
+    """Write the variants missing from storage and the variant map.
+
+    paths is collectstatic's {path: (source_storage, source_path)}. Returns the
+    names of all variants so they can go through the manifest like any other
+    static file.
+    """
+    formats = [fmt for fmt in FORMATS if features.check(fmt)]
+    image_map, names, by_digest = {}, [], {}
+    encoded = reused = source_bytes = variant_bytes = 0
+
+    for path in sorted(filter(is_source, paths)):
+        source_storage, source_path = paths[path]
+        with source_storage.open(source_path) as source:
+            data = source.read()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        if digest in by_digest:
+            image_map[path] = by_digest[digest]  # Byte-identical copy
+            continue
+
+        image = Image.open(io.BytesIO(data))  # Lazy: only decoded if a variant is missing
+        entry = {'width': image.width, 'height': image.height, 'variants': {}}
+        for fmt in formats:
+            entry['variants'][fmt] = []
+            for width in widths_for(image.width):
+                name = f'{VARIANT_DIR}{digest}-{width}.{fmt}'
+                if storage.exists(name):
+                    reused += 1
+                else:
+                    storage.save(name, ContentFile(encode(image, width, fmt)))
+                    encoded += 1
+                entry['variants'][fmt].append([width, name])
+                names.append(name)
+        source_bytes += len(data)
+        variant_bytes += storage.size(entry['variants'][formats[0]][-1][1]) if formats else 0
+        image_map[path] = by_digest[digest] = entry
+
+    if storage.exists(MAP_NAME):
+        storage.delete(MAP_NAME)
+    storage.save(MAP_NAME, ContentFile(json.dumps(image_map, indent=2, sort_keys=True).encode()))
+    logger.info(
+        "Responsive images: %d sources (%d unique), %d variants encoded, %d reused; "
+        "largest %s variants %.1f MB vs %.1f MB of originals",
+        len(image_map), len(by_digest), encoded, reused, formats[0] if formats else '-',
+        variant_bytes / 1e6, source_bytes / 1e6,
+    )
+    return names
+
+
+@lru_cache(maxsize=None)
+def variant_map():
+    """The map written by the last collectstatic, or {} (e.g. in development)"""
+    try:
+        with staticfiles_storage.open(MAP_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
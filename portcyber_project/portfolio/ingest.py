@@ -0,0 +1,133 @@
+"""Write-behind batching for contact submissions.
+
+submit_contact validates a submission and queues it here instead of writing
+it. The queue goes to the database in one bulk_create when it holds
+CONTACT_BATCH_SIZE submissions (from the request that filled it), and at
+least every CONTACT_FLUSH_INTERVAL seconds otherwise (from a background
+thread). A burst of posts becomes a few inserts instead of one
+transaction each, leaving the connection pool to the log reads.
+
+The queue is bounded at CONTACT_QUEUE_SIZE. When it's full, say while the
+database is down, put() refuses new submissions and the view answers 503, so
+memory stays bounded and clients know to retry.
+
+Submissions live in worker memory until they're flushed. A graceful shutdown
+(gunicorn's SIGTERM, or restarts after max-requests) flushes them at exit; a
+killed worker loses at most one interval's worth. submitted_at is set when the
+batch is written, up to one interval after the form was posted.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core import serializers
+from django.db import close_old_connections
+
+from .models import ContactSubmission
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    def __init__(self, write, batch_size, flush_interval, max_pending):
+        self.write = write  # Called with a list of pending items
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()  # Guards pending
+        self.writing = threading.Lock()  # One flush at a time, so batches are written in order
+        self.pending = []
+        self.wake = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.pid = None
+
+    def put(self, item):
+        """Queue an item; False if the queue is full"""
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                return False
+            self.pending.append(item)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+        else:
+            self.start()
+        return True
+
+    def start(self):
+        """Start the timer thread in this process, if it isn't running"""
+        if self.thread is not None and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()  # Threads don't survive a fork
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run, name='write-behind', daemon=True)
+            self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            close_old_connections()  # This thread never sees request_finished
+            self.flush()
+
+    def flush(self):
+        """Write everything queued; returns the number of items written"""
+        with self.writing:
+            with self.lock:
+                batch = self.take()
+            if not batch:
+                return 0
+            try:
+                self.write(batch)
+            except Exception:
+                logger.exception("Write-behind flush of %d items failed; will retry", len(batch))
+                with self.lock:
+                    self.put_back(batch)
+                return 0
+            return len(batch)
+
+    # How pending is emptied, refilled after a failed write and reported at
+    # exit; subclasses that keep something other than a list override these.
+    # Called with self.lock held.
+
+    def take(self):
+        batch, self.pending = self.pending, []
+        return batch
+
+    def put_back(self, batch):
+        # Back in front, in order. put() refuses more until it drains.
+        self.pending = batch + self.pending
+
+    def lost(self, batch):
+        # In loaddata's format, so they can still be recovered
+        logger.error("Exiting with %d unwritten items: %s", len(batch), serializers.serialize('json', batch))
+
+    def close(self):
+        """Stop the timer thread and write what's left (at exit)"""
+        self.stopped = True
+        self.wake.set()
+        if self.thread is not None and self.pid == os.getpid():
+            self.thread.join(timeout=5)
+        self.flush()
+        with self.lock:
+            if self.pending:
+                self.lost(self.pending)
+
+
+def write_contacts(submissions):
+    ContactSubmission.objects.bulk_create(submissions)
+
+
+contacts = WriteBehind(
+    write_contacts,
+    batch_size=settings.CONTACT_BATCH_SIZE,
+    flush_interval=settings.CONTACT_FLUSH_INTERVAL,
+    max_pending=settings.CONTACT_QUEUE_SIZE,
+)
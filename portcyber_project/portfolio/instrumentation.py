@@ -0,0 +1,251 @@
+"""Per-request timings: SQL, template rendering and response size.
+
+InstrumentationMiddleware (portfolio/middleware.py) opens a RequestMetrics
+for each request. Every query on any connection and every top-level template
+render adds to it, including work done in sync_to_async threads, since the
+context variable travels with them. When the response is ready the timings go
+out in a Server-Timing header, slow requests are logged with their queries,
+and the totals land in per-view histograms.
+
+The histograms are kept per process and merged into the cache every
+FLUSH_INTERVAL seconds, where /api/metrics/ reads them as Prometheus text.
+With several workers, point CACHES at a shared backend so a scrape sees all of
+them (as for portfolio/logcache.py). The scrape also carries each tiered
+cache's hits and misses per tier (portfolio/tiered.py).
+"""
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from django.utils.crypto import constant_time_compare
+
+from . import tiered
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds, as Prometheus' defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Per-series totals after the bucket counts; times in µs so they can be incr()'d
+TOTALS = ('count', 'duration_us', 'sql_queries', 'sql_us', 'render_us', 'response_bytes')
+WIDTH = len(BUCKETS) + 1 + len(TOTALS)  # Values per series: buckets, +Inf, totals
+FLUSH_INTERVAL = 10  # seconds
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+QUERY_LOG_LIMIT = 50  # queries kept per request for the slow request log
+
+current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.rendering = False
+        self.queries = []
+
+    def add_query(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        if len(self.queries) < QUERY_LOG_LIMIT:
+            self.queries.append((sql, duration))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries", '
+            f'tpl;dur={self.render_time * 1000:.1f}, total;dur={total * 1000:.1f}'
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection"""
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = current.get()
+        if metrics is None or metrics.rendering:
+            # Not in a request, or nested in a render that is already timed
+            return super().render(context, request)
+        metrics.rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.render_time += time.perf_counter() - started
+            metrics.rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, with rendering timed per request"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class Registry:
+    """This process's observations since the last flush to the cache"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def observe(self, labels, duration, metrics, size):
+        """Add one request; True when it's time to flush()"""
+        bucket = next((i for i, bound in enumerate(BUCKETS) if duration <= bound), len(BUCKETS))
+        amounts = (
+            1, round(duration * 1e6), metrics.sql_count, round(metrics.sql_time * 1e6),
+            round(metrics.render_time * 1e6), size,
+        )
+        with self.lock:
+            values = self.pending.setdefault(labels, [0] * WIDTH)
+            values[bucket] += 1
+            for index, amount in enumerate(amounts, start=len(BUCKETS) + 1):
+                values[index] += amount
+        return time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        for labels, values in pending.items():
+            key = series_key(labels)
+            for index, delta in enumerate(values):
+                if delta:
+                    cache.add(f'{key}:{index}', 0, timeout=None)
+                    try:
+                        cache.incr(f'{key}:{index}', delta)
+                    except ValueError:
+                        pass  # Evicted between add() and incr(); one sample lost
+        known = cache.get('metrics:series', set())
+        if not pending.keys() <= known:
+            # Racing flushes may drop each other's new series; the next flush re-adds them
+            cache.set('metrics:series', known | pending.keys(), timeout=None)
+
+
+registry = Registry()
+
+
+def series_key(labels):
+    return 'metrics:' + hashlib.sha1(repr(labels).encode()).hexdigest()[:16]
+
+
+def observe(request, response, metrics):
+    """Record a finished request: header, slow log and histograms.
+
+    Returns True when the caller should flush the registry (kept out of here
+    so async callers can do that cache I/O in a thread).
+    """
+    total = metrics.elapsed()
+    response['Server-Timing'] = metrics.server_timing(total)
+    size = 0 if response.streaming else len(response.content)
+
+    match = request.resolver_match
+    view = match.view_name if match else 'unmatched'
+    method = request.method if request.method in METHODS else 'other'  # Bounded label values
+    flush_due = registry.observe((view, method, f'{response.status_code // 100}xx'), total, metrics, size)
+
+    if total * 1000 >= settings.SLOW_REQUEST_MS:
+        queries = ''.join(f'\n  {duration * 1000:8.1f} ms  {sql}' for sql, duration in metrics.queries)
+        logger.warning(
+            "Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, render %.1f ms, %d bytes%s",
+            request.method, request.get_full_path(), view, total * 1000, metrics.sql_count,
+            metrics.sql_time * 1000, metrics.render_time * 1000, size, queries,
+        )
+    return flush_due
+
+
+def authorized(request):
+    """Staff users, or a bearer token matching settings.METRICS_TOKEN"""
+    if getattr(request, 'user', None) is not None and request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    return bool(token) and constant_time_compare(header, f'Bearer {token}')
+
+
+def exposition():
+    """All processes' flushed metrics in the Prometheus text format"""
+    registry.flush()
+    series = sorted(cache.get('metrics:series', set()))
+    stored = cache.get_many([f'{series_key(labels)}:{i}' for labels in series for i in range(WIDTH)])
+
+    histogram, counters = [], {name: [] for name in TOTALS[2:]}
+    for labels in series:
+        key = series_key(labels)
+        values = [stored.get(f'{key}:{i}', 0) for i in range(WIDTH)]
+        totals = dict(zip(TOTALS, values[len(BUCKETS) + 1:]))
+        if not totals['count']:
+            continue
+        view, method, status = (escape_label(label) for label in labels)
+        label_text = f'view="{view}",method="{method}",status="{status}"'
+        cumulative = 0
+        for bound, count in zip([*map(str, BUCKETS), '+Inf'], values):
+            cumulative += count
+            histogram.append(f'portcyber_request_duration_seconds_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        histogram.append(f'portcyber_request_duration_seconds_sum{{{label_text}}} {totals["duration_us"] / 1e6}')
+        histogram.append(f'portcyber_request_duration_seconds_count{{{label_text}}} {totals["count"]}')
+        counters['sql_queries'].append(f'portcyber_sql_queries_total{{{label_text}}} {totals["sql_queries"]}')
+        counters['sql_us'].append(f'portcyber_sql_seconds_total{{{label_text}}} {totals["sql_us"] / 1e6}')
+        counters['render_us'].append(f'portcyber_template_render_seconds_total{{{label_text}}} {totals["render_us"] / 1e6}')
+        counters['response_bytes'].append(f'portcyber_response_bytes_total{{{label_text}}} {totals["response_bytes"]}')
+
+    lines = [
+        '# HELP portcyber_request_duration_seconds Time from the first middleware to the response, per view.',
+        '# TYPE portcyber_request_duration_seconds histogram',
+        *histogram,
+    ]
+    for name, metric, help_text in [
+        ('sql_queries', 'portcyber_sql_queries_total', 'SQL queries run.'),
+        ('sql_us', 'portcyber_sql_seconds_total', 'Time spent in SQL queries.'),
+        ('render_us', 'portcyber_template_render_seconds_total', 'Time spent rendering templates.'),
+        ('response_bytes', 'portcyber_response_bytes_total', 'Response body bytes (streaming responses count 0).'),
+    ]:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter', *counters[name]]
+    lines += [
+        '# HELP portcyber_cache_lookups_total Lookups in each tier of the tiered caches (portfolio/tiered.py).',
+        '# TYPE portcyber_cache_lookups_total counter',
+    ]
+    for name, tiered_cache in sorted(tiered.caches.items()):
+        for tier, stats in tiered_cache.stats().items():
+            for result, count in [('hit', stats['hits']), ('miss', stats['misses'])]:
+                lines.append(f'portcyber_cache_lookups_total{{cache="{escape_label(name)}",tier="{tier}",result="{result}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
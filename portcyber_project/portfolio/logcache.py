@@ -0,0 +1,118 @@
+"""Rendered HTML of the logs home and log detail fragments, kept in the cache.
+
+Each key carries a version token per log (and one for the home fragment).
+portfolio/signals.py replaces a token whenever its log or one of its sections
+is saved or deleted, so a stale fragment is never looked up again and simply
+expires. The tokens live in the cache as well, so with a shared backend
+(CACHE_URL, e.g. Redis) an edit reaches every worker. Without one
+(settings.SHARED_CACHE off) the other workers never see the new token, so
+the key also carries the request's logs watermark (the one behind the ETag,
+conditional.logs_watermark): then any change to the logs is a miss
+everywhere, and a fragment never goes out under a newer ETag than its content.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .conditional import deploy_hash, logs_version
+
+HOME = 'home'
+TIMEOUT = 60 * 60 * 24
+
+
+def version(name):
+    """Current version token for a fragment (created on first use)"""
+    key = f'logcache:version:{name}'
+    token = cache.get(key)
+    if token is None:
+        # A fresh token, never a counter restarting at 1, so an evicted
+        # version can't bring an old fragment back into use.
+        token = time.time_ns()
+        if not cache.add(key, token, timeout=None):
+            token = cache.get(key, token)
+    return token
+
+
+def bump(name):
+    cache.set(f'logcache:version:{name}', time.time_ns(), timeout=None)
+
+
+def home_pks():
+    """pks shown on the cached home fragment, or None if unknown"""
+    return cache.get(f'logcache:home-pks:{version(HOME)}')
+
+
+def log_changed(pk, is_pinned=False, created=False):
+    """Invalidate a log's detail fragment, and the home fragment if it shows the log"""
+    bump(pk)
+    shown = home_pks()
+    if created or is_pinned or shown is None or pk in shown:
+        bump(HOME)
+
+
+def invalidate_all():
+    """For bulk changes made without signals (queryset updates, backfills)"""
+    bump('all')
+
+
+def fetch(request, name, render):
+    """The fragment's HTML from the cache, or render() it and store it.
+
+    render() must not depend on the request. When rendering the home fragment
+    it also calls remember_home() with the logs it shows.
+    """
+    if not getattr(settings, 'FRAGMENT_CACHE', True):
+        return render()
+
+    key, html = lookup(request, name)
+    if html is None:
+        html = render()
+        cache.set(key, html, TIMEOUT)
+    return html
+
+
+async def afetch(request, name, render):
+    """fetch() for async views, where render is a coroutine function"""
+    if not getattr(settings, 'FRAGMENT_CACHE', True):
+        return await render()
+
+    key, html = await sync_to_async(lookup)(request, name)
+    if html is None:
+        html = await render()
+        await cache.aset(key, html, TIMEOUT)
+    return html
+
+
+def lookup(request, name):
+    """(cache key, cached HTML or None), counting the hit or miss"""
+    watermark = '' if settings.SHARED_CACHE else logs_version(request)
+    key = f'logcache:html:{name}:{version(name)}:{version("all")}:{watermark}:{deploy_hash()}'
+    html = cache.get(key)
+    record('hits' if html is not None else 'misses')
+    return key, html
+
+
+def remember_home(pks):
+    cache.set(f'logcache:home-pks:{version(HOME)}', set(pks), TIMEOUT)
+
+
+def record(outcome):
+    key = f'logcache:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # Evicted between add() and incr(); losing one count is fine
+
+
+def stats():
+    hits = cache.get('logcache:hits', 0)
+    misses = cache.get('logcache:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_stats():
+    cache.delete_many(['logcache:hits', 'logcache:misses'])
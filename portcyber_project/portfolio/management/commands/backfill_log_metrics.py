@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import logcache
+from portfolio.models import LogEntry
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored content length, section count and excerpt of every LogEntry"
+
+    def handle(self, *args, **options):
+        count = 0
+        for log_entry in LogEntry.objects.only('pk').iterator(chunk_size=500):
+            log_entry.refresh_content_metrics()
+            count += 1
+        logcache.invalidate_all()  # Queryset updates don't send the signals
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} log entries"))
@@ -0,0 +1,104 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+
+from portfolio import benchmark, search
+from portfolio.models import LogEntry
+from portfolio.seed import TOPICS, seed_logs
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the read views under gunicorn sync workers (WSGI) "
+        "and uvicorn workers (ASGI, async views) at increasing concurrency. Runs against a "
+        "throwaway seeded test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logs', type=int, default=2000, help="seeded log entries")
+        parser.add_argument('--workers', type=int, default=2, help="server processes in each mode")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+        parser.add_argument('--requests', type=int, default=1000, help="requests per concurrency level")
+        parser.add_argument('--modes', nargs='+', choices=sorted(benchmark.SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--seed', type=int, default=0, help="seed for the data and the request mix")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not SQLite's usual in-memory test database, so the servers can open it
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        seed_logs(options['logs'], seed=options['seed'])
+        search.rebuild()
+        urls = self.request_mix(options['requests'], options['seed'])
+        env = dict(
+            os.environ,
+            DATABASE_URL=benchmark.database_url(connection),
+            DEBUG='False',
+            FRAGMENT_CACHE='True',
+        )
+        connection.close()  # SQLite: let the servers have the file to themselves
+
+        results = {}
+        self.stdout.write(
+            f"{options['logs']} logs, {options['workers']} workers per server, {os.cpu_count()} CPUs"
+        )
+        self.stdout.write(f"{'mode':<6}{'clients':>8}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for mode in options['modes']:
+            for concurrency in options['concurrency']:
+                results[mode, concurrency] = self.measure(mode, concurrency, urls, env, options['workers'])
+                rps, p50, p99, errors = results[mode, concurrency]
+                self.stdout.write(
+                    f"{mode:<6}{concurrency:>8}{len(urls):>10}{errors:>8}{rps:>9.1f}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}"
+                )
+
+        if {'wsgi', 'asgi'} <= set(options['modes']):
+            for concurrency in options['concurrency']:
+                wsgi, asgi = results['wsgi', concurrency], results['asgi', concurrency]
+                self.stdout.write(
+                    f"{concurrency} clients: ASGI {asgi[0] / wsgi[0]:.2f}x throughput, "
+                    f"p99 {asgi[2] * 1000:.1f} ms vs {wsgi[2] * 1000:.1f} ms"
+                )
+
+    def request_mix(self, count, seed):
+        """The same weighted sequence of read requests for every run"""
+        rng = random.Random(seed)
+        pks = list(LogEntry.objects.values_list('pk', flat=True))
+        routes = [
+            (lambda: reverse('api-logs'), 3),
+            (lambda: reverse('api-log-detail', kwargs={'pk': rng.choice(pks)}), 3),
+            (lambda: reverse('api-all-logs'), 2),
+            (lambda: reverse('api-all-logs') + f"?q={rng.choice(TOPICS)}", 1),
+            (lambda: reverse('api-site-stats'), 3),
+        ]
+        choices = [route for route, weight in routes for _ in range(weight)]
+        return [rng.choice(choices)() for _ in range(count)]
+
+    def measure(self, mode, concurrency, urls, env, workers):
+        """(requests/s, p50 s, p99 s, errors) for one server mode and client count"""
+        with benchmark.serve(mode, workers, env) as (base_url, server):
+            def fetch(path):
+                return benchmark.send(base_url, benchmark.Scenario(path, path))
+
+            for url in urls[:50]:  # Warm up every worker's caches and template loader
+                fetch(url)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(fetch, urls))
+            elapsed = time.perf_counter() - started
+
+        ok = sorted(latency for latency in latencies if latency is not None)
+        return len(ok) / elapsed, benchmark.percentile(ok, 0.50), benchmark.percentile(ok, 0.99), len(latencies) - len(ok)
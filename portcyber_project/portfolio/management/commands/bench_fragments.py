@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from portfolio import fragments, views
+
+# (url name, kwargs, template, context, cache key) for every cached fragment view
+CASES = [
+    ('api-dashboard', {}, 'modules/_dashboard_fragment.html', {}, None),
+    ('api-achievements', {}, 'modules/_achievements_fragment.html', {}, None),
+    ('api-creations', {}, 'modules/_creations_fragment.html', {}, None),
+    ('api-services', {}, 'modules/_services_fragment.html', {}, None),
+    ('api-service-detail', {'service_id': 'web_dev'}, 'modules/_service_detail_fragment.html',
+     {'service': views.SERVICE_DETAILS['web_dev'], 'service_id': 'web_dev'}, 'web_dev'),
+    ('api-connect', {}, 'modules/_connect_fragment.html', {}, None),
+    ('api-profile', {}, 'modules/_profile_fragment.html',
+     {'profile_name': 'Nikhil Kaswan', 'profile_title': 'Web Developer', 'company': 'Legacy.ai'}, None),
+]
+
+
+def mean_us(func, iterations):
+    func()  # warm template loader / cache
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = "Time the fragment views rendering on every hit (before) vs. the precompressed cache (after)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    @override_settings(FRAGMENT_CACHE=True)
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        factory = RequestFactory()
+        fragments.clear()
+
+        self.stdout.write(f"{'fragment':<22}{'before µs':>12}{'after µs':>12}{'speedup':>10}{'bytes':>9}{'br':>8}{'gzip':>8}")
+        for name, kwargs, template, context, key in CASES:
+            request = factory.get(reverse(name, kwargs=kwargs), HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+            def before():
+                return HttpResponse(render_to_string(template, context, request=request))
+
+            def after():
+                return fragments.serve(request, template, context, key=key)
+
+            before_us = mean_us(before, iterations)
+            after_us = mean_us(after, iterations)
+            fragment = fragments.get(template, context, key)
+            self.stdout.write(
+                f"{name:<22}{before_us:>12.1f}{after_us:>12.1f}{before_us / after_us:>9.1f}x"
+                f"{len(fragment.raw):>9}{len(fragment.encode('br') if 'br' in fragments.COMPRESSORS else b''):>8}{len(fragment.encode('gzip')):>8}"
+            )
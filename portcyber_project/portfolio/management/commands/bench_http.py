@@ -0,0 +1,155 @@
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from portfolio import benchmark, ingest, pagination, search
+from portfolio.models import LogEntry
+from portfolio.seed import seed_contacts, seed_logs
+
+BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'http-baseline.json'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test every route in portfolio/urls.py through a local gunicorn server and "
+        "compare p50/p95/p99, requests/s, queries per request and peak RSS with a stored "
+        "baseline. Runs against a throwaway seeded test database, never the configured one; "
+        "run collectstatic first (the shell pages need the static manifest)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logs', type=int, default=2000, help="seeded log entries")
+        parser.add_argument('--sections-per-log', type=int, default=5)
+        parser.add_argument('--contacts', type=int, default=5000, help="seeded contact submissions")
+        parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=8, help="client threads")
+        parser.add_argument('--repeat', type=int, default=3, help="runs per scenario; the median run is reported")
+        parser.add_argument('--workers', type=int, default=2, help="server processes")
+        parser.add_argument('--server', choices=sorted(benchmark.SERVERS), default='wsgi')
+        parser.add_argument('--scenarios', nargs='+', help="only run these scenarios (default: all)")
+        parser.add_argument('--baseline', default=str(BASELINE), help="baseline JSON to compare with")
+        parser.add_argument('--save-baseline', action='store_true', help="record the results as the new baseline")
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help="allowed slowdown of timings, throughput and memory as a fraction (default 0.25)",
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not (Path(settings.STATIC_ROOT) / 'staticfiles.json').exists():
+            raise CommandError("No static manifest: run `manage.py collectstatic` first")
+
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not SQLite's usual in-memory test database, so the server can open it
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                results = self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.check_baseline(options, results)
+
+    def config(self, options):
+        """What the numbers depend on; a baseline is only comparable under the same config"""
+        keys = ['logs', 'sections_per_log', 'contacts', 'requests', 'concurrency', 'repeat', 'workers', 'server', 'seed']
+        return {**{key: options[key] for key in keys}, 'cpus': os.cpu_count()}
+
+    def run(self, options):
+        seed_logs(options['logs'], sections_per_entry=options['sections_per_log'], seed=options['seed'])
+        seed_contacts(options['contacts'], seed=options['seed'])
+        search.rebuild()
+        log_pk = LogEntry.objects.order_by('-created_at', '-pk').values_list('pk', flat=True).first()
+        _, next_cursor = pagination.keyset_page(LogEntry.objects.all(), pagination.DEFAULT_SORT)
+        scenarios = benchmark.scenarios(log_pk, next_cursor)
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+
+        queries = self.count_queries(scenarios)
+        env = dict(
+            os.environ,
+            DATABASE_URL=benchmark.database_url(connection),
+            DEBUG='False',
+            FRAGMENT_CACHE='True',
+            METRICS_TOKEN=benchmark.METRICS_TOKEN,
+            CONTACT_THROTTLE_BURST='0',  # Every request comes from the same address
+        )
+        connection.close()  # SQLite: let the server have the file to itself
+
+        results = {}
+        self.stdout.write(
+            f"{options['server']}, {options['workers']} workers, {options['concurrency']} clients, "
+            f"{options['requests']} requests per scenario, {options['logs']} logs, {os.cpu_count()} CPUs"
+        )
+        self.stdout.write(
+            f"{'scenario':<24}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'queries':>9}{'RSS MB':>8}"
+        )
+        with benchmark.serve(options['server'], options['workers'], env) as (base_url, server):
+            token = benchmark.csrf_token(base_url)
+            for scenario in scenarios:
+                for _ in range(options['workers'] * 2):  # Warm up every worker
+                    benchmark.send(base_url, scenario, token)
+                sampler = benchmark.RssSampler(server.pid)
+                sampler.start()
+                runs = [
+                    benchmark.summarize(*benchmark.replay(base_url, scenario, options['requests'], options['concurrency'], token))
+                    for _ in range(options['repeat'])
+                ]
+                result = benchmark.median(runs)
+                result['queries'] = queries[scenario.name]
+                result['peak_rss_mb'] = round(sampler.stop() / 2**20, 1)
+                results[scenario.name] = result
+                self.stdout.write(
+                    f"{scenario.name:<24}{result['rps']:>8.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+                    f"{result['p99_ms']:>9.1f}{result['errors']:>8}{result['queries']:>9}{result['peak_rss_mb']:>8.1f}"
+                )
+        return results
+
+    # One counter shard, so every claim after the first finds its row already there
+    @override_settings(
+        FRAGMENT_CACHE=True, ALLOWED_HOSTS=['*'], REWARD_COUNTER_SHARDS=1, METRICS_TOKEN=benchmark.METRICS_TOKEN,
+    )
+    def count_queries(self, scenarios):
+        """Queries per request, counted in this process on a warm second request"""
+        client = Client()
+        queries = {}
+        for scenario in scenarios:
+            for _ in range(2):
+                with CaptureQueriesContext(connection) as captured:
+                    client.generic(
+                        scenario.method, scenario.path, scenario.body,
+                        content_type=scenario.content_type, headers=scenario.headers,
+                    )
+            queries[scenario.name] = len(captured)
+        ingest.contacts.flush()  # Write the contact posts now, not at exit
+        return queries
+
+    def check_baseline(self, options, results):
+        path = options['baseline']
+        config = self.config(options)
+        if options['save_baseline']:
+            benchmark.save_baseline(path, config, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {path}"))
+            return
+        if not os.path.exists(path):
+            self.stdout.write(f"No baseline at {path}; record one with --save-baseline")
+            return
+
+        baseline = benchmark.load_baseline(path)
+        if baseline['config'] != config:
+            raise CommandError(
+                f"The baseline was recorded with {baseline['config']}, this run used {config}. "
+                "Match its options or re-record it with --save-baseline."
+            )
+        regressions = benchmark.compare(results, baseline['results'], options['threshold'])
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path} (threshold {options['threshold']:.0%})"))
@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from portfolio import rendering
+from portfolio.models import LogEntry, LogSection, content_metrics
+
+# The section markup as the detail template had it, rendering the raw content per request
+BEFORE = "{% for section in log.sections.all %}<div>{{ section.content|safe|linebreaksbr }}</div>{% endfor %}"
+AFTER = "{% for section in log.sections.all %}<div>{{ section.rendered_html|safe }}</div>{% endfor %}"
+
+
+def content(rng, paragraphs):
+    """Admin-style section content: paragraphs of text with some markup and line breaks"""
+    words = ['latency', 'deploy', 'cache', 'query', 'index', 'worker', 'replica', 'rollback', 'timeout', 'retry']
+    lines = []
+    for _ in range(paragraphs):
+        text = ' '.join(rng.choices(words, k=60))
+        lines.append(f"<p>{text} <b>{rng.choice(words)}</b> <a href=\"https://example.com/{rng.randrange(100)}\">link</a></p>")
+        lines.append(' '.join(rng.choices(words, k=20)))
+    return '\n'.join(lines)
+
+
+def best_ms(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Time a log detail render with the section HTML stored at write time vs. rendered "
+        "from the raw content per request, for logs of growing size. Runs against a "
+        "throwaway test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, nargs='+', default=[5, 50, 200], help="sections per log")
+        parser.add_argument('--paragraphs', type=int, default=8, help="paragraphs per section")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        rng = random.Random(0)
+        before, after = Template(BEFORE), Template(AFTER)
+        detail = get_template('modules/_log_detail_fragment.html')
+
+        self.stdout.write(
+            f"{'sections':>9}{'KB':>8}{'before ms':>11}{'after ms':>10}{'saved':>8}{'detail ms':>11}{'write ms/section':>18}"
+        )
+        for count in options['sections']:
+            contents = [content(rng, options['paragraphs']) for _ in range(count)]
+            log = LogEntry.objects.create(
+                title=f"{count} sections", log_date="JANUARY 2026", status="ACTIVE", entry_type="NOTE",
+                **content_metrics(contents),
+            )
+            sections = [LogSection(log_entry=log, title=f"Section {index}", content=text) for index, text in enumerate(contents)]
+            write_ms = best_ms(lambda: [section.render() for section in sections], 3) / count
+            LogSection.objects.bulk_create(sections)
+            log = LogEntry.objects.prefetch_related('sections').get(pk=log.pk)  # Queries out of the timings
+
+            context = Context({'log': log})
+            before_ms = best_ms(lambda: before.render(context), options['repeat'])
+            after_ms = best_ms(lambda: after.render(context), options['repeat'])
+            detail_ms = best_ms(lambda: detail.render({'log': log}), options['repeat'])
+            size = sum(len(text) for text in contents) / 1024
+            self.stdout.write(
+                f"{count:>9}{size:>8.0f}{before_ms:>11.2f}{after_ms:>10.2f}{1 - after_ms / before_ms:>8.0%}"
+                f"{detail_ms:>11.2f}{write_ms:>18.3f}"
+            )
+        self.stdout.write(f"Renderer version {rendering.VERSION}; 'detail' is the whole fragment as served now.")
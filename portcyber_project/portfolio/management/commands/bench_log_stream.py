@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import reverse
+
+from portfolio import pagination, search
+from portfolio.models import LogEntry
+from portfolio.seed import seed_logs
+from portfolio.views import AllLogsView
+
+
+def buffered(url):
+    """Every matching log rendered into one string before sending, as a single response would"""
+    view = AllLogsView()
+    view.setup(RequestFactory().get(url))
+    view.parse(view.request)
+    logs, _ = pagination.keyset_query(LogEntry.objects.all(), view.sort_by, None)
+    started = time.perf_counter()
+    response = view.respond(list(logs), {}, None)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, len(response.content)
+
+
+def streamed(url):
+    """(time to the first piece, time to the last, bytes) of the streamed response"""
+    started = time.perf_counter()
+    pieces = iter(AllLogsView.as_view()(RequestFactory().get(url, {'stream': '1'})).streaming_content)
+    size = len(next(pieces))
+    first = time.perf_counter() - started
+    size += sum(len(piece) for piece in pieces)
+    return first, time.perf_counter() - started, size
+
+
+class Command(BaseCommand):
+    help = (
+        "Time to first byte, total time and peak Python memory of ALL SYSTEM LOGS "
+        "with every log rendered into one response vs. streamed in chunks (?stream=1). "
+        "Runs against a throwaway seeded test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logs', type=int, nargs='+', default=[1000, 10000, 20000], help="seeded log entries")
+        parser.add_argument('--chunk-size', type=int, default=AllLogsView.stream_chunk_size)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        AllLogsView.stream_chunk_size = options['chunk_size']
+        url = reverse('api-all-logs')
+        self.stdout.write(f"{'logs':>7}{'mode':>10}{'TTFB ms':>10}{'total ms':>10}{'MB sent':>9}{'peak MB':>9}")
+        seeded = 0
+        for count in sorted(options['logs']):
+            seed_logs(count - seeded, sections_per_entry=2, seed=seeded)
+            seeded = count
+            search.rebuild()
+            for mode, measure in [('buffered', buffered), ('streamed', streamed)]:
+                first, total, size = measure(url)  # Timed without tracemalloc, which slows Python down
+                tracemalloc.start()
+                measure(url)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(
+                    f"{count:>7}{mode:>10}{first * 1000:>10.0f}{total * 1000:>10.0f}"
+                    f"{size / 2**20:>9.1f}{peak / 2**20:>9.1f}"
+                )
+        self.stdout.write(f"Streamed in chunks of {options['chunk_size']} logs.")
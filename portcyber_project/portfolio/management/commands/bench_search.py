@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from portfolio import search
+from portfolio.models import LogEntry
+from portfolio.seed import seed_logs
+
+
+def icontains_search(query, include_content):
+    """The query AllLogsView ran before the full-text index"""
+    condition = Q(title__icontains=query)
+    if include_content:
+        condition |= Q(sections__content__icontains=query)
+    return list(LogEntry.objects.filter(condition).distinct().values_list('pk', flat=True))
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare full-text search with the old icontains query over seeded sections. "
+        "Runs against a throwaway test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=100_000)
+        parser.add_argument('--sections-per-log', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--queries', nargs='+', default=['latency', 'database migration', 'kubernetes outage'])
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        entries = options['sections'] // options['sections_per_log']
+        started = time.perf_counter()
+        seed_logs(entries, sections_per_entry=options['sections_per_log'])
+        seeded = time.perf_counter() - started
+        started = time.perf_counter()
+        search.rebuild()
+        self.stdout.write(
+            f"{connection.vendor}: seeded {entries} logs / {options['sections']} sections in {seeded:.1f}s, "
+            f"indexed in {time.perf_counter() - started:.1f}s"
+        )
+
+        self.stdout.write(f"{'query':<24}{'icontains ms':>14}{'matches':>9}{'fulltext ms':>13}{'matches':>9}{'speedup':>9}")
+        for query in options['queries']:
+            old_ms, old = timed(lambda: icontains_search(query, True), options['repeat'])
+            new_ms, new = timed(lambda: search.search(query, include_content=True), options['repeat'])
+            self.stdout.write(
+                f"{query:<24}{old_ms:>14.1f}{len(old):>9}{new_ms:>13.1f}{len(new):>9}{old_ms / new_ms:>8.1f}x"
+            )
+        self.stdout.write(
+            f"icontains matches substrings of the whole phrase; full-text matches every word "
+            f"(stemmed, prefix) and returns at most {search.RESULT_LIMIT} ranked hits."
+        )
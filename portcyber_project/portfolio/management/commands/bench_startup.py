@@ -0,0 +1,159 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from portfolio import benchmark, search
+from portfolio.models import LogEntry
+from portfolio.seed import seed_logs
+
+
+def wait_for_port(port, timeout=30):
+    """Until the server listens (it may not answer yet); returns nothing"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.005)
+    raise CommandError(f"Nothing listening on port {port} after {timeout}s")
+
+
+@contextmanager
+def server(config, env, *args):
+    """A one-worker gunicorn; yields (base URL, when it was started)"""
+    port = benchmark.free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f"127.0.0.1:{port}",
+            '--workers', '1',
+            '--log-level', 'warning',
+            '--config', str(config),
+            *args,
+            *benchmark.SERVERS['wsgi'],
+        ],
+        cwd=settings.BASE_DIR,
+        env=env,
+    )
+    try:
+        wait_for_port(port)
+        yield f"http://127.0.0.1:{port}", started
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def fetch(base_url, path):
+    latency = benchmark.send(base_url, benchmark.Scenario(path, path))
+    if latency is None:
+        raise CommandError(f"GET {path} failed")
+    return latency
+
+
+def boot(config, paths, env):
+    """(seconds from starting gunicorn to its first response, first latencies, second latencies)"""
+    with server(config, env) as (base_url, started):
+        first = [fetch(base_url, paths[0])]
+        first_response = time.perf_counter() - started
+        first += [fetch(base_url, path) for path in paths[1:]]
+        second = [fetch(base_url, path) for path in paths]
+    return first_response, first, second
+
+
+def recycle(config, paths, env, requests, max_requests):
+    """Latencies of requests to a worker replaced every max_requests requests"""
+    with server(config, env, '--max-requests', str(max_requests), '--max-requests-jitter', '0') as (base_url, _):
+        return [fetch(base_url, paths[index % len(paths)]) for index in range(requests)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time from starting gunicorn to its first response, and each page's first and second "
+        "response, with gunicorn's defaults vs. gunicorn.conf.py (app preloaded and warmed up). "
+        "Then the latency of requests to a worker that is replaced every --max-requests requests. "
+        "One sync worker each. Runs against a throwaway seeded test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="server starts per profile (medians are shown)")
+        parser.add_argument('--logs', type=int, default=200, help="seeded log entries")
+        parser.add_argument('--requests', type=int, default=500, help="requests in the recycling run")
+        parser.add_argument('--max-requests', type=int, default=25, help="requests per worker in the recycling run")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not SQLite's usual in-memory test database, so the servers can open it
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                defaults = Path(directory) / 'defaults.conf.py'
+                defaults.write_text('')
+                self.run(options, {'defaults': defaults, 'shipped': benchmark.CONFIG})
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options, profiles):
+        seed_logs(options['logs'], sections_per_entry=3)
+        search.rebuild()
+        paths = [
+            reverse('index'),
+            *(reverse(name) for name in [
+                'api-dashboard', 'api-achievements', 'api-logs', 'api-creations', 'api-services',
+                'api-connect', 'api-profile', 'api-all-logs', 'api-site-stats',
+            ]),
+            reverse('api-log-detail', kwargs={'pk': LogEntry.objects.values_list('pk', flat=True).first()}),
+            reverse('api-service-detail', kwargs={'service_id': 'web_dev'}),
+        ]
+        env = dict(
+            os.environ,
+            DATABASE_URL=benchmark.database_url(connection),
+            DEBUG='False',
+            FRAGMENT_CACHE='True',
+        )
+        connection.close()  # SQLite: let the servers have the file to themselves
+
+        results, recycled = {}, {}
+        for name, config in profiles.items():
+            runs = [boot(config, paths, env) for _ in range(options['runs'])]
+            results[name] = (
+                statistics.median(run[0] for run in runs),
+                [statistics.median(run[1][index] for run in runs) for index in range(len(paths))],
+                [statistics.median(run[2][index] for run in runs) for index in range(len(paths))],
+            )
+            recycled[name] = sorted(recycle(config, paths, env, options['requests'], options['max_requests']))
+
+        (before, before_first, before_second), (after, after_first, after_second) = results['defaults'], results['shipped']
+        self.stdout.write(f"{'':<32}{'first request ms':^24}{'second request ms':^24}")
+        self.stdout.write(f"{'path':<32}{'defaults':>12}{'shipped':>12}{'defaults':>12}{'shipped':>12}")
+        for path, *latencies in zip(paths, before_first, after_first, before_second, after_second):
+            self.stdout.write(f"{path:<32}" + ''.join(f"{latency * 1000:>12.1f}" for latency in latencies))
+        self.stdout.write(
+            f"{'all first requests':<32}{sum(before_first) * 1000:>12.1f}{sum(after_first) * 1000:>12.1f}"
+            f"{sum(before_second) * 1000:>12.1f}{sum(after_second) * 1000:>12.1f}"
+        )
+        self.stdout.write(
+            f"Started to first response: {before * 1000:.0f} ms with the defaults, {after * 1000:.0f} ms shipped "
+            f"(medians of {options['runs']} starts, {os.cpu_count()} CPUs)"
+        )
+        self.stdout.write(
+            f"\n{options['requests']} requests, worker replaced every {options['max_requests']}:"
+        )
+        self.stdout.write(f"{'profile':<12}{'total ms':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for name, latencies in recycled.items():
+            self.stdout.write(
+                f"{name:<12}{sum(latencies) * 1000:>10.0f}{benchmark.percentile(latencies, 0.50) * 1000:>9.1f}"
+                f"{benchmark.percentile(latencies, 0.99) * 1000:>9.1f}{latencies[-1] * 1000:>9.1f}"
+            )
@@ -0,0 +1,37 @@
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from portfolio import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream logs or contact submissions out as JSON Lines or CSV, reading a chunk at a "
+        "time (the input import_data takes)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.KINDS)
+        parser.add_argument('output', nargs='?', default='-', help="file to write, or - for stdout")
+        parser.add_argument('--format', choices=transfer.FORMATS, help="default: from the file name, else jsonl")
+        parser.add_argument('--chunk-size', type=int, default=transfer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        format = options['format'] or transfer.format_for(output)
+        model, export, _ = transfer.KINDS[options['kind']]
+        started = time.perf_counter()
+        size = 0
+        with nullcontext(sys.stdout) if output == '-' else open(output, 'w', encoding='utf-8', newline='') as f:
+            for text in export(model.objects.all(), format, options['chunk_size']):
+                f.write(text)
+                size += len(text)
+            f.flush()
+        elapsed = time.perf_counter() - started
+        # To stderr, which stays clear of the data when writing to stdout
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {options['kind']} in {elapsed:.2f}s ({size / 1e6 / elapsed:.1f} MB/s)"
+        ))
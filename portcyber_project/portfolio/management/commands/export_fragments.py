@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Prerender the content fragments into FRAGMENT_EXPORT_ROOT, re-rendering only those "
+        "whose logs or deploy changed since the last export (run after deploys and edits)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="re-render every fragment")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = export.build(force=options['force'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {counts['rendered']}, unchanged {counts['unchanged']}, skipped {counts['skipped']}, "
+            f"removed {counts['removed']} in {elapsed:.2f}s into {export.root()}"
+        ))
@@ -0,0 +1,35 @@
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Load logs or contact submissions from JSON Lines or CSV (as export_data writes them) "
+        "with bulk inserts, a transaction per chunk"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=transfer.KINDS)
+        parser.add_argument('input', help="file to read, or - for stdin")
+        parser.add_argument('--format', choices=transfer.FORMATS, help="default: from the file name, else jsonl")
+        parser.add_argument('--chunk-size', type=int, default=transfer.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        source = options['input']
+        format = options['format'] or transfer.format_for(source)
+        _, _, load = transfer.KINDS[options['kind']]
+        started = time.perf_counter()
+        with nullcontext(sys.stdin) if source == '-' else open(source, encoding='utf-8', newline='') as f:
+            try:
+                count = load(transfer.read(f, format), options['chunk_size'])
+            except transfer.InvalidRecord as error:
+                raise CommandError(f"{error} ({error.imported} {options['kind']} imported before it)")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {count} {options['kind']} in {elapsed:.2f}s ({count / elapsed:.0f}/s)"
+        ))
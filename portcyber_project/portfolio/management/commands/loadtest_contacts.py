@@ -0,0 +1,121 @@
+import itertools
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from portfolio import benchmark
+from portfolio.models import ContactSubmission
+
+
+class Command(BaseCommand):
+    help = (
+        "Sustained contact form posts through gunicorn from many client addresses, at each "
+        "--batch-sizes (1 writes every submission on its own). Checks that every accepted "
+        "submission is in the database once the server has shut down gracefully. Runs "
+        "against a throwaway test database, never the configured one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+        parser.add_argument('--clients', type=int, default=16, help="concurrent client threads")
+        parser.add_argument('--seconds', type=float, default=10.0, help="how long to post for, per batch size")
+        parser.add_argument('--addresses', type=int, default=1000, help="client IPs to spread the posts over")
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 50])
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not SQLite's usual in-memory test database, so the servers can open it
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        self.stdout.write(
+            f"{options['workers']} workers, {options['clients']} clients, {options['addresses']} addresses, "
+            f"{options['seconds']:.0f}s per batch size, {os.cpu_count()} CPUs"
+        )
+        self.stdout.write(f"{'batch':>6}{'accepted/s':>12}{'accepted':>10}{'429':>7}{'503':>7}{'errors':>8}{'p99 ms':>9}")
+        lost = []
+        for batch_size in options['batch_sizes']:
+            before = ContactSubmission.objects.count()
+            env = dict(
+                os.environ,
+                DATABASE_URL=benchmark.database_url(connection),
+                DEBUG='False',
+                CONTACT_BATCH_SIZE=str(batch_size),
+            )
+            connection.close()  # SQLite: let the servers have the file to themselves
+            with benchmark.serve('wsgi', options['workers'], env) as (base_url, server):
+                statuses, latencies, elapsed = self.post(base_url, options)
+            # The server has shut down, so everything it accepted should be written
+            written = ContactSubmission.objects.count() - before
+
+            counts = Counter(statuses)
+            accepted = counts[200]
+            errors = len(statuses) - accepted - counts[429] - counts[503]
+            p99 = benchmark.percentile(sorted(latencies), 0.99) * 1000
+            self.stdout.write(
+                f"{batch_size:>6}{accepted / elapsed:>12.1f}{accepted:>10}{counts[429]:>7}{counts[503]:>7}{errors:>8}{p99:>9.1f}"
+            )
+            if written != accepted:
+                lost.append(f"batch size {batch_size}: {accepted} accepted, {written} written")
+
+        if lost:
+            raise CommandError("Lost submissions: " + "; ".join(lost))
+        self.stdout.write(self.style.SUCCESS("Every accepted submission was written"))
+
+    def post(self, base_url, options):
+        """Post until the time is up; (statuses, latencies in seconds, elapsed seconds)"""
+        token = benchmark.csrf_token(base_url)
+        url = base_url + reverse('api-submit-contact')
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Cookie': f'{settings.CSRF_COOKIE_NAME}={token}',
+            'X-CSRFToken': token,
+        }
+        numbers = itertools.count()  # Thread-safe in CPython
+        deadline = time.monotonic() + options['seconds']
+
+        def client(_):
+            statuses, latencies = [], []
+            while time.monotonic() < deadline:
+                number = next(numbers)
+                body = urllib.parse.urlencode({
+                    'name': f"Load {number}", 'email': f"load{number}@example.com", 'message': "Load test",
+                }).encode()
+                # Arriving from the (trusted) loopback, as the tunnel would
+                address = f"198.18.{number % options['addresses'] // 256}.{number % options['addresses'] % 256}"
+                request = urllib.request.Request(url, data=body, headers={**headers, 'CF-Connecting-IP': address})
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                        statuses.append(response.status)
+                except urllib.error.HTTPError as error:
+                    statuses.append(error.code)
+                except OSError:
+                    statuses.append(None)
+                latencies.append(time.perf_counter() - started)
+            return statuses, latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            results = list(pool.map(client, range(options['clients'])))
+        elapsed = time.perf_counter() - started
+        statuses = [status for result, _ in results for status in result]
+        latencies = [latency for _, result in results for latency in result]
+        return statuses, latencies, elapsed
@@ -0,0 +1,66 @@
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import benchmark, counters
+from portfolio.models import SiteStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent POSTs at /api/claim-reward/ through gunicorn and verify no "
+        "increment was lost. Adds real rewards to the configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="gunicorn worker processes")
+        parser.add_argument('--clients', type=int, default=32, help="concurrent client threads")
+        parser.add_argument('--claims', type=int, default=2000, help="total claims to send")
+        parser.add_argument('--reward-type', choices=sorted(counters.REWARDS), default='trophy')
+
+    def handle(self, *args, **options):
+        reward_type = options['reward_type']
+        claims = options['claims']
+        # Straight from the database: this process's stats cache could be older than the run
+        before = counters.snapshot(SiteStats.read())
+        with benchmark.serve('wsgi', options['workers']) as (base_url, server):
+            body = json.dumps({'reward_type': reward_type}).encode()
+
+            def send(_):
+                req = urllib.request.Request(
+                    f"{base_url}/api/claim-reward/",
+                    data=body,
+                    headers={'Content-Type': 'application/json'},
+                )
+                try:
+                    with urllib.request.urlopen(req, timeout=30) as response:
+                        return response.status == 200
+                except OSError:
+                    return False
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+                results = list(pool.map(send, range(claims)))
+            elapsed = time.perf_counter() - started
+
+        after = counters.snapshot(SiteStats.read())
+        ok = sum(results)
+        amount = counters.REWARDS[reward_type]
+        if reward_type == 'trophy':
+            per_level = counters.TROPHIES_PER_LEVEL
+            delta = (after['level'] * per_level + after['trophies']) - (before['level'] * per_level + before['trophies'])
+            expected = ok * amount['trophies']
+        else:
+            delta = after['coins'] - before['coins']
+            expected = ok * amount['coins']
+
+        self.stdout.write(
+            f"{ok}/{claims} claims succeeded in {elapsed:.2f}s "
+            f"({ok / elapsed:.1f} claims/sec, {options['workers']} workers, {options['clients']} clients)"
+        )
+        if delta != expected:
+            raise CommandError(f"Lost updates: expected +{expected}, counters moved +{delta}")
+        self.stdout.write(self.style.SUCCESS(f"No lost updates: +{delta} {reward_type} units accounted for"))
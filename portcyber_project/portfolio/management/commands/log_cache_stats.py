@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import logcache
+
+
+class Command(BaseCommand):
+    help = (
+        "Show hit/miss counts of the rendered logs fragment cache (needs a shared CACHES "
+        "backend; with the per-process default only the admin action sees the server's counts)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = logcache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit ratio: {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            logcache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import search
+
+
+class Command(BaseCommand):
+    help = "Reindex every LogEntry for full-text search (run after bulk imports)"
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} log entries"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from portfolio import export, logcache, rendering
+from portfolio.models import LogSection
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-render the stored HTML of every LogSection made by another renderer version "
+        "(all of them with --all); run after changing portfolio/rendering.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="re-render sections already at the current version too")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        sections = LogSection.objects.all()
+        if not options['all']:
+            sections = sections.exclude(renderer_version=rendering.VERSION)
+        sections = sections.only('pk', 'log_entry_id', 'content').order_by('pk')
+
+        started = time.perf_counter()
+        count, logs, last = 0, set(), 0
+        # Batches by pk rather than one cursor, which SQLite can't keep open across the writes
+        while batch := list(sections.filter(pk__gt=last)[:options['batch_size']]):
+            now = timezone.now()
+            for section in batch:
+                section.render()
+                section.updated_at = now  # Moves the logs watermark, so ETags change
+                logs.add(section.log_entry_id)
+            with transaction.atomic():
+                LogSection.objects.bulk_update(batch, ['rendered_html', 'renderer_version', 'updated_at'])
+            count += len(batch)
+            last = batch[-1].pk
+
+        if count:
+            logcache.invalidate_all()  # bulk_update doesn't send the signals
+            export.logs_changed(logs)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-rendered {count} sections of {len(logs)} logs at renderer version {rendering.VERSION} "
+            f"in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s)"
+        ))
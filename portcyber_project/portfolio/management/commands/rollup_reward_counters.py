@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold the sharded reward counters into the SiteStats row and apply the daily "
+        "coin reduction (safe to run from cron)"
+    )
+
+    def handle(self, *args, **options):
+        site_stats = counters.rollup()
+        self.stdout.write(self.style.SUCCESS(
+            f"Level {site_stats.level}, {site_stats.trophies} trophies, {site_stats.coins} coins"
+        ))
@@ -0,0 +1,153 @@
+"""Project middleware. All of it runs sync or async, whichever the chain is.
+
+Django runs the whole middleware chain synchronously if any middleware can't
+run async, so under ASGI a single sync-only middleware would send every
+request from the event loop to a thread and back again to reach the async
+views.
+"""
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import instrumentation, routers
+
+# An exported fragment (or log index): a path of word characters and slashes
+# (so never "..") ending in a content hash
+EXPORTED_NAME = re.compile(r'[\w/-]+\.[0-9a-f]{12}\.(html|json)')
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, made async-capable, also serving the exported fragments.
+
+    export_fragments (portfolio/export.py) can add files while the workers
+    run. Their names carry a content hash, so each is looked up on disk the
+    first time it's asked for and then served from memory like the rest.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        # Before WhiteNoise scans its files, which asks immutable_file_test
+        self.export_root = os.path.abspath(settings.FRAGMENT_EXPORT_ROOT)
+        self.export_prefix = settings.FRAGMENT_EXPORT_URL
+        super().__init__(get_response, settings)
+        if self.autorefresh or os.path.isdir(self.export_root):
+            self.add_files(self.export_root, prefix=self.export_prefix)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def immutable_file_test(self, path, url):
+        if url.startswith(self.export_prefix):
+            return EXPORTED_NAME.fullmatch(url[len(self.export_prefix):]) is not None
+        return super().immutable_file_test(path, url)
+
+    def is_new_export(self, path_info):
+        return (
+            not self.autorefresh
+            and path_info.startswith(self.export_prefix)
+            and path_info not in self.files
+            and EXPORTED_NAME.fullmatch(path_info[len(self.export_prefix):]) is not None
+        )
+
+    def add_export(self, path_info):
+        path = os.path.join(self.export_root, path_info[len(self.export_prefix):])
+        if os.path.isfile(path):
+            self.add_file_to_dictionary(path_info, path)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.is_new_export(request.path_info):
+            self.add_export(request.path_info)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.is_new_export(request.path_info):
+            await sync_to_async(self.add_export)(request.path_info)
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)  # In memory: no I/O
+        if static_file is not None:
+            # Opens the file and builds a sync FileResponse
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    """Times SQL, templates and the whole request; see portfolio/instrumentation.py"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        if instrumentation.observe(request, response, metrics):
+            instrumentation.registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.current.reset(token)
+        if instrumentation.observe(request, response, metrics):
+            await sync_to_async(instrumentation.registry.flush)()
+        return response
+
+
+class DatabaseRoutingMiddleware:
+    """Per-request state for the replica router; see portfolio/routers.py"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = routers.Routing(sticky=routers.STICKY_COOKIE in request.COOKIES)
+        token = routers.current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        routers.finish(routing, response)
+        return response
+
+    async def __acall__(self, request):
+        routing = routers.Routing(sticky=routers.STICKY_COOKIE in request.COOKIES)
+        token = routers.current.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.current.reset(token)
+        routers.finish(routing, response)
+        return response
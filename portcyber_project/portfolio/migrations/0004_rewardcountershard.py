@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_logentry_is_pinned'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RewardCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(unique=True)),
+                ('trophies', models.IntegerField(default=0)),
+                ('coins', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
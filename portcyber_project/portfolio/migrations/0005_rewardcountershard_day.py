@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_rewardcountershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rewardcountershard',
+            name='day',
+            field=models.DateField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='rewardcountershard',
+            name='shard',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rewardcountershard',
+            unique_together={('shard', 'day')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:33
+
+import html
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 800  # portfolio.models.LONG_CONTENT_THRESHOLD when this was added
+
+
+def backfill(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    LogEntry = apps.get_model('portfolio', 'LogEntry')
+    LogSection = apps.get_model('portfolio', 'LogSection')
+    contents = defaultdict(list)
+    for log_entry_id, content in LogSection.objects.using(alias).order_by('pk').values_list('log_entry_id', 'content'):
+        contents[log_entry_id].append(content)
+    for pk in LogEntry.objects.using(alias).values_list('pk', flat=True):
+        text = "\n\n".join(html.unescape(strip_tags(content)).strip() for content in contents[pk])
+        LogEntry.objects.using(alias).filter(pk=pk).update(
+            content_length=sum(len(content) for content in contents[pk]),
+            section_count=len(contents[pk]),
+            excerpt=Truncator(text).chars(EXCERPT_LENGTH),
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_content_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logentry',
+            name='content_length',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='excerpt',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='logentry',
+            name='section_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
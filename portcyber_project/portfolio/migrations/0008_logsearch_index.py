@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+import html
+from collections import defaultdict
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+# The index as portfolio/search.py created it when this migration was added,
+# spelled out here so later changes to that module don't change what it does
+TABLE = 'portfolio_logsearch'
+CONFIG = 'english'
+
+CREATE_SQL = {
+    'sqlite': [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "title, body, tokenize='porter unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        "log_entry_id bigint PRIMARY KEY REFERENCES portfolio_logentry (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "title text NOT NULL, body text NOT NULL, "
+        "title_document tsvector NOT NULL, document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_title_gin ON {TABLE} USING gin (title_document)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_document_gin ON {TABLE} USING gin (document)",
+    ],
+}
+
+
+def index(cursor, vendor, pk, title, body):
+    if vendor == 'sqlite':
+        cursor.execute(f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)", [pk, title, body])
+    else:
+        cursor.execute(
+            f"INSERT INTO {TABLE} (log_entry_id, title, body, title_document, document) "
+            f"VALUES (%s, %s, %s, to_tsvector('{CONFIG}', %s), "
+            f"setweight(to_tsvector('{CONFIG}', %s), 'A') || setweight(to_tsvector('{CONFIG}', %s), 'B'))",
+            [pk, title, body, title, title, body],
+        )
+
+
+def create_index(apps, schema_editor):
+    vendor, alias = schema_editor.connection.vendor, schema_editor.connection.alias
+    if vendor not in CREATE_SQL:
+        return  # Searched with icontains
+    for sql in CREATE_SQL[vendor]:
+        schema_editor.execute(sql)
+
+    LogEntry = apps.get_model('portfolio', 'LogEntry')
+    LogSection = apps.get_model('portfolio', 'LogSection')
+    contents = defaultdict(list)
+    for log_entry_id, content in LogSection.objects.using(alias).order_by('pk').values_list('log_entry_id', 'content'):
+        contents[log_entry_id].append(html.unescape(strip_tags(content)).strip())
+    with schema_editor.connection.cursor() as cursor:
+        for pk, title in LogEntry.objects.using(alias).values_list('pk', 'title'):
+            index(cursor, vendor, pk, title, "\n\n".join(contents[pk]))
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_logentry_content_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
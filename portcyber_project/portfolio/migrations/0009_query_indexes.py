@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_logsearch_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['submitted_at'], name='contact_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(condition=models.Q(('is_pinned', True)), fields=['-created_at'], name='log_pinned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['created_at', 'id'], name='log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['title', 'id'], name='log_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logentry',
+            index=models.Index(fields=['updated_at'], name='log_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logsection',
+            index=models.Index(fields=['updated_at'], name='section_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:07
+
+import html
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.db import migrations, models
+
+# A copy of portfolio/rendering.py as of VERSION 1, so this migration keeps
+# writing what it wrote when it was added whatever becomes of that module
+VERSION = 1
+
+# Tag -> attributes it may keep (besides GLOBAL_ATTRIBUTES)
+ALLOWED = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    **dict.fromkeys([
+        'b', 'strong', 'i', 'em', 'u', 's', 'mark', 'small', 'sub', 'sup',
+        'code', 'pre', 'kbd', 'samp', 'p', 'div', 'span', 'blockquote',
+        'ul', 'ol', 'li', 'h3', 'h4', 'h5', 'h6',
+        'table', 'thead', 'tbody', 'tr', 'th', 'td', 'br', 'hr',
+    ], frozenset()),
+}
+GLOBAL_ATTRIBUTES = {'class'}
+VOID = {'br', 'hr', 'img'}
+# Dropped with everything inside them; other unknown tags just lose the tag
+DROPPED = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'svg', 'math', 'head', 'title'}
+URL_ATTRIBUTES = {'href', 'src'}
+SAFE_SCHEMES = {'', 'http', 'https', 'mailto'}
+
+
+def safe_url(value):
+    # Browsers ignore whitespace and control characters inside a scheme ("java\tscript:")
+    compact = ''.join(char for char in value if char > ' ' and char != '\x7f')
+    try:
+        return urlsplit(compact).scheme.lower() in SAFE_SCHEMES
+    except ValueError:
+        return False
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = []  # Allowed tags still open, innermost last
+        self.dropping = None  # [tag, nesting] of the dropped element we're inside
+
+    def keep(self, tag, name, value):
+        if value is None or (name not in ALLOWED[tag] and name not in GLOBAL_ATTRIBUTES):
+            return False
+        return name not in URL_ATTRIBUTES or safe_url(value)
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag == self.dropping[0]:
+                self.dropping[1] += 1
+            return
+        if tag in DROPPED:
+            self.dropping = [tag, 1]
+            return
+        if tag not in ALLOWED:
+            return
+        kept = [(name, value) for name, value in attrs if self.keep(tag, name, value)]
+        if tag == 'a':
+            kept.append(('rel', 'nofollow noopener'))
+        attributes = ''.join(f' {name}="{html.escape(value)}"' for name, value in kept)
+        self.out.append(f'<{tag}{attributes}>')
+        if tag not in VOID:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping[0]:
+                self.dropping[1] -= 1
+                if not self.dropping[1]:
+                    self.dropping = None
+            return
+        if tag in self.open:
+            # Closes whatever was left open inside it too
+            while (inner := self.open.pop()) != tag:
+                self.out.append(f'</{inner}>')
+            self.out.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        text = html.escape(data, quote=False)
+        if 'pre' not in self.open:
+            text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '<br>')
+        self.out.append(text)
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.out.append(f'</{self.open.pop()}>')
+
+
+def render_content(content):
+    sanitizer = Sanitizer()
+    sanitizer.feed(content)
+    sanitizer.close()
+    return ''.join(sanitizer.out)
+
+
+def render(apps, schema_editor):
+    LogSection = apps.get_model('portfolio', 'LogSection')
+    sections = LogSection.objects.using(schema_editor.connection.alias)
+    for section in sections.only('pk', 'content'):
+        sections.filter(pk=section.pk).update(
+            rendered_html=render_content(section.content), renderer_version=VERSION,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logsection',
+            name='rendered_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='logsection',
+            name='renderer_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_logsection_rendered_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('module', models.CharField(max_length=50)),
+                ('object_id', models.CharField(blank=True, default='', max_length=100)),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('visitors', models.BinaryField(default=b'')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hour', 'module', 'object_id'), name='module_view_rollup_unique')],
+            },
+        ),
+    ]
@@ -1,5 +1,24 @@
+import html
+
 from django.db import models
 from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from . import rendering
+
+LONG_CONTENT_THRESHOLD = 800  # ~200 words
+
+
+def content_metrics(contents):
+    """Stored LogEntry metrics for a list of section contents, in display order"""
+    contents = list(contents)
+    text = "\n\n".join(html.unescape(strip_tags(content)).strip() for content in contents)
+    return {
+        'content_length': sum(len(content) for content in contents),
+        'section_count': len(contents),
+        'excerpt': Truncator(text).chars(LONG_CONTENT_THRESHOLD),
+    }
 
 class ContactSubmission(models.Model):
     name = models.CharField(max_length=100)
@@ -10,14 +29,21 @@ class ContactSubmission(models.Model):
     def __str__(self):
         return f"Submission from {self.name} at {self.submitted_at.strftime('%Y-%m-%d %H:%M')}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['submitted_at'], name='contact_submitted_idx'),  # The admin's date filter
+        ]
+
 class SiteStats(models.Model):
     level = models.IntegerField(default=1)
     trophies = models.IntegerField(default=0)
-    coins = models.IntegerField(default=5000)
+    coins = models.IntegerField(default=5000)  # Balance as of last_daily_reduction_check
     last_daily_reduction_check = models.DateField(default=timezone.now)
+    version = models.PositiveBigIntegerField(default=0)  # Bumped on every save, used for ETags
 
     def save(self, *args, **kwargs):
         self.pk = 1
+        self.version += 1
         super(SiteStats, self).save(*args, **kwargs)
 
     @classmethod
@@ -25,10 +51,48 @@ class SiteStats(models.Model):
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def read(cls):
+        """The row without creating it (an unsaved one with the defaults if missing), for read-only views"""
+        return cls.objects.filter(pk=1).first() or cls(pk=1)
+
     class Meta:
         verbose_name_plural = "Site Stats"
 
 
+class RewardCounterShard(models.Model):
+    """Pending reward increments, summed into SiteStats by portfolio.counters"""
+    shard = models.PositiveSmallIntegerField()
+    day = models.DateField(default=timezone.now)  # Coin decay is applied per day
+    trophies = models.IntegerField(default=0)
+    coins = models.IntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0)  # Claims recorded; never decremented
+
+    def __str__(self):
+        return f"Shard {self.shard} ({self.day}): +{self.trophies} trophies, +{self.coins} coins"
+
+    class Meta:
+        unique_together = ('shard', 'day')
+
+
+class ModuleViewRollup(models.Model):
+    """Views of one module (or one log or service) in one hour, added to by portfolio.analytics"""
+    hour = models.DateTimeField()
+    module = models.CharField(max_length=50)  # The fragment's URL name without 'api-', e.g. 'log-detail'
+    object_id = models.CharField(max_length=100, blank=True, default='')  # The log's pk, the service's id
+    views = models.PositiveBigIntegerField(default=0)
+    visitors = models.BinaryField(default=b'')  # HyperLogLog registers of the unique visitors; b'' when none
+
+    def __str__(self):
+        name = f"{self.module} {self.object_id}".strip()
+        return f"{name} at {self.hour:%Y-%m-%d %H:00}: {self.views} views"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'module', 'object_id'], name='module_view_rollup_unique'),
+        ]
+
+
 class LogEntry(models.Model):
     title = models.CharField(max_length=200)
     log_date = models.CharField(max_length=100)  # For manual text input like "JANUARY 2026"
@@ -36,27 +100,76 @@ class LogEntry(models.Model):
     entry_type = models.CharField(max_length=50)
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Denormalized from the sections so list views never load them.
+    # Kept in sync by portfolio/signals.py; see also backfill_log_metrics.
+    content_length = models.PositiveIntegerField(default=0)
+    section_count = models.PositiveIntegerField(default=0)
+    excerpt = models.TextField(blank=True, default='')  # Plain text, truncated
 
     def __str__(self):
         return self.title
 
     @property
     def total_content_length(self):
-        """Calculate total length of all section content"""
-        return sum(len(section.content) for section in self.sections.all())
+        """Total length of all section content"""
+        return self.content_length
 
     @property
     def is_long_content(self):
         """Check if log content is long enough to need truncation"""
-        return self.total_content_length > 800  # ~200 words threshold
+        return self.content_length > LONG_CONTENT_THRESHOLD
+
+    def refresh_content_metrics(self):
+        """Recompute the stored metrics from the sections"""
+        contents = self.sections.order_by('pk').values_list('content', flat=True)
+        metrics = content_metrics(contents)
+        # update() so the entry's own updated_at and save signals are untouched
+        LogEntry.objects.filter(pk=self.pk).update(**metrics)
+        for field, value in metrics.items():
+            setattr(self, field, value)
 
     class Meta:
         ordering = ['-created_at']
+        # Checked against the hot queries' plans by QueryPlanTests (portfolio/queryplans.py)
+        indexes = [
+            # LogsView's pinned logs, a handful of rows. (The latest unpinned ones
+            # are the first few in log_created_idx.)
+            models.Index(fields=['-created_at'], condition=models.Q(is_pinned=True), name='log_pinned_idx'),
+            # AllLogsView's sorts, with pk as the keyset tie-breaker (portfolio/pagination.py)
+            models.Index(fields=['created_at', 'id'], name='log_created_idx'),
+            models.Index(fields=['title', 'id'], name='log_title_idx'),
+            # The logs watermark (conditional.py) reads this instead of the table
+            models.Index(fields=['updated_at'], name='log_updated_idx'),
+        ]
 
 class LogSection(models.Model):
     log_entry = models.ForeignKey(LogEntry, related_name='sections', on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
     content = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+    # content as sanitized HTML, as the detail fragment shows it (portfolio/rendering.py)
+    rendered_html = models.TextField(blank=True, default='', editable=False)
+    renderer_version = models.PositiveSmallIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"{self.log_entry.title} - {self.title}"
+
+    def render(self):
+        self.rendered_html = rendering.render(self.content)
+        self.renderer_version = rendering.VERSION
+
+    def save(self, *args, **kwargs):
+        self.render()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'rendered_html', 'renderer_version'}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        # log_entry has the ForeignKey's own index; this is for the logs watermark,
+        # which would otherwise read every section's content to find the latest
+        indexes = [
+            models.Index(fields=['updated_at'], name='section_updated_idx'),
+        ]
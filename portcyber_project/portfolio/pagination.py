@@ -0,0 +1,96 @@
+"""Keyset (cursor) pagination for log listings.
+
+A cursor holds the sort value and pk of the last row shown, so the next page
+is a range scan that starts right after it, however deep into the archive.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+# Sort choice -> (field, ascending). pk breaks ties so every row has one position.
+SORTS = {
+    '-created_at': ('created_at', False),
+    'created_at': ('created_at', True),
+    'title': ('title', True),
+    '-title': ('title', False),
+}
+DEFAULT_SORT = '-created_at'
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Cursor dict, or None for a missing or mangled cursor (treated as page one)"""
+    if not token:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def keyset_page(queryset, sort, cursor=None, page_size=PAGE_SIZE):
+    """One page of queryset in sort order, plus the cursor for the next page (or None)"""
+    queryset, field = keyset_query(queryset, sort, cursor)
+    return next_page(list(queryset[:page_size + 1]), field, page_size)
+
+
+async def akeyset_page(queryset, sort, cursor=None, page_size=PAGE_SIZE):
+    """keyset_page() using the async ORM"""
+    queryset, field = keyset_query(queryset, sort, cursor)
+    return next_page([row async for row in queryset[:page_size + 1]], field, page_size)
+
+
+def keyset_query(queryset, sort, cursor):
+    """queryset ordered by sort and starting after the cursor, plus the sort field"""
+    field, ascending = SORTS.get(sort, SORTS[DEFAULT_SORT])
+    direction = '' if ascending else '-'
+    queryset = queryset.order_by(f'{direction}{field}', f'{direction}pk')
+
+    position = cursor_position(queryset.model._meta.get_field(field), cursor)
+    if position is not None:
+        value, pk = position
+        after = 'gt' if ascending else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'pk__{after}': pk})
+        )
+    return queryset, field
+
+
+def cursor_position(model_field, cursor):
+    """(sort value, pk) a cursor starts after, or None if it has none or they don't fit (page one)"""
+    if not cursor or 'v' not in cursor or 'pk' not in cursor:
+        return None
+    try:
+        value = model_field.to_python(cursor['v'])
+        pk = int(cursor['pk'])
+    except (ValidationError, ValueError, TypeError):
+        return None
+    return (value, pk) if value is not None else None
+
+
+def next_page(rows, field, page_size):
+    """Trim the one-row lookahead and build the next cursor from the last row"""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    value = getattr(last, field)
+    return rows, encode_cursor({'v': value.isoformat() if hasattr(value, 'isoformat') else value, 'pk': last.pk})
+
+
+def offset_page(items, cursor=None, page_size=PAGE_SIZE):
+    """Paginate an already ordered, bounded list (e.g. ranked search hits)"""
+    offset = cursor.get('offset', 0) if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        offset = 0
+    page = items[offset:offset + page_size]
+    has_next = len(items) > offset + page_size
+    return page, encode_cursor({'offset': offset + page_size}) if has_next else None
@@ -0,0 +1,101 @@
+"""Query plans of the hot read paths, for catching a lost index.
+
+QueryPlanTests requests each hot view, EXPLAINs every query it made on the log
+and contact tables, and fails if any of them reads a whole table. The plans
+come from whichever database the tests run on: SQLite by default, Postgres with
+DATABASE_URL pointing at one.
+
+Reading an index from end to end is allowed: that's how COUNT() and the logs
+watermark work, and an ordered index scan under a LIMIT stops early. Postgres
+is asked for its plans with sequential scans disabled, so on a test database
+small enough to scan it still uses an index whenever it has one.
+"""
+import re
+
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+TABLES = ['portfolio_logentry', 'portfolio_logsection', 'portfolio_contactsubmission']
+
+# SQLite: "SCAN portfolio_logentry" or "SCAN portfolio_logentry USING INDEX x",
+# unlike "SEARCH ..." or "SCAN ... USING COVERING INDEX ..."
+SQLITE_SCAN = re.compile(r'SCAN (\w+)(?: AS \w+)?(?: USING INDEX (\w+))?')
+POSTGRES_SCAN = re.compile(r'(?:Seq Scan|Full Index Scan(?: using (\w+))?) on (\w+)')
+
+
+def explain(sql):
+    """The plan for a query, as lines of text"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                return list(postgres_nodes(cursor.fetchone()[0][0]['Plan']))
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def postgres_nodes(plan):
+    """'<Node Type> on <table>' for every node of a Postgres JSON plan.
+
+    An Index Scan with no Index Cond reads the whole index, and the table
+    with it; it's reported as a 'Full Index Scan using <index>'.
+    """
+    node = plan['Node Type']
+    if node == 'Index Scan' and 'Index Cond' not in plan:
+        node = f"Full Index Scan using {plan['Index Name']}"
+    relation = plan.get('Relation Name')
+    yield f"{node} on {relation}" if relation else node
+    for child in plan.get('Plans', []):
+        yield from postgres_nodes(child)
+
+
+def partial_indexes():
+    return {
+        index.name
+        for model in apps.get_app_config('portfolio').get_models()
+        for index in model._meta.indexes
+        if index.condition is not None
+    }
+
+
+def table_scans(plan, limited=False):
+    """Tables in TABLES that a plan reads in full.
+
+    Walking a table in the order of an index reads it all unless there's a
+    LIMIT (limited) to stop it early, or the index is a partial one that
+    only holds the rows wanted.
+    """
+    scanned = []
+    pattern = POSTGRES_SCAN if connection.vendor == 'postgresql' else SQLITE_SCAN
+    for line in plan:
+        match = pattern.fullmatch(line)
+        if not match:
+            continue
+        table, index = (match.group(2), match.group(1)) if pattern is POSTGRES_SCAN else match.groups()
+        if table in TABLES and not (index and (limited or index in partial_indexes())):
+            scanned.append(table)
+    return scanned
+
+
+def limited(sql):
+    return re.search(r'\bLIMIT \d+', sql) is not None
+
+
+def plans(request):
+    """{sql: plan} for each query on TABLES that request() makes (with its parameters filled in)"""
+    with CaptureQueriesContext(connection) as queries:
+        request()
+    return {
+        query['sql']: explain(query['sql'])
+        for query in queries.captured_queries
+        if query['sql'].startswith('SELECT') and any(f'"{table}"' in query['sql'] for table in TABLES)
+    }
+
+
+def scans(request):
+    """{sql: plan} for each query request() makes that reads a whole table in TABLES"""
+    return {sql: plan for sql, plan in plans(request).items() if table_scans(plan, limited(sql))}
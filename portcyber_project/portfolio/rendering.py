@@ -0,0 +1,111 @@
+"""LogSection content to sanitized HTML, once, when the section is saved.
+
+Sections are written in the admin as HTML with plain line breaks. render()
+keeps an allowlist of formatting tags and attributes, drops scripts, styles,
+event handlers and javascript: URLs, escapes everything else as text, and
+turns line breaks into <br> as the linebreaksbr filter did when the detail
+template rendered the raw content on every request. LogSection.save() stores
+the result in rendered_html along with VERSION, and the template outputs it
+as is.
+
+Bump VERSION whenever render()'s output changes, and run rerender_sections
+to bring the stored HTML up to date.
+"""
+import html
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+VERSION = 1
+
+# Tag -> attributes it may keep (besides GLOBAL_ATTRIBUTES)
+ALLOWED = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    **dict.fromkeys([
+        'b', 'strong', 'i', 'em', 'u', 's', 'mark', 'small', 'sub', 'sup',
+        'code', 'pre', 'kbd', 'samp', 'p', 'div', 'span', 'blockquote',
+        'ul', 'ol', 'li', 'h3', 'h4', 'h5', 'h6',
+        'table', 'thead', 'tbody', 'tr', 'th', 'td', 'br', 'hr',
+    ], frozenset()),
+}
+GLOBAL_ATTRIBUTES = {'class'}
+VOID = {'br', 'hr', 'img'}
+# Dropped with everything inside them; other unknown tags just lose the tag
+DROPPED = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript', 'svg', 'math', 'head', 'title'}
+URL_ATTRIBUTES = {'href', 'src'}
+SAFE_SCHEMES = {'', 'http', 'https', 'mailto'}
+
+
+def safe_url(value):
+    # Browsers ignore whitespace and control characters inside a scheme ("java\tscript:")
+    compact = ''.join(char for char in value if char > ' ' and char != '\x7f')
+    try:
+        return urlsplit(compact).scheme.lower() in SAFE_SCHEMES
+    except ValueError:
+        return False
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open = []  # Allowed tags still open, innermost last
+        self.dropping = None  # [tag, nesting] of the dropped element we're inside
+
+    def keep(self, tag, name, value):
+        if value is None or (name not in ALLOWED[tag] and name not in GLOBAL_ATTRIBUTES):
+            return False
+        return name not in URL_ATTRIBUTES or safe_url(value)
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropping:
+            if tag == self.dropping[0]:
+                self.dropping[1] += 1
+            return
+        if tag in DROPPED:
+            self.dropping = [tag, 1]
+            return
+        if tag not in ALLOWED:
+            return
+        kept = [(name, value) for name, value in attrs if self.keep(tag, name, value)]
+        if tag == 'a':
+            kept.append(('rel', 'nofollow noopener'))
+        attributes = ''.join(f' {name}="{html.escape(value)}"' for name, value in kept)
+        self.out.append(f'<{tag}{attributes}>')
+        if tag not in VOID:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag == self.dropping[0]:
+                self.dropping[1] -= 1
+                if not self.dropping[1]:
+                    self.dropping = None
+            return
+        if tag in self.open:
+            # Closes whatever was left open inside it too
+            while (inner := self.open.pop()) != tag:
+                self.out.append(f'</{inner}>')
+            self.out.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        text = html.escape(data, quote=False)
+        if 'pre' not in self.open:
+            text = text.replace('\r\n', '\n').replace('\r', '\n').replace('\n', '<br>')
+        self.out.append(text)
+
+    def close(self):
+        super().close()
+        while self.open:
+            self.out.append(f'</{self.open.pop()}>')
+
+
+def render(content):
+    """Sanitized HTML for a section's content"""
+    sanitizer = Sanitizer()
+    sanitizer.feed(content)
+    sanitizer.close()
+    return ''.join(sanitizer.out)
@@ -0,0 +1,101 @@
+"""Read replicas: the read-only views read from a replica, everything else from the primary.
+
+Views opt in with replica_reads (the log fragments and site stats do, and so
+does the batch endpoint that renders them). Anything not marked, the admin
+included, reads from and writes to the primary, so a view can't see stale data
+by accident.
+
+Reads after a write go to the primary until the replicas have caught up:
+within the request, once anything has been written, and for the next
+REPLICA_STICKY_SECONDS after it via a cookie, so whoever claimed a reward or
+sent the contact form sees it on their next request. (select_for_update() and
+other querysets meant for writing are routed as writes.) A view that queues a
+write for later (the contact form, see portfolio/ingest.py) calls queued() so
+its client sticks too, for as much longer as the write may take to land.
+
+DatabaseRoutingMiddleware (portfolio/middleware.py) opens the per-request
+Routing that the decorator and the router share. Without replicas configured
+it isn't installed and every query goes to the primary.
+"""
+import contextvars
+import math
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'db_primary'
+
+current = contextvars.ContextVar('database_routing', default=None)
+
+
+class Routing:
+    def __init__(self, sticky=False):
+        self.replica = random.choice(settings.DATABASE_REPLICAS)  # One per request, for a consistent read
+        self.sticky = sticky  # Wrote recently: read from the primary
+        self.replica_reads = False
+        self.wrote = False
+        self.write_delay = 0  # Seconds until a queued write lands
+
+    def read_alias(self):
+        if not self.replica_reads or self.sticky or self.wrote:
+            return DEFAULT_DB_ALIAS
+        return self.replica
+
+
+def replica_reads(view):
+    """Let a read-only view read from a replica"""
+    def allow():
+        routing = current.get()
+        if routing is not None:
+            routing.replica_reads = True
+
+    if iscoroutinefunction(view):
+        async def wrapper(*args, **kwargs):
+            allow()
+            return await view(*args, **kwargs)
+    else:
+        def wrapper(*args, **kwargs):
+            allow()
+            return view(*args, **kwargs)
+    return wraps(view)(wrapper)
+
+
+def queued(delay):
+    """Count a write queued to land within delay seconds as written by this request"""
+    routing = current.get()
+    if routing is not None:
+        routing.wrote = True
+        routing.write_delay = max(routing.write_delay, delay)
+
+
+def finish(routing, response):
+    """Keep the client on the primary for a while after a write"""
+    if routing.wrote:
+        max_age = settings.REPLICA_STICKY_SECONDS + math.ceil(routing.write_delay)
+        response.set_cookie(STICKY_COOKIE, '1', max_age=max_age, httponly=True, samesite='Lax')
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # Related objects come from the same database
+        routing = current.get()
+        return routing.read_alias() if routing is not None else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        routing = current.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema by replication
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,254 @@
+"""Full-text search over logs.
+
+Each LogEntry has one row in the portfolio_logsearch side table holding its
+title and the plain text of all its sections. On SQLite that table is an FTS5
+index with the porter stemmer; on Postgres it holds weighted tsvectors behind
+GIN indexes. Other databases fall back to icontains. Rows are kept current by
+portfolio/signals.py; rebuild_search_index regenerates them all.
+
+search() returns ranked hits, at most RESULT_LIMIT of them for a listing
+by relevance; matching() is every match, as a subquery to filter logs with.
+
+Searches go to the database the router picks for reading logs (a replica,
+unless the request wrote: see portfolio/routers.py), index writes to the one
+it picks for writing them (or the one a signal says the log was saved to).
+"""
+import html
+import re
+from dataclasses import dataclass
+
+from django.db import connection, connections, router, transaction
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+
+from .models import LogEntry, LogSection
+
+TABLE = 'portfolio_logsearch'
+RESULT_LIMIT = 200
+
+# Highlight markers that survive escaping, swapped for <mark> afterwards
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+
+@dataclass
+class SearchHit:
+    pk: int
+    rank: float
+    snippet: str  # Safe HTML: escaped text with <mark> around matches
+
+
+def terms(query):
+    """Words of a user query; everything else is dropped so it can't inject query syntax"""
+    return re.findall(r'\w+', query.lower())
+
+
+def document(log_entry, contents=None):
+    """Plain text indexed for a log: its sections in display order"""
+    if contents is None:
+        contents = log_entry.sections.order_by('pk').values_list('content', flat=True)
+    return "\n\n".join(html.unescape(strip_tags(content)).strip() for content in contents)
+
+
+def highlight(text):
+    return escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SqliteBackend:
+    create_sql = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+        "title, body, tokenize='porter unicode61 remove_diacritics 2')",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def index(self, cursor, pk, title, body):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk])
+        cursor.execute(f"INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)", [pk, title, body])
+
+    def remove(self, cursor, pk):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk])
+
+    def match(self, words, include_content):
+        # Every word must match, as a prefix, so "config" also finds "configuration"
+        match = ' '.join(f'"{word}"*' for word in words)
+        return match if include_content else f'{{title}} : ({match})'
+
+    def matching_sql(self, words, include_content):
+        return f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s", [self.match(words, include_content)]
+
+    def search(self, cursor, words, include_content, limit, pks):
+        where, params = '', [MARK_START, MARK_END, self.match(words, include_content)]
+        if pks is not None:
+            where = f" AND rowid IN ({', '.join(['%s'] * len(pks))})"
+            params += pks
+        cursor.execute(
+            f"SELECT rowid, bm25({TABLE}, 10.0, 1.0) AS rank, "
+            f"snippet({TABLE}, 1, %s, %s, '…', 24) "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s{where} ORDER BY rank LIMIT %s",
+            [*params, -1 if limit is None else limit],
+        )
+        # bm25() is lower-is-better; flip it so higher rank means more relevant everywhere
+        return [(pk, -rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+class PostgresBackend:
+    config = 'english'
+    create_sql = [
+        f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+        "log_entry_id bigint PRIMARY KEY REFERENCES portfolio_logentry (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "title text NOT NULL, body text NOT NULL, "
+        "title_document tsvector NOT NULL, document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_title_gin ON {TABLE} USING gin (title_document)",
+        f"CREATE INDEX IF NOT EXISTS {TABLE}_document_gin ON {TABLE} USING gin (document)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {TABLE}"]
+
+    def index(self, cursor, pk, title, body):
+        cursor.execute(
+            f"INSERT INTO {TABLE} (log_entry_id, title, body, title_document, document) "
+            f"VALUES (%s, %s, %s, to_tsvector('{self.config}', %s), "
+            f"setweight(to_tsvector('{self.config}', %s), 'A') || setweight(to_tsvector('{self.config}', %s), 'B')) "
+            f"ON CONFLICT (log_entry_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, "
+            f"title_document = EXCLUDED.title_document, document = EXCLUDED.document",
+            [pk, title, body, title, title, body],
+        )
+
+    def remove(self, cursor, pk):
+        cursor.execute(f"DELETE FROM {TABLE} WHERE log_entry_id = %s", [pk])
+
+    def tsquery(self, words):
+        return ' & '.join(f'{word}:*' for word in words)
+
+    def matching_sql(self, words, include_content):
+        column = 'document' if include_content else 'title_document'
+        return (
+            f"SELECT log_entry_id FROM {TABLE} WHERE {column} @@ to_tsquery('{self.config}', %s)",
+            [self.tsquery(words)],
+        )
+
+    def search(self, cursor, words, include_content, limit, pks):
+        column = 'document' if include_content else 'title_document'
+        where, params = '', [f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=12', self.tsquery(words)]
+        if pks is not None:
+            where = " AND log_entry_id = ANY(%s)"
+            params.append(list(pks))
+        cursor.execute(
+            f"SELECT log_entry_id, ts_rank_cd({column}, q) AS rank, "
+            f"ts_headline('{self.config}', body, q, %s) "
+            f"FROM {TABLE}, to_tsquery('{self.config}', %s) q "
+            f"WHERE {column} @@ q{where} ORDER BY rank DESC LIMIT %s",
+            [*params, limit],  # LIMIT NULL is no limit
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': SqliteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(conn=None):
+    """Index backend for a connection's database, or None to use icontains"""
+    backend = BACKENDS.get((conn or connection).vendor)
+    return backend() if backend else None
+
+
+def read_connection():
+    return connections[router.db_for_read(LogEntry)]
+
+
+def write_connection(using=None):
+    return connections[using or router.db_for_write(LogEntry)]
+
+
+def index_log(log_entry, using=None):
+    conn = write_connection(using)
+    backend = get_backend(conn)
+    if backend:
+        with conn.cursor() as cursor:
+            backend.index(cursor, log_entry.pk, log_entry.title, document(log_entry))
+
+
+def index_logs(entries):
+    """Index (log_entry, section contents) pairs, for logs bulk_create added"""
+    conn = write_connection()
+    backend = get_backend(conn)
+    if backend:
+        with conn.cursor() as cursor:
+            for log_entry, contents in entries:
+                backend.index(cursor, log_entry.pk, log_entry.title, document(log_entry, contents))
+
+
+def remove_log(pk, using=None):
+    conn = write_connection(using)
+    backend = get_backend(conn)
+    if backend:
+        with conn.cursor() as cursor:
+            backend.remove(cursor, pk)
+
+
+def rebuild():
+    """Reindex every log (after bulk loads, which bypass the signals)"""
+    conn = write_connection()
+    backend = get_backend(conn)
+    if backend is None:
+        return 0
+    sections = Prefetch('sections', queryset=LogSection.objects.order_by('pk').only('log_entry_id', 'content'))
+    logs = LogEntry.objects.using(conn.alias).only('pk', 'title').prefetch_related(sections)
+    count = 0
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        for log_entry in logs.iterator(chunk_size=500):
+            contents = [section.content for section in log_entry.sections.all()]
+            backend.index(cursor, log_entry.pk, log_entry.title, document(log_entry, contents))
+            count += 1
+    return count
+
+
+def search(query, include_content=False, limit=RESULT_LIMIT, pks=None, using=None):
+    """Ranked hits for a user query, most relevant first.
+
+    limit=None returns every hit; pks only looks at those logs (the snippets
+    for a page of a listing). using overrides the router's choice of database.
+    """
+    words = terms(query)
+    if not words or pks is not None and not pks:
+        return []
+
+    conn = connections[using] if using else read_connection()
+    backend = get_backend(conn)
+    if backend is None:
+        return fallback_search(words, include_content, limit, pks, conn.alias)
+
+    with conn.cursor() as cursor:
+        rows = backend.search(cursor, words, include_content, limit, pks)
+    return [SearchHit(pk, rank, highlight(snippet or '')) for pk, rank, snippet in rows]
+
+
+def matching(query, include_content=False):
+    """Every log matching a user query, as a subquery for pk__in (unranked and unlimited)"""
+    words = terms(query)
+    if not words:
+        return LogEntry.objects.none().values('pk')
+    backend = get_backend(read_connection())
+    if backend is None:
+        return fallback_matches(words, include_content).values('pk')
+    return RawSQL(*backend.matching_sql(words, include_content))
+
+
+def fallback_matches(words, include_content):
+    """The original icontains scan, for databases without an index backend"""
+    condition = Q()
+    for word in words:
+        match = Q(title__icontains=word)
+        if include_content:
+            match |= Q(sections__content__icontains=word)
+        condition &= match
+    return LogEntry.objects.filter(condition).distinct()
+
+
+def fallback_search(words, include_content, limit, pks, using):
+    matches = fallback_matches(words, include_content).using(using)
+    if pks is not None:
+        matches = matches.filter(pk__in=pks)
+    return [SearchHit(pk, 0.0, '') for pk in matches.values_list('pk', flat=True)[:limit]]
@@ -0,0 +1,72 @@
+"""Synthetic content for benchmarks. Never used by the site itself."""
+import itertools
+import random
+
+from .models import ContactSubmission, LogEntry, LogSection, content_metrics
+
+# Real words sprinkled into the synthetic text so benchmarks have something to look for
+TOPICS = [
+    'deployment', 'latency', 'database', 'migration', 'security', 'kubernetes',
+    'frontend', 'caching', 'outage', 'refactor', 'monitoring', 'pipeline',
+]
+
+
+def vocabulary(rng, size=5000):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = {''.join(rng.choices(letters, k=rng.randint(3, 10))) for _ in range(size)}
+    return sorted(words) + TOPICS
+
+
+def seed_logs(entries, sections_per_entry=5, words_per_section=120, seed=0, batch_size=1000):
+    """Bulk-insert LogEntry/LogSection rows with Zipf-distributed words.
+
+    Stored metrics and rendered HTML are filled in here; bulk_create skips the
+    signals, so call search.rebuild() afterwards if the search index is needed.
+    """
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    created = 0
+
+    while created < entries:
+        count = min(batch_size, entries - created)
+        contents = [
+            [' '.join(rng.choices(words, cum_weights=weights, k=words_per_section)) for _ in range(sections_per_entry)]
+            for _ in range(count)
+        ]
+        logs = LogEntry.objects.bulk_create([
+            LogEntry(
+                title=' '.join(rng.choices(words, cum_weights=weights, k=4)).title(),
+                log_date='JANUARY 2026',
+                status=rng.choice(['ACTIVE', 'RESOLVED', 'ARCHIVED']),
+                entry_type=rng.choice(['INCIDENT', 'BUILD', 'NOTE']),
+                is_pinned=rng.random() < 0.05,
+                **content_metrics(sections),
+            )
+            for sections in contents
+        ])
+        sections = [
+            LogSection(log_entry=log, title=f'Section {index + 1}', content=content)
+            for log, sections in zip(logs, contents)
+            for index, content in enumerate(sections)
+        ]
+        for section in sections:
+            section.render()
+        LogSection.objects.bulk_create(sections, batch_size=batch_size)
+        created += count
+    return created
+
+
+def seed_contacts(count, words_per_message=60, seed=0, batch_size=1000):
+    """Bulk-insert ContactSubmission rows (submitted_at is set to now by auto_now_add)"""
+    rng = random.Random(seed)
+    words = vocabulary(rng)
+    ContactSubmission.objects.bulk_create([
+        ContactSubmission(
+            name=f'Visitor {index}',
+            email=f'visitor{index}@example.com',
+            message=' '.join(rng.choices(words, k=words_per_message)),
+        )
+        for index in range(count)
+    ], batch_size=batch_size)
+    return count
@@ -0,0 +1,66 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, export, logcache, search
+from .models import LogEntry, LogSection, SiteStats
+
+
+@receiver(post_save, sender=LogSection)
+@receiver(post_delete, sender=LogSection)
+def update_log_metrics(sender, instance, **kwargs):
+    """Keep LogEntry's content metrics and excerpt in step with its sections"""
+    try:
+        log_entry = instance.log_entry
+    except LogEntry.DoesNotExist:
+        return  # The entry itself is being deleted
+    log_entry.refresh_content_metrics()
+
+
+@receiver(post_save, sender=LogEntry)
+def index_log_entry(sender, instance, using, **kwargs):
+    search.index_log(instance, using)
+
+
+@receiver(post_delete, sender=LogEntry)
+def unindex_log_entry(sender, instance, using, **kwargs):
+    search.remove_log(instance.pk, using)
+
+
+@receiver(post_save, sender=LogSection)
+@receiver(post_delete, sender=LogSection)
+def reindex_log_sections(sender, instance, using, **kwargs):
+    try:
+        log_entry = instance.log_entry
+    except LogEntry.DoesNotExist:
+        return
+    search.index_log(log_entry, using)
+
+
+@receiver(post_save, sender=LogEntry)
+@receiver(post_delete, sender=LogEntry)
+def invalidate_log_fragments(sender, instance, created=False, **kwargs):
+    logcache.log_changed(instance.pk, is_pinned=instance.is_pinned, created=created)
+
+
+@receiver(post_save, sender=LogSection)
+@receiver(post_delete, sender=LogSection)
+def invalidate_section_fragments(sender, instance, **kwargs):
+    logcache.log_changed(instance.log_entry_id)
+
+
+@receiver(post_save, sender=LogEntry)
+@receiver(post_delete, sender=LogEntry)
+def forget_exported_log(sender, instance, **kwargs):
+    export.log_changed(instance.pk)
+
+
+@receiver(post_save, sender=LogSection)
+@receiver(post_delete, sender=LogSection)
+def forget_exported_section(sender, instance, **kwargs):
+    export.log_changed(instance.log_entry_id)
+
+
+@receiver(post_save, sender=SiteStats)
+@receiver(post_delete, sender=SiteStats)
+def invalidate_site_stats(sender, **kwargs):
+    counters.forget()
@@ -10,6 +10,11 @@ class BootSequence {
     }
 
     start() {
+        // Fetch the first modules in one round trip while the boot screen shows
+        if (window.warmFragments) {
+            window.warmFragments(['dashboard', 'logs', 'services']);
+        }
+
         // Listen for Enter key or click
         document.addEventListener('keydown', (e) => {
             if (e.key === 'Enter' && !this.booted) {
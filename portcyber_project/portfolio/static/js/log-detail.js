@@ -37,15 +37,12 @@ function _openLogDetailOverlay(logId) {
     document.body.style.overflow = 'hidden';
     overlay.scrollTop = 0;
 
-    // Fetch log data with enhanced error handling
-    fetch(`/api/content/log/${logId}/`)
-        .then(response => {
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.text();
-        })
+    // Fetch log data with enhanced error handling (through navigation.js,
+    // which uses the exported copy if there is one)
+    const url = `/api/content/log/${logId}/`;
+    window.fetchFragment(url)
         .then(html => {
+            if (window.trackView) window.trackView(url);
             // Add a small delay for smooth transition
             overlayTimeout = setTimeout(() => {
                 overlayContent.innerHTML = html;
@@ -50,6 +50,183 @@ const navigationConfig = {
     }
 };
 
+// Client-side fragment cache: the last body per URL with its ETag, least
+// recently used first (a Map keeps insertion order). Entries checked within
+// FRAGMENT_FRESH_MS are used as-is, so a prefetched module opens without a
+// round trip; older ones are revalidated with If-None-Match and come back as
+// an empty 304 while unchanged. Fragments without an ETag (the connect form
+// carries a per-visitor CSRF token) are never stored.
+const FRAGMENT_CACHE_LIMIT = 16;
+const FRAGMENT_FRESH_MS = 30000;
+const fragmentStore = new Map();
+const fragmentRequests = new Map(); // In-flight requests, shared by prefetching and navigation
+
+function storeFragment(url, etag, html) {
+    fragmentStore.delete(url);
+    fragmentStore.set(url, { etag, html, checkedAt: Date.now() });
+    while (fragmentStore.size > FRAGMENT_CACHE_LIMIT) {
+        fragmentStore.delete(fragmentStore.keys().next().value);
+    }
+}
+
+// Fragments prerendered by export_fragments (portfolio/export.py): API path ->
+// static file named after its content, which the browser caches for good.
+// The shell lists the fixed routes; the log details are in the log index,
+// fetched the first time a log is. Anything not listed, or gone by the time
+// it's fetched, comes from Django.
+const exportedFragments = (() => {
+    const data = document.getElementById('exported-fragments');
+    return data ? JSON.parse(data.textContent) : { routes: {}, logs: null };
+})();
+let exportedLogs = null; // Promise of the log index
+
+function exportedFile(url) {
+    if (exportedFragments.routes[url]) return Promise.resolve(exportedFragments.routes[url]);
+    if (!exportedFragments.logs || !url.startsWith(exportedFragments.log_prefix)) return Promise.resolve(null);
+    if (!exportedLogs) {
+        exportedLogs = fetch(exportedFragments.logs)
+            .then(response => response.ok ? response.json() : {})
+            .catch(() => ({}));
+    }
+    return exportedLogs.then(index => index[url] || null);
+}
+
+function fetchFragment(url) {
+    const cached = fragmentStore.get(url);
+    if (cached && Date.now() - cached.checkedAt < FRAGMENT_FRESH_MS) {
+        fragmentStore.delete(url);
+        fragmentStore.set(url, cached); // Now the most recently used
+        return Promise.resolve(cached.html);
+    }
+    if (fragmentRequests.has(url)) {
+        return fragmentRequests.get(url);
+    }
+
+    const request = exportedFile(url)
+        .then(file => file ? fetchExported(url, file, cached) : requestFragment(url, cached))
+        .finally(() => fragmentRequests.delete(url));
+    fragmentRequests.set(url, request);
+    return request;
+}
+
+function fetchExported(url, file, cached) {
+    return fetch(file).then(response => {
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        return response.text();
+    }).then(html => {
+        storeFragment(url, file, html);
+        return html;
+    }, () => requestFragment(url, cached));
+}
+
+function requestFragment(url, cached) {
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    return fetch(url, { headers }).then(response => {
+        if (response.status === 304 && cached) {
+            storeFragment(url, cached.etag, cached.html);
+            return cached.html;
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.text().then(html => {
+            const etag = response.headers.get('ETag');
+            if (etag) storeFragment(url, etag, html);
+            return html;
+        });
+    });
+}
+
+function prefetchFragment(url) {
+    if (typeof url === 'string') fetchFragment(url).catch(() => {}); // Best effort
+}
+
+// Fetch several modules' fragments in one round trip from /api/content/batch/.
+// Until it answers, each URL's in-flight request is the batch, so loading one
+// of those modules waits for it rather than fetching again; if the batch
+// fails, they fall back to fetching on their own.
+function warmFragments(moduleNames) {
+    const wanted = moduleNames
+        .map(name => navigationConfig[name] && navigationConfig[name].path)
+        .filter(url => typeof url === 'string' && !fragmentStore.has(url) && !fragmentRequests.has(url));
+    // Exported fragments are static files; the batch is for the rest
+    wanted.filter(url => exportedFragments.routes[url]).forEach(prefetchFragment);
+    const urls = wanted.filter(url => !exportedFragments.routes[url]);
+    if (!urls.length) return Promise.resolve();
+
+    const query = urls.map(url => `path=${encodeURIComponent(url)}`).join('&');
+    const batch = fetch(`/api/content/batch/?${query}`).then(response => {
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        return response.json();
+    });
+
+    urls.forEach(url => {
+        const request = batch.then(data => {
+            const fragment = data.fragments[url];
+            if (!fragment || fragment.status !== 200) throw new Error(`Batch status: ${fragment && fragment.status}`);
+            if (fragment.etag) storeFragment(url, fragment.etag, fragment.html);
+            return fragment.html;
+        }).then(html => {
+            fragmentRequests.delete(url);
+            return html;
+        }, () => {
+            fragmentRequests.delete(url);
+            return fetchFragment(url);
+        });
+        fragmentRequests.set(url, request);
+        request.catch(() => {});
+    });
+    return batch.then(() => {}, () => {});
+}
+
+// Where visitors usually go next from each module; prefetched once idle
+const likelyNextModules = {
+    dashboard: ['logs', 'services', 'achievements'],
+    logs: ['all_logs', 'dashboard'],
+    all_logs: ['logs'],
+    achievements: ['creations', 'dashboard'],
+    creations: ['services', 'dashboard'],
+    services: ['dashboard', 'logs'],
+    profile: ['dashboard'],
+};
+
+function prefetchWhenIdle(moduleName) {
+    const next = likelyNextModules[moduleName];
+    if (!next) return;
+    const whenIdle = window.requestIdleCallback || (callback => setTimeout(callback, 1500));
+    whenIdle(() => warmFragments(next));
+}
+
+// Count a module view (portfolio/analytics.py). Sent for every module shown,
+// wherever its fragment came from, and never for prefetches; a beacon, so it
+// doesn't hold anything up and still goes out when the page is closing.
+function trackView(url) {
+    if (navigator.sendBeacon) {
+        navigator.sendBeacon('/api/analytics/view/', new URLSearchParams({ path: url }));
+    }
+}
+
+window.warmFragments = warmFragments;
+window.fetchFragment = fetchFragment;
+window.trackView = trackView;
+
+// theme.css loads without blocking the shell (see {% shell_styles %}). If a
+// module is shown before it has arrived, link that module's critical CSS so
+// the module doesn't render unstyled.
+function ensureModuleStyles(moduleName) {
+    const theme = document.getElementById('theme-stylesheet');
+    const criticalData = document.getElementById('critical-css');
+    if (!theme || theme.rel === 'stylesheet' || !criticalData) return;
+
+    const href = JSON.parse(criticalData.textContent)[moduleName];
+    if (href && !document.querySelector(`link[href="${href}"]`)) {
+        const link = document.createElement('link');
+        link.rel = 'stylesheet';
+        link.href = href;
+        document.head.appendChild(link);
+    }
+}
+
 // Expose loadModule globally for inline HTML onclick attributes
 window.loadModule = loadModule;
 window.loadContent = loadContent;
@@ -120,6 +297,8 @@ function loadContent(moduleName, id = null) { // Accept id parameter
         return Promise.reject(e);
     }
 
+    ensureModuleStyles(moduleName);
+
     // Determine fetch URL
     let fetchPath = navigationConfig[moduleName].path;
     if (typeof fetchPath === 'function') {
@@ -127,16 +306,7 @@ function loadContent(moduleName, id = null) { // Accept id parameter
     }
 
     // Fetch content
-    return fetch(fetchPath)
-        .then(response => {
-            console.log(`[NAV] Fetch response received for ${moduleName}:`, response);
-            if (!response.ok) {
-                const errorText = `HTTP error! status: ${response.status}`;
-                console.error(`[NAV] ${errorText}`);
-                throw new Error(errorText);
-            }
-            return response.text();
-        })
+    return fetchFragment(fetchPath)
         .then(html => {
             console.log(`[NAV] HTML content fetched for ${moduleName}. Length: ${html.length}`);
             contentLoader.style.display = 'none'; // Hide loader
@@ -158,13 +328,9 @@ function loadContent(moduleName, id = null) { // Accept id parameter
             // Announce to system
             window.systemState.addToHistory(`Loaded ${moduleName} module`);
 
-            // Analytics tracking (if trackModuleAccess is defined)
-            if (typeof trackModuleAccess === 'function') {
-                trackModuleAccess(moduleName);
-            } else {
-                console.warn('[NAV] trackModuleAccess function not found.');
-            }
+            trackView(fetchPath);
             console.log(`[NAV] Interactions initialized and history updated for ${moduleName}.`);
+            prefetchWhenIdle(moduleName);
 
         })
         .catch(error => {
@@ -197,6 +363,9 @@ function updateNavTabs() {
                 e.preventDefault();
                 loadModule(key);
             };
+            // Hovering or focusing a tab is a good hint it will be opened next
+            tab.addEventListener('mouseenter', () => prefetchFragment(config.path));
+            tab.addEventListener('focus', () => prefetchFragment(config.path));
             navTabs.appendChild(tab);
         }
     });
@@ -402,8 +571,7 @@ function reloadModuleWithQuery(moduleName, queryString) {
     let fetchPath = navigationConfig[moduleName].path;
     fetchPath += queryString;
 
-    fetch(fetchPath)
-        .then(response => response.text())
+    fetchFragment(fetchPath)
         .then(html => {
             contentLoader.style.display = 'none';
             mainContent.innerHTML = html;
@@ -480,6 +648,118 @@ function initAllLogsInteractions() {
     }
 }
 
+// Infinite scroll for ALL SYSTEM LOGS: the server ends each page with a
+// .log-page-sentinel holding the URL of the next one (a keyset cursor), so
+// only that page is fetched when the sentinel scrolls into view.
+let logsPageObserver = null;
+
+function initLogsInfiniteScroll() {
+    if (logsPageObserver) logsPageObserver.disconnect();
+    const container = document.querySelector('.log-container');
+    if (!container || !('IntersectionObserver' in window)) return;
+
+    logsPageObserver = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) loadNextLogsPage(entry.target);
+        });
+    }, { rootMargin: '400px 0px' });
+
+    const sentinel = container.querySelector('.log-page-sentinel');
+    if (sentinel) logsPageObserver.observe(sentinel);
+}
+
+function loadNextLogsPage(sentinel) {
+    if (sentinel.dataset.loading) return;
+    sentinel.dataset.loading = 'true';
+    logsPageObserver.unobserve(sentinel);
+
+    fetchFragment(sentinel.dataset.nextUrl)
+        .then(html => {
+            const page = document.createElement('div');
+            page.innerHTML = html;
+            initLogsInteractions(page);
+
+            const next = page.querySelector('.log-page-sentinel');
+            sentinel.replaceWith(...page.childNodes);
+            if (next && next.isConnected) logsPageObserver.observe(next);
+        })
+        .catch(error => {
+            console.error('[NAV] Failed to load more logs:', error);
+            sentinel.textContent = 'LOAD_ERROR - SCROLL TO RETRY';
+            delete sentinel.dataset.loading;
+            logsPageObserver.observe(sentinel);
+        });
+}
+
+// "Show All" on ALL SYSTEM LOGS: every matching log in one streamed response
+// (?stream=1, AllLogsView.stream_pieces). Each piece ends with
+// STREAM_SEPARATOR: the first is the page with an empty .log-container, and
+// each one after it a chunk of entries, appended as soon as it arrives rather
+// than when the last log has been rendered. Not kept in the fragment cache.
+const STREAM_SEPARATOR = '<!-- chunk -->';
+
+function streamModule(moduleName, url) {
+    const mainContent = document.getElementById('main-content');
+    const contentLoader = document.getElementById('content-loader');
+    if (!mainContent || !contentLoader) return Promise.reject('#main-content not found');
+
+    contentLoader.style.display = 'flex';
+    mainContent.innerHTML = '';
+    let container = null;
+
+    const show = html => {
+        if (!container) {
+            contentLoader.style.display = 'none';
+            mainContent.innerHTML = html;
+            initializeModuleInteractions(moduleName);
+            container = mainContent.querySelector('.log-container') || mainContent;
+            return;
+        }
+        const chunk = document.createElement('div');
+        chunk.innerHTML = html;
+        initLogsInteractions(chunk);
+        container.append(...chunk.childNodes);
+    };
+
+    return fetch(url).then(response => {
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        if (!response.body || typeof TextDecoderStream === 'undefined') {
+            return response.text().then(html => html.split(STREAM_SEPARATOR).forEach(show));
+        }
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        const pump = () => reader.read().then(({ done, value }) => {
+            if (done) {
+                if (buffer) show(buffer);
+                return;
+            }
+            buffer += value;
+            let end;
+            while ((end = buffer.indexOf(STREAM_SEPARATOR)) !== -1) {
+                show(buffer.slice(0, end));
+                buffer = buffer.slice(end + STREAM_SEPARATOR.length);
+            }
+            return pump();
+        });
+        return pump();
+    }).catch(error => {
+        console.error(`[NAV] Failed to stream ${moduleName}:`, error);
+        contentLoader.style.display = 'none';
+        mainContent.insertAdjacentHTML('beforeend', `<div class="loader-text" style="color: #ff3366; padding: 20px;">LOAD_ERROR: ${error.message || error}</div>`);
+    });
+}
+
+function initShowAllLogs() {
+    const button = document.getElementById('show-all-logs-btn');
+    const form = document.querySelector('.log-search-form');
+    if (!button || !form) return;
+    button.addEventListener('click', () => {
+        const params = new URLSearchParams(new FormData(form));
+        params.set('stream', '1');
+        streamModule('all_logs', `${navigationConfig.all_logs.path}?${params}`);
+    });
+}
+
 // New function to attach listeners to service windows, for both desktop and mobile
 function attachServiceWindowListeners() {
     document.querySelectorAll('.service-window:not(.is-clone)').forEach(window => {
@@ -509,6 +789,8 @@ function initializeModuleInteractions(moduleName) {
             case 'all_logs':
                 if (typeof initLogsInteractions === 'function') initLogsInteractions(); // Re-use common log interactions
                 if (typeof initSearchInteractions === 'function') initSearchInteractions(); // Add search interactions
+                initLogsInfiniteScroll();
+                initShowAllLogs();
                 break;
             case 'services':
                 attachServiceWindowListeners(); // Always attach click listeners
@@ -553,16 +835,16 @@ function initCreationsInteractions() {
     });
 }
 
-function initLogsInteractions() {
+function initLogsInteractions(root = document) {
     // Enhanced log header click handlers with animations and single-expand behavior
-    const logEntries = document.querySelectorAll('.log-entry');
-    logEntries.forEach(entry => {
+    // (root narrows this to newly appended entries when paging in more logs)
+    root.querySelectorAll('.log-entry').forEach(entry => {
         const header = entry.querySelector('.log-header');
         if (!header) return;
 
         header.addEventListener('click', function () {
-            // Collapse all other entries
-            logEntries.forEach(other => {
+            // Collapse all other entries, including ones appended since
+            document.querySelectorAll('.log-entry').forEach(other => {
                 if (other !== entry) {
                     other.classList.remove('expanded');
                 }
@@ -588,7 +870,7 @@ function initLogsInteractions() {
     });
 
     // Enhanced "Read More" button handlers with better UX
-    document.querySelectorAll('.read-more-log').forEach(button => {
+    root.querySelectorAll('.read-more-log').forEach(button => {
         button.addEventListener('click', function (event) {
             event.stopPropagation(); // Prevent the log-header click from triggering
 
@@ -618,7 +900,7 @@ function initLogsInteractions() {
 
     // Share buttons (list and overlay)
     // We remove any previous listeners first to avoid duplicates if re-initialized
-    const shareButtons = document.querySelectorAll('.share-log');
+    const shareButtons = root.querySelectorAll('.share-log');
     shareButtons.forEach(button => {
         // Clone and replace to remove old listeners (brute force clear)
         const newButton = button.cloneNode(true);
@@ -645,7 +927,7 @@ function initLogsInteractions() {
     });
 
     // Older logs click-to-open (keep styling, add behavior)
-    document.querySelectorAll('.older-log-item[data-log-id]').forEach(item => {
+    root.querySelectorAll('.older-log-item[data-log-id]').forEach(item => {
         item.addEventListener('click', function () {
             const logId = this.dataset.logId;
             if (logId && window.openLogDetailOverlay) {
@@ -654,6 +936,8 @@ function initLogsInteractions() {
         });
     });
 
+    if (root !== document) return;
+
     // Add keyboard navigation for accessibility
     document.addEventListener('keydown', function (event) {
         // Enter or Space to expand/collapse logs
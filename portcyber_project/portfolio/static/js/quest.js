@@ -10,9 +10,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     if (!questPanel || !trophyRewardBtn || !coinRewardBtn) {
         console.error('[QUEST] Quest panel or reward buttons not found.');
-        // Still fetch stats even if quest panel is missing, as it's for general header stats
-        fetchSiteStats();
-        setInterval(fetchSiteStats, 5000); // Poll every 5 seconds
+        // Still subscribe to stats even if quest panel is missing, as it's for general header stats
+        startStatsUpdates();
         return;
     }
 
@@ -25,15 +24,53 @@ document.addEventListener('DOMContentLoaded', () => {
     trophyRewardBtn.addEventListener('click', () => claimQuestReward('trophy'));
     coinRewardBtn.addEventListener('click', () => claimQuestReward('coin'));
     
-    // Initial fetch of stats and then periodic updates
-    fetchSiteStats();
-    setInterval(fetchSiteStats, 5000); // Poll every 5 seconds
+    startStatsUpdates();
 });
 
+let statsPollTimer = null;
+
+// Stats arrive over a server-sent event stream (one event per claim).
+// Polling is only used when the stream can't be opened, e.g. under WSGI.
+function startStatsUpdates() {
+    if (!window.EventSource) {
+        startStatsPolling();
+        return;
+    }
+
+    const source = new EventSource('/api/site-stats/stream/');
+    source.addEventListener('stats', (event) => {
+        const data = JSON.parse(event.data);
+        updateStatsUI(data.level, data.trophies, data.coins);
+    });
+    source.onerror = () => {
+        // EventSource retries dropped connections itself; CLOSED means the
+        // server refused the stream, so switch to polling for good.
+        if (source.readyState === EventSource.CLOSED) {
+            console.warn('[QUEST] Stats stream unavailable, falling back to polling.');
+            startStatsPolling();
+        }
+    };
+}
+
+function startStatsPolling() {
+    if (statsPollTimer) return;
+    fetchSiteStats();
+    statsPollTimer = setInterval(fetchSiteStats, 5000); // Poll every 5 seconds
+}
+
+let siteStatsEtag = null;
+
 function fetchSiteStats() {
-    fetch('/api/site-stats/')
-        .then(response => response.json())
+    const headers = siteStatsEtag ? { 'If-None-Match': siteStatsEtag } : {};
+
+    fetch('/api/site-stats/', { headers })
+        .then(response => {
+            if (response.status === 304) return null; // Unchanged since the last poll
+            siteStatsEtag = response.headers.get('ETag');
+            return response.json();
+        })
         .then(data => {
+            if (data === null) return;
             if (data.level !== undefined && data.trophies !== undefined && data.coins !== undefined) {
                 updateStatsUI(data.level, data.trophies, data.coins);
             } else {
@@ -0,0 +1,21 @@
+"""Static files storage: WhiteNoise's compressed manifest plus build steps."""
+from whitenoise.compress import Compressor
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from . import assets, images
+
+
+class PortfolioStaticStorage(CompressedManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Generated files join the collected ones so they get hashed names in the manifest
+            paths = dict(paths)
+            for name in images.build(self, paths) + assets.build(self, paths):
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def create_compressor(self, **kwargs):
+        # AVIF is already compressed (WebP is on WhiteNoise's own skip list)
+        if kwargs.get('extensions') is None:
+            kwargs['extensions'] = (*Compressor.SKIP_COMPRESS_EXTENSIONS, 'avif')
+        return super().create_compressor(**kwargs)
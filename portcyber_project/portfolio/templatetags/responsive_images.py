@@ -0,0 +1,35 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from .. import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(path, alt='', sizes='100vw', css_class='', eager=False):
+    """<picture> with AVIF/WebP srcsets built by collectstatic, lazy unless eager.
+
+    Falls back to a plain <img> of the original file when the image has no
+    variants (e.g. in development, before collectstatic has run).
+    """
+    loading = 'eager' if eager else 'lazy'
+    entry = images.variant_map().get(path)
+    if entry is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            static(path), alt, css_class, loading,
+        )
+
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}">', (
+        (fmt, ', '.join(f'{static(name)} {width}w' for width, name in variants), sizes)
+        for fmt, variants in entry['variants'].items()
+    ))
+    return format_html(
+        '<picture class="responsive-image">{}<img src="{}" alt="{}" class="{}" width="{}" height="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        sources, static(path), alt, css_class, entry['width'], entry['height'], loading,
+        mark_safe(' fetchpriority="high"') if eager else '',
+    )
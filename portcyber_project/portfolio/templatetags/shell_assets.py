@@ -0,0 +1,48 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join, json_script
+from django.utils.safestring import mark_safe
+
+from .. import assets, export
+
+register = template.Library()
+
+
+@register.simple_tag
+def shell_styles():
+    """The shell's critical CSS inline, with theme.css loading behind it.
+
+    Also lists each module's critical CSS for navigation.js, which links it
+    if a module is shown before theme.css has arrived. Without a build (e.g.
+    in development) this is a plain render-blocking stylesheet link.
+    """
+    manifest = assets.manifest()
+    stylesheet = static(assets.STYLESHEET)
+    if 'critical' not in manifest:
+        return format_html('<link rel="stylesheet" href="{}">', stylesheet)
+
+    critical = {key: static(name) for key, name in manifest['critical'].items()}
+    return format_html(
+        '<style>{}</style>\n'
+        '<link rel="preload" href="{}" as="style" id="theme-stylesheet" onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        '<noscript><link rel="stylesheet" href="{}"></noscript>\n'
+        '{}',
+        mark_safe(assets.inline_css(manifest['critical']['index'])), stylesheet, stylesheet,
+        json_script(critical, 'critical-css'),
+    )
+
+
+@register.simple_tag
+def shell_scripts():
+    """The content-hashed bundle, or the separate scripts in bundle order"""
+    manifest = assets.manifest()
+    names = [manifest['bundle']] if 'bundle' in manifest else assets.SHELL_SCRIPTS
+    return format_html_join('\n    ', '<script src="{}"></script>', (
+        (static(name),) for name in names + assets.STANDALONE_SCRIPTS
+    ))
+
+
+@register.simple_tag
+def exported_fragments():
+    """Where export_fragments put the fixed routes' fragments, and its log index, for navigation.js"""
+    return json_script(export.shell_fragments(), 'exported-fragments')
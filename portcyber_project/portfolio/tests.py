@@ -1,3 +1,1489 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import runpy
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlencode, urlparse
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, connections
+from django.http import Http404
+from django.contrib.auth.models import User
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, resolve, reverse
+from django.utils import timezone
+
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from . import analytics, assets, benchmark, counters, events, export, fragments, images, ingest, instrumentation, logcache, pagination, queryplans, rendering, routers, search, throttle, tiered, transfer, urls, views, warmup
+from .models import SiteStats, RewardCounterShard, LogEntry, LogSection, ContactSubmission, ModuleViewRollup
+from .seed import seed_contacts
+
+# Pages that use {% static %} need the plain storage: there is no collectstatic manifest in tests.
+PLAIN_STATIC_STORAGE = {
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def legacy_shell_visit(coins, last_check, today):
+    """The read-modify-write reduction SystemShellView used to apply on each visit"""
+    if last_check < today:
+        coins = max(0, coins - (today - last_check).days * 5)
+        last_check = today
+    return coins, last_check
+
+
+@override_settings(REWARD_COUNTER_SHARDS=4)
+class RewardCounterTests(TestCase):
+    def claim(self, reward_type):
+        return self.client.post(
+            reverse('api-claim-reward'),
+            data=json.dumps({'reward_type': reward_type}),
+            content_type='application/json',
+        )
+
+    def test_claim_does_not_write_site_stats(self):
+        SiteStats.objects.create(level=1, trophies=0, coins=100)
+        response = self.claim('coin')
+        self.assertEqual(response.json()['coins'], 125)
+        self.assertEqual(SiteStats.load().coins, 100)
+
+    def test_trophies_roll_over_into_levels(self):
+        SiteStats.objects.create(level=2, trophies=95, coins=0)
+        for _ in range(3):
+            response = self.claim('trophy')
+        data = response.json()
+        self.assertEqual((data['level'], data['trophies']), (3, 10))
+
+    def test_stale_reads_do_not_lose_increments(self):
+        # Two requests that loaded stats before either wrote used to overwrite each other.
+        SiteStats.objects.create(level=1, trophies=0, coins=0)
+        stale = SiteStats.load()
+        counters.increment('coin')
+        counters.increment('coin')
+        self.assertEqual(counters.snapshot(stale)['coins'], 50)
+
+    def test_rollup_preserves_totals_and_clears_shards(self):
+        SiteStats.objects.create(level=1, trophies=90, coins=10)
+        for _ in range(4):
+            counters.increment('trophy')
+        counters.increment('coin')
+        before = counters.snapshot()
+
+        site_stats = counters.rollup()
+
+        self.assertEqual(counters.snapshot(), before)
+        self.assertEqual((site_stats.level, site_stats.trophies, site_stats.coins), (2, 10, 35))
+        self.assertFalse(RewardCounterShard.objects.exclude(trophies=0, coins=0).exists())
+
+    def test_invalid_reward_type(self):
+        response = self.claim('gems')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class CoinDecayTests(TestCase):
+    def setUp(self):
+        self.today = counters.today()
+
+    def days_ago(self, days):
+        return self.today - timedelta(days=days)
+
+    def test_shell_is_read_only(self):
+        SiteStats.objects.create(coins=100, last_daily_reduction_check=self.days_ago(3))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['coins'], 85)
+        site_stats = SiteStats.load()
+        self.assertEqual((site_stats.coins, site_stats.last_daily_reduction_check), (100, self.days_ago(3)))
+
+    def test_matches_legacy_reduction_for_any_visit_pattern(self):
+        for coins in (0, 7, 12, 5000):
+            for visits in ([], [9], [9, 4, 1], [2, 1, 0]):
+                legacy = (coins, self.days_ago(10))
+                for days in visits:
+                    legacy = legacy_shell_visit(*legacy, self.days_ago(days))
+                legacy = legacy_shell_visit(*legacy, self.today)
+
+                site_stats = SiteStats(coins=coins, last_daily_reduction_check=self.days_ago(10))
+                self.assertEqual(counters.fold(site_stats, [], self.today)['coins'], legacy[0])
+
+    def test_claims_are_added_after_that_days_reduction(self):
+        SiteStats.objects.create(coins=10, last_daily_reduction_check=self.days_ago(5))
+        RewardCounterShard.objects.create(shard=0, day=self.days_ago(3), coins=25)
+        RewardCounterShard.objects.create(shard=1, day=self.days_ago(3), coins=25)
+
+        # Legacy: visit 3 days ago (10 -> 0), claim twice (50), then visit today.
+        legacy = legacy_shell_visit(10, self.days_ago(5), self.days_ago(3))
+        legacy = legacy_shell_visit(legacy[0] + 50, legacy[1], self.today)
+
+        self.assertEqual(counters.snapshot()['coins'], legacy[0])
+
+    def test_rollup_reanchors_without_changing_balance(self):
+        SiteStats.objects.create(coins=40, last_daily_reduction_check=self.days_ago(6))
+        RewardCounterShard.objects.create(shard=0, day=self.days_ago(2), coins=25, trophies=5)
+        before = counters.snapshot()
+
+        site_stats = counters.rollup()
+
+        self.assertEqual(site_stats.last_daily_reduction_check, self.today)
+        self.assertEqual(counters.snapshot(), before)
+        self.assertFalse(RewardCounterShard.objects.filter(day__lt=self.today).exists())
+
+
+class StatsStreamTests(TestCase):
+    def setUp(self):
+        events._broker = events.MemoryBroker()
+        self.addCleanup(setattr, events, '_broker', None)
+        counters.forget()  # Stats cached from an earlier test's rolled-back rows
+
+    async def test_memory_broker_fans_out_to_every_subscriber(self):
+        broker = events.get_broker()
+        first = await broker.subscribe('site-stats')
+        second = await broker.subscribe('site-stats')
+        # Views publish from worker threads, not the event loop.
+        await asyncio.to_thread(broker.publish, 'site-stats', 'hello')
+        self.assertEqual(await first.get(timeout=1), 'hello')
+        self.assertEqual(await second.get(timeout=1), 'hello')
+
+        await first.close()
+        broker.publish('site-stats', 'again')
+        self.assertEqual(await second.get(timeout=1), 'again')
+        self.assertEqual(broker.subscriptions['site-stats'], {second})
+
+    def test_stream_refused_under_wsgi(self):
+        # The fallback contract: an empty 204, never an event stream a sync
+        # worker would hold open, so EventSource closes and quest.js polls
+        SiteStats.objects.create(level=1, trophies=0, coins=100)
+        response = self.client.get(reverse('api-site-stats-stream'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b'')
+        self.assertNotEqual(response.get('Content-Type'), 'text/event-stream')
+        polled = self.client.get(reverse('api-site-stats'))
+        self.assertEqual(polled.json()['coins'], 100)
+        self.assertIn('ETag', polled)
+
+    async def test_stream_sends_snapshot_then_claims(self):
+        response = await self.async_client.get(reverse('api-site-stats-stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        first = (await anext(chunks)).decode()
+        self.assertTrue(first.startswith('event: stats\n'))
+
+        await self.async_client.post(
+            reverse('api-claim-reward'),
+            data=json.dumps({'reward_type': 'coin'}),
+            content_type='application/json',
+        )
+        claimed = json.loads((await anext(chunks)).decode().split('data: ', 1)[1])
+        self.assertEqual(claimed['coins'], json.loads(first.split('data: ', 1)[1])['coins'] + 25)
+        await chunks.aclose()
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class ConditionalGetTests(TestCase):
+    def test_static_fragment_not_modified(self):
+        url = reverse('api-services')
+        etag = self.client.get(url)['ETag']
+        with self.assertTemplateNotUsed('modules/_services_fragment.html'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_log_fragments_revalidate_on_edit_and_delete(self):
+        log = LogEntry.objects.create(title="Boot", log_date="JAN 2026", status="done", entry_type="ops")
+        section = LogSection.objects.create(log_entry=log, title="Intro", content="Hello")
+        url = reverse('api-logs')
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):  # Watermark only: no log or section queries
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        section.content = "Hello again"
+        section.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        section.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_site_stats_version_changes_on_claim_and_rollup(self):
+        url = reverse('api-site-stats')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        counters.increment('coin')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        _, version = counters.state()
+        counters.rollup()
+        self.assertGreater(counters.state()[1], version)
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE, FRAGMENT_CACHE=True)
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        fragments.clear()
+        self.addCleanup(fragments.clear)
+
+    def test_renders_once_and_serves_precompressed(self):
+        url = reverse('api-services')
+        plain = self.client.get(url).content
+        with self.assertTemplateNotUsed('modules/_services_fragment.html'):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(FRAGMENT_CACHE=False)
+    def test_uncached_fragment_compresses_only_the_accepted_encoding(self):
+        compressors = {encoding: mock.Mock(wraps=compress) for encoding, compress in fragments.COMPRESSORS.items()}
+        best = {encoding: mock.Mock(wraps=compress) for encoding, compress in fragments.BEST_COMPRESSORS.items()}
+        with mock.patch.object(fragments, 'COMPRESSORS', compressors), mock.patch.object(fragments, 'BEST_COMPRESSORS', best):
+            response = self.client.get(reverse('api-services'), HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn(b'</', gzip.decompress(response.content))
+            self.assertEqual(compressors['gzip'].call_count, 1)
+            self.assertFalse(any(compressor.called for encoding, compressor in compressors.items() if encoding != 'gzip'))
+            self.assertFalse(any(compressor.called for compressor in best.values()))
+
+            self.assertNotIn('Content-Encoding', self.client.get(reverse('api-services')))
+            self.assertEqual(compressors['gzip'].call_count, 1)
+
+    def test_choose_encoding(self):
+        available = {'gzip': b'', 'br': b''}
+        self.assertEqual(fragments.choose_encoding('gzip, deflate, br', available), 'br')
+        self.assertEqual(fragments.choose_encoding('br;q=0, gzip', available), 'gzip')
+        self.assertEqual(fragments.choose_encoding('gzip', {'br': b''}), None)
+        self.assertEqual(fragments.choose_encoding('*', available), 'br')
+        self.assertEqual(fragments.choose_encoding('', available), None)
+
+    def test_connect_fragment_gets_a_fresh_csrf_token(self):
+        url = reverse('api-connect')
+        first = self.client.get(url)
+        self.assertNotIn(fragments.CSRF_PLACEHOLDER, first.content.decode())
+        self.assertIn('csrftoken', first.cookies)
+
+        other = self.client_class().get(url)
+        self.assertNotEqual(first.cookies['csrftoken'].value, other.cookies['csrftoken'].value)
+        self.assertNotIn(fragments.CSRF_PLACEHOLDER, other.content.decode())
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class LogContentMetricsTests(TestCase):
+    def setUp(self):
+        self.log = LogEntry.objects.create(title="Boot", log_date="JAN 2026", status="done", entry_type="ops")
+
+    def test_metrics_follow_section_changes(self):
+        first = LogSection.objects.create(log_entry=self.log, title="A", content="<b>Fish</b> &amp; chips")
+        LogSection.objects.create(log_entry=self.log, title="B", content="x" * 900)
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.section_count, self.log.content_length), (2, 923))
+        self.assertTrue(self.log.is_long_content)
+        self.assertTrue(self.log.excerpt.startswith("Fish & chips\n\nxxx"))
+        self.assertEqual(len(self.log.excerpt), 800)
+
+        LogSection.objects.filter(title="B").get().delete()
+        first.content = "short"
+        first.save()
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.section_count, self.log.excerpt), (1, "short"))
+        self.assertFalse(self.log.is_long_content)
+
+    def test_admin_inline_edits_update_metrics(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        url = reverse('admin:portfolio_logentry_change', args=[self.log.pk])
+        response = self.client.post(url, {
+            'title': 'Boot', 'log_date': 'JAN 2026', 'status': 'done', 'entry_type': 'ops',
+            'sections-TOTAL_FORMS': '1', 'sections-INITIAL_FORMS': '0',
+            'sections-MIN_NUM_FORMS': '0', 'sections-MAX_NUM_FORMS': '1000',
+            'sections-0-title': 'Intro', 'sections-0-content': 'Written in admin',
+            'sections-0-log_entry': str(self.log.pk),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.log.refresh_from_db()
+        self.assertEqual((self.log.section_count, self.log.excerpt), (1, 'Written in admin'))
+
+    def test_list_views_do_not_query_sections(self):
+        LogSection.objects.create(log_entry=self.log, title="A", content="Visible excerpt")
+        for name in ('api-logs', 'api-all-logs'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertContains(response, "Visible excerpt")
+            self.assertFalse([q for q in queries if 'portfolio_logsection' in q['sql'] and 'all_sections' not in q['sql']])  # Bar the watermark
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class SearchTests(TestCase):
+    def make_log(self, title, *contents):
+        log = LogEntry.objects.create(title=title, log_date="JAN 2026", status="done", entry_type="ops")
+        for index, content in enumerate(contents):
+            LogSection.objects.create(log_entry=log, title=f"S{index}", content=content)
+        return log
+
+    def test_index_follows_writes(self):
+        log = self.make_log("Release notes", "Nothing about databases yet")
+        self.assertEqual(search.search("caching", include_content=True), [])
+
+        section = log.sections.get()
+        section.content = "We added <b>caching</b> to the API"
+        section.save()
+        [hit] = search.search("cache", include_content=True)  # stemmed
+        self.assertEqual(hit.pk, log.pk)
+        self.assertIn("<mark>caching</mark>", hit.snippet)
+        self.assertNotIn("<b>", hit.snippet)
+
+        log.delete()
+        self.assertEqual(search.search("caching", include_content=True), [])
+
+    def test_title_matches_rank_first_and_title_only_search(self):
+        body = self.make_log("Weekly notes", "A long story about latency and more latency")
+        title = self.make_log("Latency spike", "Investigated the graphs")
+        hits = search.search("latency", include_content=True)
+        self.assertEqual([hit.pk for hit in hits], [title.pk, body.pk])
+        self.assertEqual([hit.pk for hit in search.search("latency")], [title.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.make_log("Quotes", "said \"hello\"")
+        self.assertEqual(len(search.search('hello"*)(:', include_content=True)), 1)
+        self.assertEqual(search.search('"*()'), [])
+
+    def test_all_logs_view_highlights_and_ranks(self):
+        self.make_log("Unrelated", "<script>alert(1)</script> deploy pipeline")
+        response = self.client.get(reverse('api-all-logs'), {'q': 'pipeline', 'search_content': 'on'})
+        self.assertContains(response, "<mark>pipeline</mark>")
+        self.assertNotContains(response, "<script>")
+        self.assertEqual(response.context['sort_by'], 'relevance')
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        # Three timestamps and three titles shared across 45 logs, so every sort has ties
+        start = timezone.now()
+        for index in range(45):
+            log = LogEntry.objects.create(title=f"Log {index % 3}", log_date="JAN 2026", status="done", entry_type="ops")
+            LogEntry.objects.filter(pk=log.pk).update(created_at=start - timedelta(hours=index % 3))
+
+    def walk(self, params):
+        """Follow next-page cursors from the first page; returns pks in display order"""
+        response = self.client.get(reverse('api-all-logs'), params)
+        pks = [log.pk for log in response.context['logs']]
+        while response['X-Next-Cursor']:
+            params = dict(params, cursor=response['X-Next-Cursor'])
+            response = self.client.get(reverse('api-all-logs'), params)
+            self.assertNotContains(response, 'log-search-form')
+            pks += [log.pk for log in response.context['logs']]
+        return pks
+
+    def test_every_sort_pages_through_ties_without_gaps_or_repeats(self):
+        for sort, ordering in [
+            ('-created_at', ('-created_at', '-pk')),
+            ('created_at', ('created_at', 'pk')),
+            ('title', ('title', 'pk')),
+            ('-title', ('-title', '-pk')),
+        ]:
+            with self.subTest(sort=sort):
+                expected = list(LogEntry.objects.order_by(*ordering).values_list('pk', flat=True))
+                self.assertEqual(self.walk({'sort': sort}), expected)
+
+    def test_next_url_keeps_the_query(self):
+        response = self.client.get(reverse('api-all-logs'), {'sort': 'title'})
+        self.assertEqual(len(response.context['logs']), pagination.PAGE_SIZE)
+        query = parse_qs(urlparse(response.context['next_url']).query)
+        self.assertEqual(query['sort'], ['title'])
+        self.assertEqual(query['cursor'], [response['X-Next-Cursor']])
+        self.assertContains(response, 'log-page-sentinel')
+
+    def test_later_pages_do_not_use_offset(self):
+        first = self.client.get(reverse('api-all-logs'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api-all-logs'), {'cursor': first['X-Next-Cursor']})
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+
+    def test_bad_sort_and_cursor_fall_back_to_first_page(self):
+        response = self.client.get(reverse('api-all-logs'), {'sort': 'status; DROP', 'cursor': '!!not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['sort_by'], pagination.DEFAULT_SORT)
+        expected = list(LogEntry.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[:pagination.PAGE_SIZE])
+        self.assertEqual([log.pk for log in response.context['logs']], expected)
+
+    def test_cursor_with_bad_contents_falls_back_to_first_page(self):
+        first = [log.pk for log in self.client.get(reverse('api-all-logs'), {'sort': 'created_at'}).context['logs']]
+        for contents in [{'v': 'garbage', 'pk': 1}, {'v': '2020-01-01T00:00:00', 'pk': 'abc'}, {'v': None, 'pk': 1}, {'v': [], 'pk': {}}]:
+            with self.subTest(contents=contents):
+                response = self.client.get(reverse('api-all-logs'), {'sort': 'created_at', 'cursor': pagination.encode_cursor(contents)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([log.pk for log in response.context['logs']], first)
+
+    def test_search_results_page_by_relevance(self):
+        search.rebuild()
+        pks = self.walk({'q': 'log'})
+        self.assertEqual(len(pks), 45)
+        self.assertEqual(len(set(pks)), 45)
+
+    def test_only_the_relevance_listing_is_capped(self):
+        logs = LogEntry.objects.bulk_create([
+            LogEntry(title=f"Probe {index}", log_date="JAN 2026", status="done", entry_type="ops")
+            for index in range(search.RESULT_LIMIT + 50)
+        ])
+        LogSection.objects.bulk_create([LogSection(log_entry=log, title="S", content="probe body") for log in logs])
+        search.rebuild()
+        expected = list(LogEntry.objects.filter(title__startswith="Probe").order_by('title', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk({'q': 'probe', 'sort': 'title'}), expected)
+        self.assertEqual(len(self.walk({'q': 'probe', 'sort': '-created_at'})), len(expected))
+        self.assertEqual(len(self.walk({'q': 'probe'})), search.RESULT_LIMIT)
+
+        response = self.client.get(reverse('api-all-logs'), {'q': 'probe', 'search_content': 'on', 'sort': 'title'})
+        self.assertContains(response, "<mark>probe</mark> body", count=pagination.PAGE_SIZE)  # Snippets for the page
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE, FRAGMENT_CACHE=True, SHARED_CACHE=True)  # One process: it is shared
+class LogFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.old = LogEntry.objects.create(title="Old log", log_date="JAN 2026", status="done", entry_type="ops")
+        LogSection.objects.create(log_entry=self.old, title="S", content="old content")
+        for index in range(3):
+            LogEntry.objects.create(title=f"Recent {index}", log_date="JAN 2026", status="done", entry_type="ops")
+
+    def get(self, name, **kwargs):
+        return self.client.get(reverse(name, kwargs=kwargs)).content.decode()
+
+    def test_repeat_requests_skip_rendering_queries(self):
+        self.get('api-logs')
+        self.get('api-log-detail', pk=self.old.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.get('api-logs')
+            self.get('api-log-detail', pk=self.old.pk)
+        # Only the ETag watermarks remain
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(logcache.stats()['hits'], 2)
+        self.assertEqual(logcache.stats()['misses'], 2)
+
+    def test_section_edit_invalidates_only_that_log(self):
+        self.get('api-log-detail', pk=self.old.pk)
+        self.assertNotIn("OLD LOG", self.get('api-logs'))  # Not among the 3 most recent
+        section = self.old.sections.get()
+        section.content = "new content"
+        section.save()
+
+        self.assertIn("new content", self.get('api-log-detail', pk=self.old.pk))
+        self.get('api-logs')
+        self.assertEqual(logcache.stats()['hits'], 1)  # Home was still valid
+
+    def test_pinning_updates_home(self):
+        self.get('api-logs')
+        self.old.is_pinned = True
+        self.old.save()
+        self.assertIn("Old log", self.get('api-logs'))
+
+        self.old.is_pinned = False
+        self.old.save()
+        self.assertNotIn("Old log", self.get('api-logs'))
+
+    def test_new_and_deleted_logs_update_home(self):
+        self.get('api-logs')
+        log = LogEntry.objects.create(title="Brand new", log_date="JAN 2026", status="done", entry_type="ops")
+        self.assertIn("BRAND NEW", self.get('api-logs'))
+        pk = log.pk
+        self.get('api-log-detail', pk=pk)
+
+        log.delete()
+        self.assertNotIn("BRAND NEW", self.get('api-logs'))
+        self.assertEqual(self.client.get(reverse('api-log-detail', kwargs={'pk': pk})).status_code, 404)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_worker_cache_follows_edits_made_in_other_workers(self):
+        path = reverse('api-log-detail', kwargs={'pk': self.old.pk})
+        etag = self.client.get(path)['ETag']
+        self.get('api-logs')
+        with mock.patch.object(logcache, 'bump'):  # The edit's invalidation stays in another worker's cache
+            section = self.old.sections.get()
+            section.content = "edited elsewhere"
+            section.save()
+            self.old.is_pinned = True
+            self.old.save()
+
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "edited elsewhere")
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn("Old log", self.get('api-logs'))
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        self.source, self.target = FileSystemStorage(tempfile.mkdtemp()), FileSystemStorage(tempfile.mkdtemp())
+        for storage in (self.source, self.target):
+            self.addCleanup(shutil.rmtree, storage.location)
+        png = io.BytesIO()
+        Image.new('RGB', (700, 350), 'red').save(png, 'PNG')
+        for name in ['images/a.png', 'images/a - Copy.png']:
+            self.source.save(name, ContentFile(png.getvalue()))
+        self.paths = {name: (self.source, name) for name in ['images/a.png', 'images/a - Copy.png', 'js/boot.js']}
+
+    def test_duplicates_share_variants_and_rebuilds_are_incremental(self):
+        with mock.patch.object(images, 'encode', wraps=images.encode) as encode:
+            names = images.build(self.target, self.paths)
+            image_map = json.loads(self.target.open(images.MAP_NAME).read())
+            self.assertEqual(image_map['images/a.png'], image_map['images/a - Copy.png'])
+            self.assertNotIn('js/boot.js', image_map)
+            first = encode.call_count
+
+            self.assertEqual(images.build(self.target, self.paths), names)
+            self.assertEqual(encode.call_count, first)
+
+        webp = dict(image_map['images/a.png']['variants'])['webp']
+        self.assertEqual([width for width, name in webp], [320, 640, 700])  # No upscaling
+        with self.target.open(webp[0][1]) as f:
+            self.assertEqual(Image.open(f).size, (320, 160))
+
+    def render(self, path):
+        return Template("{% load responsive_images %}{% responsive_image path alt='A' sizes='50vw' %}").render(Context({'path': path}))
+
+    @override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+    def test_tag_emits_srcset_and_lazy_loading(self):
+        entry = {'width': 700, 'height': 350, 'variants': {'webp': [[320, 'images/variants/x-320.webp'], [700, 'images/variants/x-700.webp']]}}
+        with mock.patch.object(images, 'variant_map', return_value={'images/a.png': entry}):
+            html = self.render('images/a.png')
+            fallback = self.render('images/missing.png')
+        self.assertIn('<source type="image/webp" srcset="/static/images/variants/x-320.webp 320w, /static/images/variants/x-700.webp 700w" sizes="50vw">', html)
+        self.assertIn('width="700" height="350" loading="lazy"', html)
+        self.assertEqual(fallback, '<img src="/static/images/missing.png" alt="A" class="" loading="lazy" decoding="async">')
+
+
+class AssetPipelineTests(TestCase):
+    def test_minify_js_keeps_literals_and_line_breaks(self):
+        source = (
+            "const a = 'x // not a comment';  // comment\n"
+            "/* block */ let re = /a\\/b[/]/g, half = 4 / 2;\n"
+            "let t = `keep   ${ {b: 1}.b }  /* text */`;\n"
+            "function f() {\n    return\n        a + +1\n}\n"
+        )
+        self.assertEqual(assets.minify_js(source), (
+            "const a='x // not a comment';let re=/a\\/b[/]/g,half=4/2;"
+            "let t=`keep   ${{b:1}.b}  /* text */`;function f(){return\na+ +1}\n"
+        ))
+
+    def test_critical_css_keeps_rules_the_markup_can_match(self):
+        css = """
+            * { margin: 0 }
+            .card .title:hover { color: red }
+            .card.expanded, #missing { display: block }
+            .other { color: blue }
+            @media (max-width: 600px) { .card { padding: 0 } .other { padding: 1px } }
+            .title { animation: glow 1s }
+            @keyframes glow { from { opacity: 0 } }
+            @keyframes unused { to { opacity: 1 } }
+        """
+        tokens = assets.markup_tokens('<div class="card {% if x %}big{% endif %}"><h2 class="title">{{ t }}</h2></div>')
+        self.assertEqual(assets.critical_css(assets.parse_css(css), tokens), (
+            "*{margin: 0}.card .title:hover{color: red}"
+            "@media (max-width: 600px){.card{padding: 0}}"
+            ".title{animation: glow 1s}@keyframes glow{from{opacity: 0}}"
+        ))
+
+    @override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+    def test_shell_tags_use_the_build_when_present(self):
+        shell = Template("{% load shell_assets %}{% shell_styles %}|{% shell_scripts %}")
+        with mock.patch.object(assets, 'manifest', return_value={}):
+            styles, scripts = shell.render(Context()).split('|')
+        self.assertEqual(styles, '<link rel="stylesheet" href="/static/css/theme.css">')
+        self.assertEqual(scripts.count('<script'), len(assets.SHELL_SCRIPTS) + 1)
+        self.assertLess(scripts.index('system-state.js'), scripts.index('navigation.js'))
+
+        built = {'bundle': assets.BUNDLE_NAME, 'critical': {'index': 'css/critical/index.css'}}
+        with mock.patch.object(assets, 'manifest', return_value=built), \
+                mock.patch.object(assets, 'inline_css', return_value='body{margin:0}'):
+            styles, scripts = shell.render(Context()).split('|')
+        self.assertIn('<style>body{margin:0}</style>', styles)
+        self.assertIn('rel="preload" href="/static/css/theme.css" as="style"', styles)
+        self.assertEqual(scripts, '<script src="/static/js/shell.bundle.js"></script>\n'
+                                  '    <script src="/static/js/three-background.js"></script>')
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class ContentBatchTests(TestCase):
+    def batch(self, *paths, **extra):
+        return self.client.get(reverse('api-content-batch'), {'path': list(paths)}, **extra)
+
+    def test_fragments_match_individual_responses(self):
+        LogEntry.objects.create(title="Batched", log_date="JAN 2026", status="done", entry_type="ops")
+        paths = [reverse('api-dashboard'), reverse('api-logs'), reverse('api-services')]
+        with self.assertNumQueries(3):  # Only the logs fragment touches the database
+            data = self.batch(*paths).json()['fragments']
+        for path in paths:
+            alone = self.client.get(path)
+            self.assertEqual(data[path], {'status': 200, 'etag': alone['ETag'], 'html': alone.content.decode()})
+
+    def test_only_content_paths_are_served(self):
+        data = self.batch('/admin/', reverse('api-content-batch'), '/api/content/nope/', reverse('api-log-detail', kwargs={'pk': 999})).json()['fragments']
+        self.assertEqual([fragment['status'] for fragment in data.values()], [400, 400, 404, 404])
+
+    def test_connect_form_gets_a_csrf_cookie_and_response_is_compressed(self):
+        response = self.batch(reverse('api-connect'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))['fragments']
+        self.assertIn('csrftoken', response.cookies)
+        self.assertNotIn(fragments.CSRF_PLACEHOLDER, data[reverse('api-connect')]['html'])
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        self.logs = [
+            LogEntry.objects.create(title=f"Entry {i}", log_date="JAN 2026", status="done", entry_type="ops", is_pinned=i == 0)
+            for i in range(25)
+        ]
+        LogSection.objects.create(log_entry=self.logs[0], title="Body", content="Latency budget exceeded")
+        counters.claim('trophy')
+
+    def cases(self):
+        pk = self.logs[0].pk
+        return [
+            (views.LogsView.as_view(), views.AsyncLogsView.as_view(), reverse('api-logs'), {}),
+            (views.LogDetailView.as_view(), views.AsyncLogDetailView.as_view(), reverse('api-log-detail', kwargs={'pk': pk}), {'pk': pk}),
+            (views.AllLogsView.as_view(), views.AsyncAllLogsView.as_view(), reverse('api-all-logs') + '?sort=title', {}),
+            (views.AllLogsView.as_view(), views.AsyncAllLogsView.as_view(), reverse('api-all-logs') + '?q=latency&search_content=on', {}),
+            (views.get_site_stats, views.get_site_stats_async, reverse('api-site-stats'), {}),
+        ]
+
+    async def test_async_views_match_sync_views(self):
+        for sync_view, async_view, url, kwargs in self.cases():
+            with self.subTest(url=url):
+                expected = await sync_to_async(sync_view)(RequestFactory().get(url), **kwargs)
+                response = await async_view(AsyncRequestFactory().get(url), **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['ETag'], expected['ETag'])
+                self.assertEqual(response.get('X-Next-Cursor'), expected.get('X-Next-Cursor'))
+
+    async def test_conditional_requests_skip_the_view(self):
+        for _, async_view, url, kwargs in self.cases():
+            with self.subTest(url=url):
+                etag = (await async_view(AsyncRequestFactory().get(url), **kwargs))['ETag']
+                response = await async_view(AsyncRequestFactory().get(url, headers={'If-None-Match': etag}), **kwargs)
+                self.assertEqual(response.status_code, 304)
+
+    async def test_missing_log_is_404(self):
+        with self.assertRaises(Http404):
+            await views.AsyncLogDetailView.as_view()(AsyncRequestFactory().get('/'), pk=999)
+
+    @override_settings(FRAGMENT_CACHE=True)
+    async def test_fragment_cache_is_shared_with_sync_views(self):
+        await sync_to_async(cache.clear)()
+        await sync_to_async(views.LogsView.as_view())(RequestFactory().get(reverse('api-logs')))
+        await views.AsyncLogsView.as_view()(AsyncRequestFactory().get(reverse('api-logs')))
+        self.assertEqual((await sync_to_async(logcache.stats)())['hits'], 1)
+
+    def test_batch_awaits_async_views(self):
+        match = ResolverMatch(views.AsyncLogsView.as_view(), (), {})
+        with mock.patch.object(views, 'resolve', return_value=match):
+            data = self.client.get(reverse('api-content-batch'), {'path': reverse('api-logs')}).json()['fragments']
+        self.assertEqual(data[reverse('api-logs')]['html'], self.client.get(reverse('api-logs')).content.decode())
+
+
+class BenchmarkTests(TestCase):
+    def test_every_route_has_a_scenario(self):
+        covered = {resolve(scenario.path.partition('?')[0]).url_name for scenario in benchmark.scenarios(1, 'cursor')}
+        self.assertEqual(covered, {pattern.name for pattern in urls.urlpatterns})
+
+    def test_summary_percentiles(self):
+        latencies = [i / 1000 for i in range(1, 101)] + [None]
+        summary = benchmark.summarize(latencies, elapsed=2.0)
+        self.assertEqual(summary, {'requests': 101, 'errors': 1, 'rps': 50.0, 'p50_ms': 51.0, 'p95_ms': 96.0, 'p99_ms': 100.0})
+
+    def test_compare_flags_regressions_beyond_the_threshold(self):
+        baseline = {'logs': {'p50_ms': 10.0, 'p99_ms': 20.0, 'rps': 100.0, 'queries': 2, 'errors': 0}}
+        within = {'logs': {'p50_ms': 12.0, 'p99_ms': 29.0, 'rps': 85.0, 'queries': 2, 'errors': 0}}
+        self.assertEqual(benchmark.compare(within, baseline, threshold=0.25), [])
+
+        worse = {'logs': {'p50_ms': 13.0, 'p99_ms': 31.0, 'rps': 70.0, 'queries': 3, 'errors': 4}, 'new': {'rps': 1.0}}
+        self.assertEqual(benchmark.compare(worse, baseline, threshold=0.25), [
+            'logs: 4 failed requests',
+            'logs: p50_ms 10.0 -> 13.0',
+            'logs: p99_ms 20.0 -> 31.0',
+            'logs: rps 100.0 -> 70.0',
+            'logs: queries 2 -> 3',
+        ])
+
+    def test_median_of_repeated_runs(self):
+        runs = [
+            {'requests': 10, 'errors': 0, 'rps': 90.0, 'p50_ms': 5.0, 'p95_ms': 9.0, 'p99_ms': 30.0},
+            {'requests': 10, 'errors': 1, 'rps': 100.0, 'p50_ms': 4.0, 'p95_ms': 8.0, 'p99_ms': 10.0},
+            {'requests': 10, 'errors': 0, 'rps': 95.0, 'p50_ms': 6.0, 'p95_ms': 7.0, 'p99_ms': 12.0},
+        ]
+        self.assertEqual(
+            benchmark.median(runs),
+            {'requests': 30, 'errors': 1, 'rps': 95.0, 'p50_ms': 5.0, 'p95_ms': 8.0, 'p99_ms': 12.0},
+        )
+
+    def test_seed_contacts(self):
+        self.assertEqual(seed_contacts(25), 25)
+        self.assertEqual(ContactSubmission.objects.count(), 25)
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE, METRICS_TOKEN='secret')
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.registry.pending.clear()
+        LogEntry.objects.create(title="Entry", log_date="JAN 2026", status="done", entry_type="ops")
+
+    def timing(self, response):
+        return dict(
+            (name, dict(param.split('=', 1) for param in params))
+            for name, *params in (metric.split(';') for metric in response['Server-Timing'].split(', '))
+        )
+
+    def test_server_timing_counts_queries_and_rendering(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('api-logs'))
+        timing = self.timing(response)
+        self.assertEqual(timing['db']['desc'], f'"{len(captured)} queries"')
+        self.assertGreater(float(timing['tpl']['dur']), 0)
+        self.assertGreaterEqual(float(timing['total']['dur']), float(timing['db']['dur']))
+
+    async def test_async_requests_count_queries_run_in_threads(self):
+        response = await AsyncClient().get(reverse('api-logs'))
+        self.assertNotEqual(self.timing(response)['db']['desc'], '"0 queries"')
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_queries(self):
+        with self.assertLogs('portfolio.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('api-logs'))
+        self.assertIn('Slow request GET /api/content/logs/ (api-logs)', logs.output[0])
+        self.assertIn('portfolio_logentry', logs.output[0])
+
+    def test_metrics_need_staff_or_the_token(self):
+        self.assertEqual(self.client.get(reverse('api-metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('api-metrics'), headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        self.assertEqual(self.client.get(reverse('api-metrics'), headers={'Authorization': 'Bearer secret'}).status_code, 200)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(reverse('api-metrics')).status_code, 200)
+
+    def test_metrics_exposition(self):
+        for _ in range(3):
+            self.client.get(reverse('api-logs'))
+        self.client.get('/api/content/nope/')
+        response = self.client.get(reverse('api-metrics'), headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertIn('no-store', response['Cache-Control'])
+        body = response.content.decode()
+        labels = 'view="api-logs",method="GET",status="2xx"'
+        self.assertIn(f'portcyber_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3\n', body)
+        self.assertIn(f'portcyber_request_duration_seconds_count{{{labels}}} 3\n', body)
+        self.assertIn(f'portcyber_template_render_seconds_total{{{labels}}}', body)
+        self.assertIn('view="unmatched",method="GET",status="4xx"', body)
+        buckets = [int(line.rsplit(' ', 1)[1]) for line in body.splitlines() if line.startswith(f'portcyber_request_duration_seconds_bucket{{{labels}')]
+        self.assertEqual(buckets, sorted(buckets))
+
+
+@mock.patch.object(ingest.contacts, 'batch_size', 1)  # Contact posts written straight away
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE, DATABASE_REPLICAS=['replica'], FRAGMENT_CACHE=False)
+class ReplicaRoutingTests(TestCase):
+    """The test database as the primary, and a copy of it in a second SQLite file as the replica"""
+
+    databases = '__all__'  # Including the replica, which the test runner doesn't know about
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        path = os.path.join(cls.directory, 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as replica:
+            connection.connection.backup(replica)  # The schema, as replication would
+        connections.settings['replica'] = {**connection.settings_dict, 'NAME': path}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        for database in ('default', 'replica'):
+            LogEntry.objects.using(database).create(title=f"{database} entry", log_date="JAN 2026", status="done", entry_type="ops")
+
+    def test_read_only_views_read_from_the_replica(self):
+        for url in [reverse('api-logs'), reverse('api-all-logs')]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, "REPLICA ENTRY")
+                self.assertNotContains(response, "DEFAULT ENTRY")
+                self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_search_reads_the_replica_index(self):
+        # Each entry was indexed in the database it was saved to
+        with CaptureQueriesContext(connections['replica']) as queries:
+            self.assertContains(self.client.get(reverse('api-all-logs'), {'q': 'replica'}), "REPLICA ENTRY")
+        self.assertTrue(any(search.TABLE in query['sql'] for query in queries))
+        self.assertContains(self.client.get(reverse('api-all-logs'), {'q': 'default'}), "NO LOGS FOUND")
+
+    def test_site_stats_read_from_the_replica(self):
+        SiteStats.objects.using('replica').create(level=3, trophies=0, coins=100)
+        counters.forget()
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(reverse('api-site-stats'))
+        self.assertEqual(response.json()['level'], 3)
+        self.assertTrue(queries)
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        self.assertFalse(SiteStats.objects.using('default').exists())  # Not created by a read
+
+    async def test_async_requests(self):
+        response = await AsyncClient().get(reverse('api-logs'))
+        self.assertContains(response, "REPLICA ENTRY")
+
+    def test_writes_go_to_the_primary_and_stick_the_client_to_it(self):
+        response = self.client.post(reverse('api-submit-contact'), {'name': 'A', 'email': 'a@example.com', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ContactSubmission.objects.using('default').count(), 1)
+        self.assertEqual(ContactSubmission.objects.using('replica').count(), 0)
+        # REPLICA_STICKY_SECONDS, plus CONTACT_FLUSH_INTERVAL for a queued submission
+        self.assertEqual(response.cookies[routers.STICKY_COOKIE]['max-age'], 11)
+        self.assertContains(self.client.get(reverse('api-logs')), "DEFAULT ENTRY")
+
+    def test_queued_writes_stick_the_client_to_the_primary_too(self):
+        with mock.patch.object(ingest.contacts, 'batch_size', 100):
+            response = self.client.post(reverse('api-submit-contact'), {'name': 'A', 'email': 'a@example.com', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ContactSubmission.objects.using('default').count(), 0)  # Still queued
+        self.assertEqual(response.cookies[routers.STICKY_COOKIE]['max-age'], 11)  # Until it lands, and then some
+        ingest.contacts.flush()
+        self.assertEqual(ContactSubmission.objects.using('default').count(), 1)
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        router = routers.PrimaryReplicaRouter()
+        token = routers.current.set(routers.Routing())
+        try:
+            self.assertEqual(router.db_for_read(LogEntry), 'default')  # Not a replica_reads view
+            routers.current.get().replica_reads = True
+            self.assertEqual(router.db_for_read(LogEntry), 'replica')
+            router.db_for_write(ContactSubmission)
+            self.assertEqual(router.db_for_read(LogEntry), 'default')
+        finally:
+            routers.current.reset(token)
+
+    def test_no_replicas_no_routing(self):
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertContains(self.client.get(reverse('api-logs')), "DEFAULT ENTRY")
+
+
+class WriteBehindTests(TestCase):
+    def buffer(self, write=None, **options):
+        written = []
+        options = {'batch_size': 3, 'flush_interval': 60, 'max_pending': 10, **options}
+        buffer = ingest.WriteBehind(write or written.extend, **options)
+        self.addCleanup(buffer.close)
+        return buffer, written
+
+    def test_flushes_when_a_batch_fills(self):
+        buffer, written = self.buffer()
+        buffer.put(1)
+        buffer.put(2)
+        self.assertEqual(written, [])
+        buffer.put(3)
+        self.assertEqual(written, [1, 2, 3])
+
+    def test_flushes_on_a_timer(self):
+        buffer, written = self.buffer(flush_interval=0.01)
+        buffer.put(1)
+        for _ in range(200):
+            if written:
+                break
+            time.sleep(0.01)
+        self.assertEqual(written, [1])
+
+    def test_refuses_items_when_full(self):
+        buffer, written = self.buffer(batch_size=10, max_pending=2)
+        self.assertTrue(buffer.put(1))
+        self.assertTrue(buffer.put(2))
+        self.assertFalse(buffer.put(3))
+
+    def test_failed_batches_are_retried_in_order(self):
+        written = []
+        failures = [RuntimeError("database is down")]
+
+        def write(batch):
+            if failures:
+                raise failures.pop()
+            written.extend(batch)
+
+        buffer, _ = self.buffer(write, batch_size=10)
+        buffer.put(1)
+        with self.assertLogs('portfolio.ingest', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        buffer.put(2)
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(written, [1, 2])
+
+    def test_close_writes_what_is_left(self):
+        buffer, written = self.buffer()
+        buffer.put(1)
+        buffer.close()
+        self.assertEqual(written, [1])
+        self.assertFalse(buffer.thread.is_alive())
+
+
+@override_settings(THROTTLES={'contact': {'burst': 2, 'per_minute': 6}})
+@mock.patch.object(ingest.contacts, 'batch_size', 1)
+class SubmitContactTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def post(self, email='a@example.com', **extra):
+        return self.client.post(reverse('api-submit-contact'), {'name': 'A', 'email': email, 'message': 'Hi'}, **extra)
+
+    def test_valid_submission_is_written(self):
+        self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(ContactSubmission.objects.get().email, 'a@example.com')
+
+    def test_invalid_submission_is_refused_before_queueing(self):
+        self.assertEqual(self.post(email='not an address').status_code, 400)
+        self.assertFalse(ContactSubmission.objects.exists())
+
+    def test_full_queue_is_a_503(self):
+        with mock.patch.object(ingest.contacts, 'put', return_value=False):
+            response = self.post()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_each_client_gets_a_bucket(self):
+        self.assertEqual([self.post().status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(self.post()['Retry-After'], '10')
+        # Behind the tunnel (a trusted proxy), each visitor has their own bucket
+        self.assertEqual(self.post(HTTP_CF_CONNECTING_IP='198.51.100.7').status_code, 200)
+        # Anyone else's forwarding headers are ignored
+        self.assertEqual(self.post(REMOTE_ADDR='203.0.113.5', HTTP_CF_CONNECTING_IP='198.51.100.8').status_code, 200)
+        self.assertEqual(self.post(REMOTE_ADDR='203.0.113.5', HTTP_CF_CONNECTING_IP='198.51.100.9').status_code, 200)
+        self.assertEqual(self.post(REMOTE_ADDR='203.0.113.5', HTTP_CF_CONNECTING_IP='198.51.100.10').status_code, 429)
+
+    def test_client_ip_from_forwarded_for(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.7, 10.0.0.2, 127.0.0.1')
+        with override_settings(TRUSTED_PROXIES=['127.0.0.1', '10.0.0.0/8']):
+            self.assertEqual(throttle.client_ip(request), '198.51.100.7')
+        self.assertEqual(throttle.client_ip(request), '10.0.0.2')
+
+    @override_settings(THROTTLES={'contact': {'burst': 0, 'per_minute': 6}})
+    def test_burst_of_zero_turns_the_limit_off(self):
+        self.assertEqual({self.post().status_code for _ in range(5)}, {200})
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class ExportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(FRAGMENT_EXPORT_ROOT=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.log = LogEntry.objects.create(title="Boot", log_date="JAN 2026", status="done", entry_type="ops")
+        self.section = LogSection.objects.create(log_entry=self.log, title="Intro", content="Hello")
+        self.other = LogEntry.objects.create(title="Other", log_date="JAN 2026", status="done", entry_type="ops")
+
+    def test_rebuild_renders_only_what_changed(self):
+        first = export.build()
+        self.assertEqual(first['unchanged'], 0)
+        routes = export.manifest()['routes']
+        detail = reverse('api-log-detail', kwargs={'pk': self.log.pk})
+        self.assertRegex(routes[detail]['file'], rf'^log/{self.log.pk}\.[0-9a-f]{{12}}\.html$')
+        self.assertTrue((export.root() / (routes[detail]['file'] + '.gz')).exists())
+        self.assertEqual(export.build()['rendered'], 0)
+
+        self.section.content = "Changed"
+        self.section.save()
+        self.assertNotIn(detail, export.exported_urls())  # Back to Django until the next export
+        counts = export.build()
+        self.assertEqual((counts['rendered'], counts['removed']), (2, 2))  # The log and the logs home
+        self.assertIn("Changed", (export.root() / export.manifest()['routes'][detail]['file']).read_text())
+
+        other = export.manifest()['routes'][reverse('api-log-detail', kwargs={'pk': self.other.pk})]['file']
+        self.other.delete()
+        export.build()
+        self.assertFalse((export.root() / other).exists())
+
+    def test_exported_files_are_served_immutable(self):
+        export.build()
+        url = export.exported_urls()[reverse('api-dashboard')]
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(url.replace('.html', 'x.html')).status_code, 404)
+
+    def test_shell_lists_the_fixed_routes_and_the_log_index(self):
+        export.build()
+        urls = export.exported_urls()
+        html = self.client.get(reverse('index')).content.decode()
+        self.assertIn('id="exported-fragments"', html)
+        self.assertIn(urls[reverse('api-logs')], html)
+        detail = reverse('api-log-detail', kwargs={'pk': self.log.pk})
+        self.assertNotIn(urls[detail], html)
+
+        index = export.shell_fragments()['logs']
+        self.assertIn(index, html)
+        response = self.client.get(index)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(json.loads(b''.join(response.streaming_content))[detail], urls[detail])
+
+        self.section.content = "Changed"
+        self.section.save()  # A new log index, without the changed log
+        self.assertNotEqual(export.shell_fragments()['logs'], index)
+        self.assertEqual(export.build()['rendered'], 2)
+        self.assertEqual(len(list(export.root().glob('logs.*.json'))), 1)
+
+    def test_manifest_is_read_again_only_when_it_changes(self):
+        export.build()
+        export.manifest()
+        with mock.patch.object(export, 'open', create=True, side_effect=AssertionError("read the manifest")):
+            self.client.get(reverse('index'))
+        export.log_changed(self.log.pk)
+        self.assertNotIn(reverse('api-log-detail', kwargs={'pk': self.log.pk}), export.exported_urls())
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        for index in range(5):
+            log = LogEntry.objects.create(title=f"Log {index}", log_date="JAN 2026", status="done", entry_type="ops", is_pinned=index == 0)
+            LogSection.objects.create(log_entry=log, title="Intro", content=f"Findings, \"quoted\"\nline {index}")
+            LogSection.objects.create(log_entry=log, title="Outro", content="<b>Done</b>")
+        LogEntry.objects.filter(title="Log 0").update(created_at=timezone.now() - timedelta(days=30))
+
+    def records(self):
+        return [json.loads(line) for line in ''.join(transfer.export_logs()).splitlines()]
+
+    def test_logs_round_trip(self):
+        for format in transfer.FORMATS:
+            with self.subTest(format=format):
+                before = self.records()
+                text = ''.join(transfer.export_logs(format=format, chunk_size=2))
+                LogEntry.objects.all().delete()
+                self.assertEqual(transfer.import_logs(transfer.read(io.StringIO(text, newline=''), format), chunk_size=2), 5)
+                self.assertEqual(self.records(), before)
+        log = LogEntry.objects.get(title="Log 3")
+        self.assertEqual((log.section_count, log.is_pinned), (2, False))
+        self.assertEqual([hit.pk for hit in search.search("findings", include_content=True)].count(log.pk), 1)
+
+    def test_contacts_round_trip(self):
+        seed_contacts(3)
+        text = ''.join(transfer.export_contacts(format='csv'))
+        self.assertEqual(text.splitlines()[0], 'name,email,message,submitted_at')
+        before = list(ContactSubmission.objects.values_list('name', 'email', 'message', 'submitted_at'))
+        ContactSubmission.objects.all().delete()
+        transfer.import_contacts(transfer.read(io.StringIO(text, newline=''), 'csv'))
+        self.assertEqual(list(ContactSubmission.objects.values_list('name', 'email', 'message', 'submitted_at')), before)
+
+    def test_export_reads_a_chunk_at_a_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(transfer.export_logs(chunk_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(queries), 4)  # The logs, and the sections of each chunk
+
+    def test_invalid_record_stops_after_the_committed_chunks(self):
+        lines = [
+            json.dumps({'title': "Kept", 'log_date': "JAN", 'status': "ok", 'entry_type': "ops"}),
+            json.dumps({'title': "x" * 300, 'log_date': "JAN", 'status': "ok", 'entry_type': "ops"}),
+        ]
+        with self.assertRaisesMessage(transfer.InvalidRecord, "Line 2: ") as caught:
+            transfer.import_logs(transfer.read(lines, 'jsonl'), chunk_size=1)
+        self.assertEqual(caught.exception.imported, 1)
+        self.assertTrue(LogEntry.objects.filter(title="Kept").exists())
+
+    def test_admin_export_and_import(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        changelist = reverse('admin:portfolio_logentry_changelist')
+        self.assertContains(self.client.get(changelist), reverse('admin:portfolio_logentry_import'))
+        response = self.client.post(changelist, {
+            'action': 'export_csv', '_selected_action': LogEntry.objects.values_list('pk', flat=True),
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        upload = ContentFile(b''.join(response.streaming_content), name='logs.csv')
+
+        response = self.client.post(reverse('admin:portfolio_logentry_import'), {'file': upload}, follow=True)
+        self.assertEqual(LogEntry.objects.count(), 10)
+        self.assertContains(response, "Imported 5 logs")
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rendered fragments would hide the queries
+        for index in range(30):
+            log = LogEntry.objects.create(title=f"Log {index}", log_date="JAN 2026", status="done", entry_type="ops", is_pinned=index % 10 == 0)
+            LogSection.objects.create(log_entry=log, title="Intro", content=f"Findings {index}")
+        seed_contacts(30)
+        self.log = log
+
+    def assertNoTableScans(self, request):
+        found = queryplans.scans(request)
+        self.assertFalse(found, "Queries reading a whole table:\n" + json.dumps(found, indent=2))
+
+    def test_hot_log_views_use_indexes(self):
+        all_logs = reverse('api-all-logs')
+        cursor = self.client.get(all_logs)['X-Next-Cursor']
+        paths = [
+            reverse('api-logs'),
+            reverse('api-log-detail', kwargs={'pk': self.log.pk}),
+            all_logs,
+            f'{all_logs}?cursor={cursor}',
+            f'{all_logs}?q=findings',
+            *(f'{all_logs}?sort={sort}' for sort in pagination.SORTS),
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertNoTableScans(lambda: self.assertEqual(self.client.get(path).status_code, 200))
+
+    def test_contact_admin_date_filter_uses_an_index(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        now = timezone.now()
+        dates = urlencode({'submitted_at__gte': now - timedelta(days=7), 'submitted_at__lt': now + timedelta(days=1)})
+        path = f"{reverse('admin:portfolio_contactsubmission_changelist')}?{dates}"
+        self.assertNoTableScans(lambda: self.assertEqual(self.client.get(path).status_code, 200))
+
+    def test_unindexed_filter_is_reported(self):
+        found = queryplans.scans(lambda: list(LogEntry.objects.filter(status="done")))
+        self.assertEqual([queryplans.table_scans(plan) for plan in found.values()], [['portfolio_logentry']])
+        # Read in an index's order, but to the end: still the whole table
+        self.assertTrue(queryplans.scans(lambda: list(LogEntry.objects.filter(status="done").order_by('title'))))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class RenderedSectionTests(TestCase):
+    def setUp(self):
+        self.log = LogEntry.objects.create(title="Incident", log_date="MAY 2025", status="CLOSED", entry_type="POSTMORTEM")
+        self.section = LogSection.objects.create(
+            log_entry=self.log, title="Timeline",
+            content='<b>Outage</b>\n<script>alert(1)</script><a href="javascript:alert(1)" onclick="x()">run</a>',
+        )
+
+    def test_saving_stores_sanitized_html(self):
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.renderer_version, rendering.VERSION)
+        self.assertEqual(self.section.rendered_html, '<b>Outage</b><br><a rel="nofollow noopener">run</a>')
+        self.section.content = "Fixed\nfor good"
+        self.section.save(update_fields=['content'])
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.rendered_html, "Fixed<br>for good")
+
+    def test_detail_serves_the_stored_html(self):
+        LogSection.objects.filter(pk=self.section.pk).update(rendered_html="<p>stored</p>")
+        logcache.invalidate_all()
+        response = self.client.get(reverse('api-log-detail', kwargs={'pk': self.log.pk}))
+        self.assertContains(response, "<p>stored</p>")
+        self.assertNotContains(response, "alert(1)")
+
+    def test_rerender_updates_stale_sections(self):
+        path = reverse('api-log-detail', kwargs={'pk': self.log.pk})
+        LogSection.objects.filter(pk=self.section.pk).update(rendered_html="old", renderer_version=0)
+        etag = self.client.get(path)['ETag']
+        call_command('rerender_sections', stdout=io.StringIO())
+        self.section.refresh_from_db()
+        self.assertEqual(self.section.renderer_version, rendering.VERSION)
+        self.assertIn("<b>Outage</b>", self.section.rendered_html)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<b>Outage</b>")
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE)
+class StreamingAllLogsTests(TestCase):
+    def setUp(self):
+        self.logs = [
+            LogEntry.objects.create(title=f"Entry {i:02}", log_date="JAN 2026", status="done", entry_type="ops")
+            for i in range(25)
+        ]
+        for log in self.logs[:3]:
+            LogSection.objects.create(log_entry=log, title="Body", content="Latency budget exceeded")
+        self.url = reverse('api-all-logs')
+
+    def pieces(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().split(views.STREAM_SEPARATOR)
+
+    def ids(self, html):
+        return [int(pk) for pk in re.findall(r'class="log-entry" data-log-id="(\d+)"', html)]
+
+    def test_streams_header_then_every_log_in_chunks(self):
+        with mock.patch.object(views.AllLogsView, 'stream_chunk_size', 10):
+            pieces = self.pieces(self.client.get(self.url, {'stream': '1', 'sort': '-title'}))
+        header, *chunks, tail = pieces
+        self.assertIn('class="log-search-form"', header)
+        self.assertIn('data-streaming="true"', header)
+        self.assertEqual(self.ids(header), [])
+        self.assertEqual([len(self.ids(chunk)) for chunk in chunks], [10, 10, 5])
+        self.assertEqual(self.ids(''.join(chunks)), [log.pk for log in reversed(self.logs)])
+        self.assertEqual(tail.strip(), '</div>')
+        self.assertNotIn('log-page-sentinel', ''.join(pieces))
+
+    def test_streamed_search_keeps_rank_order_and_snippets(self):
+        response = self.client.get(self.url, {'stream': '1', 'q': 'latency', 'search_content': 'on'})
+        html = ''.join(self.pieces(response))
+        self.assertEqual(sorted(self.ids(html)), [log.pk for log in self.logs[:3]])
+        self.assertIn('<mark>', html)
+
+        html = ''.join(self.pieces(self.client.get(self.url, {'stream': '1', 'q': 'nothing matches'})))
+        self.assertIn('NO LOGS FOUND', html)
+
+    def test_streams_every_match_past_the_result_limit(self):
+        logs = LogEntry.objects.bulk_create([
+            LogEntry(title=f"Probe {index}", log_date="JAN 2026", status="done", entry_type="ops")
+            for index in range(search.RESULT_LIMIT + 30)
+        ])
+        LogSection.objects.bulk_create([LogSection(log_entry=log, title="S", content="probe body") for log in logs])
+        search.rebuild()
+        for sort in ('relevance', '-created_at', 'title'):
+            with self.subTest(sort=sort):
+                params = {'stream': '1', 'q': 'probe', 'search_content': 'on', 'sort': sort}
+                html = ''.join(self.pieces(self.client.get(self.url, params)))
+                self.assertEqual(sorted(self.ids(html)), [log.pk for log in logs])
+                self.assertEqual(html.count('<mark>probe</mark> body'), len(logs))
+
+    def test_show_all_only_when_there_are_more_pages(self):
+        self.assertContains(self.client.get(self.url), 'id="show-all-logs-btn"')
+        self.assertNotContains(self.client.get(self.url, {'q': 'latency'}), 'id="show-all-logs-btn"')
+
+    async def test_async_view_streams_the_same_body(self):
+        url = f'{self.url}?stream=1&sort=title'
+        expected = await sync_to_async(views.AllLogsView.as_view())(RequestFactory().get(url))
+        expected = await sync_to_async(b''.join)(expected.streaming_content)
+        response = await views.AsyncAllLogsView.as_view()(AsyncRequestFactory().get(url))
+        self.assertTrue(response.is_async)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+
+
+@mock.patch.object(analytics.views, 'start', lambda: None)  # No timer thread: the tests flush themselves
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        analytics.views.take()
+        analytics.fragment_for.cache_clear()
+        analytics.known_logs.clear()
+        self.log = LogEntry.objects.create(title="Incident", log_date="MAY 2025", status="CLOSED", entry_type="POSTMORTEM")
+
+    def view(self, path, ip='198.51.100.1'):
+        return self.client.post(reverse('api-record-view'), {'path': path}, REMOTE_ADDR=ip)
+
+    def test_sketches_estimate_and_merge_uniques(self):
+        first, second = analytics.HyperLogLog(), analytics.HyperLogLog()
+        for i in range(3000):
+            first.add(analytics.HyperLogLog.position(f"visitor {i}"))
+            second.add(analytics.HyperLogLog.position(f"visitor {i + 2000}"))
+        self.assertAlmostEqual(first.count(), 3000, delta=150)
+        first.update(second)
+        self.assertAlmostEqual(first.count(), 5000, delta=250)  # The 1000 in both count once
+        self.assertEqual(analytics.HyperLogLog().count(), 0)
+
+    def test_views_are_buffered_then_added_to_the_hourly_rollups(self):
+        detail = reverse('api-log-detail', kwargs={'pk': self.log.pk})
+        for ip in ['198.51.100.1', '198.51.100.2', '198.51.100.1']:
+            self.assertEqual(self.view(detail, ip).status_code, 204)
+        self.view(reverse('api-dashboard'))
+        self.view(reverse('api-service-detail', kwargs={'service_id': 'web_dev'}) + '?from=services')
+        self.assertFalse(ModuleViewRollup.objects.exists())
+
+        with self.assertNumQueries(5):  # In a savepoint: insert the new rows, lock them, update them
+            analytics.views.flush()
+        rows = {(row.module, row.object_id): row for row in ModuleViewRollup.objects.all()}
+        self.assertEqual(set(rows), {('log-detail', str(self.log.pk)), ('dashboard', ''), ('service-detail', 'web_dev')})
+        row = rows['log-detail', str(self.log.pk)]
+        self.assertEqual((row.views, analytics.HyperLogLog(row.visitors).count()), (3, 2))
+        self.assertEqual(row.hour, timezone.now().replace(minute=0, second=0, microsecond=0))
+
+        # Another worker's counts for the same hour add to the row, and its visitors merge in
+        other = analytics.ViewBuffer(analytics.write_rollups, batch_size=100, flush_interval=60, max_pending=100)
+        self.addCleanup(other.close)
+        other.put((row.hour, 'log-detail', str(self.log.pk)), analytics.visitor(RequestFactory().get('/', REMOTE_ADDR='198.51.100.3')))
+        other.put((row.hour, 'log-detail', str(self.log.pk)), analytics.visitor(RequestFactory().get('/', REMOTE_ADDR='198.51.100.1')))
+        other.flush()
+        row.refresh_from_db()
+        self.assertEqual((row.views, analytics.HyperLogLog(row.visitors).count()), (5, 3))
+
+    def test_logs_created_after_a_refused_view_are_counted(self):
+        detail = reverse('api-log-detail', kwargs={'pk': self.log.pk + 1})
+        self.assertEqual(self.view(detail).status_code, 400)
+        LogEntry.objects.create(pk=self.log.pk + 1, title="Follow-up", log_date="MAY 2025", status="OPEN", entry_type="OPS")
+        self.assertEqual(self.view(detail).status_code, 204)
+        with self.assertNumQueries(0):  # Known to exist from now on
+            self.assertIsNotNone(analytics.module_for(detail))
+
+    def test_only_existing_fragments_are_counted(self):
+        for path in [
+            '/admin/',
+            reverse('api-content-batch'),
+            reverse('api-log-detail', kwargs={'pk': self.log.pk + 1}),
+            reverse('api-service-detail', kwargs={'service_id': 'nope'}),
+        ]:
+            with self.subTest(path=path):
+                self.assertEqual(self.view(path).status_code, 400)
+        self.assertEqual(analytics.views.take(), {})
+
+    def test_report_reads_only_the_rollups(self):
+        self.view(reverse('api-logs'))
+        self.view(reverse('api-logs'), ip='198.51.100.2')
+        analytics.views.flush()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:portfolio_moduleviewrollup_report'), {'days': '1'})
+        self.assertContains(response, "2 views by about 2 unique visitors")
+        self.assertContains(response, "<td>logs</td>")
+        tables = {table for query in queries for table in re.findall(r'"(portfolio_\w+)"', query['sql'])}
+        # The admin's app list asks SiteStatsAdmin whether a row may be added
+        self.assertEqual(tables - {'portfolio_sitestats'}, {'portfolio_moduleviewrollup'})
+
+
+@override_settings(SHARED_CACHE=True)  # One process: it is shared
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counters.stats_cache.local.clear()
+        counters.stats_cache.reset_stats()
+        self.tiered = tiered.TieredCache('test', timeout=60, local_size=2)
+        self.addCleanup(tiered.caches.pop, 'test')
+
+    def test_stats_served_from_the_local_tier_and_written_through_on_claim(self):
+        SiteStats.objects.create(level=1, trophies=0, coins=100)
+        url = reverse('api-site-stats')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['coins'], 100)
+
+        self.client.post(reverse('api-claim-reward'), data=json.dumps({'reward_type': 'coin'}), content_type='application/json')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['coins'], 125)
+        counters.stats_cache.local.clear()
+        with self.assertNumQueries(0):  # From the shared tier
+            self.assertEqual(self.client.get(url).json()['coins'], 125)
+
+        stats = counters.stats_cache.stats()
+        self.assertEqual((stats['local']['hits'], stats['local']['misses']), (2, 2))
+        self.assertEqual((stats['shared']['hits'], stats['shared']['misses']), (1, 1))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_per_worker_shared_tier_keeps_values_for_the_local_ttl(self):
+        SiteStats.objects.create(level=1, trophies=0, coins=100)
+        url = reverse('api-site-stats')
+        self.client.get(url)
+        # Another worker's claim: its write-through never reaches this process
+        SiteStats.objects.update(coins=150)
+        counters.stats_cache.local.clear()
+        entry = cache.get(counters.stats_cache.key(counters.today().isoformat()))
+        self.assertLessEqual(entry[2], time.time() + counters.stats_cache.local.ttl)
+        with mock.patch.object(tiered.time, 'time', return_value=entry[2]):
+            self.assertEqual(self.client.get(url).json()['coins'], 150)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.tiered.get('key', compute))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_value_served_while_another_process_refreshes(self):
+        cache.set(self.tiered.key('key'), ('stale', 1.0, time.time() + 0.5), 60)  # Refresh due
+        cache.add(f"{self.tiered.key('key')}:lock", 1, 5)  # Held by another process
+        with mock.patch.object(tiered.random, 'random', return_value=0.9):
+            self.assertEqual(self.tiered.get('key', lambda: self.fail("computed")), 'stale')
+
+        cache.delete(f"{self.tiered.key('key')}:lock")
+        with mock.patch.object(tiered.random, 'random', return_value=0.9):
+            self.assertEqual(self.tiered.get('key', lambda: 'fresh'), 'fresh')
+        self.assertFalse(cache.get(f"{self.tiered.key('key')}:lock"))
+
+    def test_early_refresh_grows_closer_to_expiry(self):
+        now = time.time()
+        with mock.patch.object(tiered.random, 'random', return_value=0.5):
+            self.assertFalse(self.tiered.refresh_due(('value', 0.1, now + 30)))
+            self.assertTrue(self.tiered.refresh_due(('value', 0.1, now + 0.05)))
+            self.assertTrue(self.tiered.refresh_due(('value', 60.0, now + 30)))  # Slow to compute
+
+    def test_local_tier_is_bounded(self):
+        for key in 'abc':
+            self.tiered.get(key, lambda: key)
+        self.assertEqual(list(self.tiered.local.entries), ['b', 'c'])
+        self.tiered.invalidate('c')
+        self.assertIsNone(cache.get(self.tiered.key('c')))
+        self.assertEqual(self.tiered.get('a', lambda: 'shared'), 'a')  # Still in the shared tier
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_hit_ratios_in_metrics(self):
+        self.tiered.get('key', lambda: 'value')
+        self.tiered.get('key', lambda: 'value')
+        text = self.client.get(reverse('api-metrics'), headers={'Authorization': 'Bearer secret'}).content.decode()
+        self.assertIn('portcyber_cache_lookups_total{cache="test",tier="local",result="hit"} 1', text)
+        self.assertIn('portcyber_cache_lookups_total{cache="test",tier="shared",result="miss"} 1', text)
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGE, FRAGMENT_CACHE=True)
+class WarmupTests(TestCase):
+    def test_warm_up_compiles_templates_and_renders_static_fragments(self):
+        fragments.clear()
+        self.addCleanup(fragments.clear)
+        report = warmup.run()
+        self.assertIn('modules/_log_detail_fragment.html', warmup.template_names())
+        self.assertEqual(report['templates'][0], len(warmup.template_names()))
+        self.assertEqual(report['fragments'][0], len(export.STATIC_ROUTES) + 1 + len(views.SERVICE_DETAILS))
+        with self.assertTemplateNotUsed('modules/_services_fragment.html'):
+            self.assertEqual(self.client.get(reverse('api-services')).status_code, 200)
+
+    def gunicorn_config(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(str(benchmark.CONFIG))
+
+    def test_gunicorn_config_sizes_workers_by_class(self):
+        config = self.gunicorn_config(WEB_CONCURRENCY='', GUNICORN_WORKER_CLASS='')
+        self.assertEqual((config['worker_class'], config['workers'], config['threads']), ('sync', 2 * config['cpus'] + 1, 1))
+        self.assertTrue(config['preload_app'])
+        self.assertEqual(config['max_requests_jitter'], config['max_requests'] // 5)
+
+        config = self.gunicorn_config(WEB_CONCURRENCY='', GUNICORN_WORKER_CLASS='uvicorn')
+        self.assertEqual(config['wsgi_app'], 'portcyber_project.asgi:application')
+        self.assertEqual(config['workers'], config['cpus'])
+        self.assertEqual(self.gunicorn_config(WEB_CONCURRENCY='7', GUNICORN_WORKER_CLASS='gthread')['workers'], 7)
+        with self.assertRaises(ValueError):
+            self.gunicorn_config(GUNICORN_WORKER_CLASS='eventlet')
+
+    def test_live_stats_default_to_uvicorn_workers(self):
+        config = self.gunicorn_config(LIVE_STATS='True', GUNICORN_WORKER_CLASS='')
+        self.assertEqual((config['worker_class'], config['wsgi_app']), ('uvicorn.workers.UvicornWorker', 'portcyber_project.asgi:application'))
+        self.assertEqual(self.gunicorn_config(LIVE_STATS='True', GUNICORN_WORKER_CLASS='gthread')['worker_class'], 'gthread')
+        self.assertEqual(self.gunicorn_config(LIVE_STATS='', GUNICORN_WORKER_CLASS='')['worker_class'], 'sync')
+
+    def test_cpu_limit_follows_the_cgroup_quota(self):
+        cpu_limit = self.gunicorn_config()['cpu_limit']
+        with mock.patch('os.sched_getaffinity', return_value=set(range(8))):
+            with mock.patch('pathlib.Path.read_text', return_value='150000 100000\n'):
+                self.assertEqual(cpu_limit(), 2)
+            with mock.patch('pathlib.Path.read_text', return_value='max 100000\n'):
+                self.assertEqual(cpu_limit(), 8)
@@ -0,0 +1,78 @@
+"""Token buckets per client IP, for views bots like to hammer.
+
+Each client gets settings.THROTTLES[scope]['burst'] requests at once, and the
+bucket refills at 'per_minute' tokens a minute; an empty bucket is a 429 with
+Retry-After. A burst of 0 turns the scope off.
+
+The buckets live in the cache, so point CACHES at a shared backend to limit a
+client across workers (as for portfolio/logcache.py). Taking a token is a get
+and a set, so a client racing itself across workers can get a request or two
+more than its burst, which is fine for back-pressure.
+
+Behind Cloudflare the tunnel connects from a trusted proxy address (the same
+proxy whose X-Forwarded-Proto settings.SECURE_PROXY_SSL_HEADER trusts), and the
+client is in its CF-Connecting-IP or X-Forwarded-For header. Those headers are
+only believed from TRUSTED_PROXIES, since anyone can send them.
+"""
+import ipaddress
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+def trusted(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(proxy, strict=False) for proxy in settings.TRUSTED_PROXIES)
+
+
+def client_ip(request):
+    remote = request.META.get('REMOTE_ADDR', '')
+    if not trusted(remote):
+        return remote
+    cloudflare = request.META.get('HTTP_CF_CONNECTING_IP', '').strip()
+    if cloudflare:
+        return cloudflare
+    # Each proxy appends the address it got the request from; the nearest
+    # hop that isn't one of ours is the client
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if not trusted(hop):
+            return hop
+    return remote
+
+
+def take(scope, client, burst, per_minute):
+    """Take a token: 0 if there was one, else seconds until there will be"""
+    key = f'throttle:{scope}:{client}'
+    rate = per_minute / 60
+    now = time.time()
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / rate))  # Full again by then
+    return 0
+
+
+def per_client(scope):
+    """View decorator: 429 once the client's bucket for scope is empty"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limit = settings.THROTTLES[scope]
+            if limit['burst']:
+                wait = take(scope, client_ip(request), limit['burst'], limit['per_minute'])
+                if wait:
+                    response = JsonResponse({'status': 'error', 'message': 'Too many requests'}, status=429)
+                    response['Retry-After'] = math.ceil(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,228 @@
+"""Two cache tiers in front of values that are costly to work out.
+
+TieredCache.get(key, compute) looks in:
+
+1. this process's LocalTier, a bounded LRU whose entries live at most
+   local_ttl seconds, so a hot key costs no I/O at all;
+2. the shared tier, Django's cache (CACHES in settings.py: Redis shared by
+   every worker, or local memory or files standing in for it), where
+   entries live timeout seconds. When it isn't shared (settings.SHARED_CACHE
+   off: locmem://, one per worker) they live no longer than local_ttl
+   either, since a write or invalidation there reaches one worker only;
+
+and only calls compute() when both miss. Values must be picklable and are
+shared between callers, so treat them as read-only.
+
+Stampedes: one caller per key computes at a time. Threads of a process queue
+on a lock; processes take a lock key in the shared tier (cache.add). While
+someone else computes, a caller that has a stale value returns it, and one
+that has nothing waits up to lock_timeout for the value and computes it
+itself after that. Entries are also refreshed early (XFetch, Vattani et al.,
+"Optimal Probabilistic Cache Stampede Prevention"): the closer an entry is
+to expiring, and the longer it took to compute, the likelier a lookup is to
+recompute it ahead of time, so a hot key rarely expires under load.
+
+Writes: refresh(key, compute) recomputes a value and writes it through both
+tiers, under the same locks, so two refreshes can't store their values out
+of order. invalidate() drops it instead. Both reach this process's local tier
+only; other workers' local entries (and, without a shared cache, their
+shared-tier ones) run out within local_ttl.
+
+Each process counts its hits and misses per tier and adds them to shared
+totals every FLUSH_INTERVAL seconds; stats() and the /metrics/ exposition
+(portfolio/instrumentation.py) report them per cache and tier.
+"""
+import math
+import random
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+FLUSH_INTERVAL = 10  # seconds between adding this process's counts to the shared totals
+POLL_INTERVAL = 0.02  # seconds between looks at a lock held by another process
+TIERS = ('local', 'shared')
+
+caches = {}  # name -> TieredCache, for stats and the metrics exposition
+
+
+class LocalTier:
+    """A bounded LRU of (value, compute seconds, expiry) entries, each kept at most ttl seconds"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (entry, local expiry)
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item[0]
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = (entry, min(time.time() + self.ttl, entry[2]))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache:
+    def __init__(self, name, timeout, local_size=1024, local_ttl=1.0, beta=1.0, lock_timeout=5.0):
+        self.name = name
+        self.timeout = timeout
+        self.beta = beta  # Above 1 refreshes earlier, below 1 later
+        self.lock_timeout = lock_timeout
+        self.local = LocalTier(local_size, local_ttl)
+        self.flights = weakref.WeakValueDictionary()  # key -> lock held while computing it
+        self.flights_lock = threading.Lock()
+        self.counts = Counter()
+        self.counts_lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+        caches[name] = self
+
+    def key(self, key):
+        return f'tiered:{self.name}:{key}'
+
+    def get(self, key, compute):
+        entry = self.local.get(key)
+        if entry is not None:
+            self.count('local', 'hits')
+            return entry[0]
+        self.count('local', 'misses')
+        if time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+        entry = cache.get(self.key(key))
+        if entry is not None and not self.refresh_due(entry):
+            self.count('shared', 'hits')
+            self.local.set(key, entry)
+            return entry[0]
+        self.count('shared', 'misses')
+        return self.fill(key, compute, stale=entry)
+
+    async def aget(self, key, compute):
+        """get() for async callers: a local hit stays on the event loop, anything else goes to a thread"""
+        entry = self.local.get(key)
+        if entry is not None:
+            self.count('local', 'hits')
+            return entry[0]
+        return await sync_to_async(self.get)(key, compute)
+
+    def refresh_due(self, entry):
+        """XFetch: recompute ahead of expiry with a probability that grows as it nears"""
+        _, delta, expires = entry
+        return time.time() - delta * self.beta * math.log(1.0 - random.random()) >= expires
+
+    def fill(self, key, compute, stale):
+        flight = self.flight(key)
+        if not flight.acquire(blocking=stale is None):
+            return stale[0]  # Another thread is refreshing it
+        try:
+            entry = self.local.get(key)
+            if entry is not None:
+                return entry[0]  # Filled while we queued
+            with self.shared_lock(key, wait=stale is None) as acquired:
+                if not acquired and stale is not None:
+                    return stale[0]  # Another process is refreshing it
+                if stale is None and (entry := cache.get(self.key(key))) is not None:
+                    self.local.set(key, entry)  # Another process filled it while we waited
+                    return entry[0]
+                return self.store(key, compute)
+        finally:
+            flight.release()
+
+    def refresh(self, key, compute):
+        """Recompute key's value and write it through both tiers; returns it"""
+        with self.flight(key), self.shared_lock(key, wait=True):
+            return self.store(key, compute)
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        cache.delete(self.key(key))
+
+    def store(self, key, compute):
+        started = time.perf_counter()
+        value = compute()
+        timeout = self.shared_timeout()
+        entry = (value, time.perf_counter() - started, time.time() + timeout)
+        cache.set(self.key(key), entry, timeout)
+        self.local.set(key, entry)
+        return value
+
+    def shared_timeout(self):
+        return self.timeout if settings.SHARED_CACHE else min(self.timeout, self.local.ttl)
+
+    def flight(self, key):
+        with self.flights_lock:
+            lock = self.flights.get(key)
+            if lock is None:
+                lock = self.flights[key] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def shared_lock(self, key, wait):
+        """Hold key's lock in the shared tier; yields False if another process kept it
+        (for up to lock_timeout seconds if wait, else at all)"""
+        lock_key = f'{self.key(key)}:lock'
+        deadline = time.monotonic() + (self.lock_timeout if wait else 0)
+        while not (acquired := cache.add(lock_key, 1, self.lock_timeout)) and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+
+    def count(self, tier, outcome):
+        with self.counts_lock:
+            self.counts[tier, outcome] += 1
+
+    def flush(self):
+        """Add this process's counts to the shared totals"""
+        with self.counts_lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+        for (tier, outcome), amount in counts.items():
+            key = f'tiered:{self.name}:{tier}:{outcome}'
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                pass  # Evicted between add() and incr(); these counts are lost
+
+    def stats(self):
+        """Every process's flushed hits, misses and hit ratio, per tier"""
+        self.flush()
+        stored = cache.get_many([f'tiered:{self.name}:{tier}:{outcome}' for tier in TIERS for outcome in ('hits', 'misses')])
+        stats = {}
+        for tier in TIERS:
+            hits = stored.get(f'tiered:{self.name}:{tier}:hits', 0)
+            misses = stored.get(f'tiered:{self.name}:{tier}:misses', 0)
+            stats[tier] = {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses) if hits + misses else 0.0}
+        return stats
+
+    def reset_stats(self):
+        with self.counts_lock:
+            self.counts.clear()
+        cache.delete_many([f'tiered:{self.name}:{tier}:{outcome}' for tier in TIERS for outcome in ('hits', 'misses')])
@@ -0,0 +1,239 @@
+"""Streaming import and export of logs and contact submissions.
+
+Two formats, both one record per line, so neither direction holds more than
+a chunk of records in memory however many there are:
+
+- JSON Lines. A log is {"title", "log_date", "status", "entry_type",
+  "is_pinned", "created_at", "sections": [{"title", "content"}, ...]}, a
+  contact submission {"name", "email", "message", "submitted_at"}.
+- CSV with the same columns and a header row. A log's sections are one
+  JSON-encoded column.
+
+Exports read with .iterator(chunk_size=...), a server-side cursor on
+Postgres, prefetching the sections a chunk at a time. Imports validate a
+chunk of records and insert it with bulk_create in one transaction: a bad
+record rolls back its own chunk and stops the import, and the chunks before
+it stay. created_at and submitted_at are kept when the record has them.
+
+bulk_create skips the signals, so import_logs indexes the new logs for
+search itself and invalidates the fragment caches once at the end.
+"""
+import csv
+import json
+import logging
+import time
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models import Prefetch
+from django.urls import reverse
+
+from . import export, logcache, search
+from .models import ContactSubmission, LogEntry, LogSection, content_metrics
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+FORMATS = {'jsonl': 'application/jsonl', 'csv': 'text/csv'}
+LOG_FIELDS = ['title', 'log_date', 'status', 'entry_type', 'is_pinned', 'created_at', 'sections']
+CONTACT_FIELDS = ['name', 'email', 'message', 'submitted_at']
+
+
+class InvalidRecord(ValueError):
+    def __init__(self, line, error):
+        if isinstance(error, ValidationError):
+            error = '; '.join(error.messages)
+        super().__init__(f"Line {line}: {error}")
+        self.imported = 0  # Records committed before this one's chunk
+
+
+def format_for(name):
+    """The format a file name's extension implies (JSON Lines unless it's .csv)"""
+    return 'csv' if name.lower().endswith('.csv') else 'jsonl'
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Echo:
+    """A csv.writer target that hands back each row instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def lines(records, fields, format, chunk_size, label):
+    """Encode records as text, a chunk per yielded string"""
+    writer = csv.writer(Echo())
+    started, count = time.perf_counter(), 0
+    if format == 'csv':
+        yield writer.writerow(fields)
+    for chunk in chunks(records, chunk_size):
+        if format == 'csv':
+            rows = ([json.dumps(record[field]) if field == 'sections' else record[field] for field in fields] for record in chunk)
+            yield ''.join(writer.writerow(row) for row in rows)
+        else:
+            yield ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in chunk)
+        count += len(chunk)
+    elapsed = time.perf_counter() - started
+    logger.info("Exported %d %s in %.2fs (%.0f/s)", count, label, elapsed, count / elapsed if elapsed else 0)
+
+
+async def aiterate(iterable):
+    """A sync iterable's items from a thread, so an ASGI response streams it instead of buffering it"""
+    iterator = iter(iterable)
+    done = object()
+    while (item := await sync_to_async(next)(iterator, done)) is not done:
+        yield item
+
+
+def log_record(log):
+    return {
+        'title': log.title,
+        'log_date': log.log_date,
+        'status': log.status,
+        'entry_type': log.entry_type,
+        'is_pinned': log.is_pinned,
+        'created_at': log.created_at.isoformat(),
+        'sections': [{'title': section.title, 'content': section.content} for section in log.sections.all()],
+    }
+
+
+def export_logs(queryset=None, format='jsonl', chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = LogEntry.objects.all()
+    sections = Prefetch('sections', queryset=LogSection.objects.order_by('pk').only('log_entry_id', 'title', 'content'))
+    logs = (
+        queryset.order_by('pk')
+        .only('pk', *LOG_FIELDS[:-1])
+        .prefetch_related(sections)
+        .iterator(chunk_size=chunk_size)
+    )
+    return lines(map(log_record, logs), LOG_FIELDS, format, chunk_size, 'logs')
+
+
+def export_contacts(queryset=None, format='jsonl', chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = ContactSubmission.objects.all()
+    rows = queryset.order_by('pk').values(*CONTACT_FIELDS).iterator(chunk_size=chunk_size)
+    records = ({**row, 'submitted_at': row['submitted_at'].isoformat()} for row in rows)
+    return lines(records, CONTACT_FIELDS, format, chunk_size, 'contact submissions')
+
+
+def read(stream, format):
+    """(line number, record) for each record in a text stream"""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError as error:
+                raise InvalidRecord(number, error) from error
+
+
+def instance(model, record, fields, exclude=()):
+    """An unsaved, validated model instance from a record's fields (blank ones get their defaults)"""
+    obj = model(**{field: record[field] for field in fields if record.get(field) not in (None, '')})
+    obj.clean_fields(exclude=exclude)  # Also converts CSV strings to Python values
+    return obj
+
+
+def build_log(number, record):
+    """(log, its sections) from a record"""
+    try:
+        sections = record.get('sections') or []
+        if isinstance(sections, str):
+            sections = json.loads(sections)
+        sections = [instance(LogSection, section, ['title', 'content'], exclude=['log_entry']) for section in sections]
+        for section in sections:
+            section.render()  # bulk_create doesn't call save()
+        log = instance(LogEntry, record, LOG_FIELDS[:-1], exclude=['content_length', 'section_count', 'excerpt'])
+    except (ValidationError, ValueError, TypeError, AttributeError) as error:
+        raise InvalidRecord(number, error) from error
+    for field, value in content_metrics(section.content for section in sections).items():
+        setattr(log, field, value)
+    return log, sections
+
+
+def build_contact(number, record):
+    try:
+        return instance(ContactSubmission, record, CONTACT_FIELDS)
+    except (ValidationError, ValueError, TypeError, AttributeError) as error:
+        raise InvalidRecord(number, error) from error
+
+
+def create(model, objs, timestamp):
+    """bulk_create, then put back the timestamps it overwrote with now"""
+    given = [getattr(obj, timestamp) for obj in objs]
+    created = model.objects.bulk_create(objs)
+    field = model._meta.get_field(timestamp)
+    connection = connections[router.db_for_write(model)]
+    params = []
+    for obj, value in zip(created, given):
+        if value is not None:
+            setattr(obj, timestamp, value)
+            params.append((field.get_db_prep_save(value, connection), obj.pk))
+    if params:
+        # One statement run per row; bulk_update's CASE WHEN costs more than the insert
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {quote(model._meta.db_table)} SET {quote(field.column)} = %s WHERE {quote(model._meta.pk.column)} = %s",
+                params,
+            )
+    return created
+
+
+def import_logs(records, chunk_size=CHUNK_SIZE):
+    """Insert (line number, record) pairs a chunk per transaction; returns the number of logs"""
+    count = 0
+    try:
+        for chunk in chunks(records, chunk_size):
+            built = [build_log(number, record) for number, record in chunk]
+            with transaction.atomic():
+                logs = create(LogEntry, [log for log, _ in built], 'created_at')
+                for log, (_, sections) in zip(logs, built):
+                    for section in sections:
+                        section.log_entry = log
+                LogSection.objects.bulk_create([section for _, sections in built for section in sections])
+                search.index_logs((log, [section.content for section in sections]) for log, (_, sections) in zip(logs, built))
+            count += len(logs)
+    except InvalidRecord as error:
+        error.imported = count
+        raise
+    finally:
+        if count:
+            logcache.invalidate_all()
+            export.forget([reverse('api-logs')])  # The new logs may belong on the logs home
+    return count
+
+
+def import_contacts(records, chunk_size=CHUNK_SIZE):
+    """Insert (line number, record) pairs a chunk per transaction; returns the number of submissions"""
+    count = 0
+    try:
+        for chunk in chunks(records, chunk_size):
+            submissions = [build_contact(number, record) for number, record in chunk]
+            with transaction.atomic():
+                create(ContactSubmission, submissions, 'submitted_at')
+            count += len(submissions)
+    except InvalidRecord as error:
+        error.imported = count
+        raise
+    return count
+
+
+# What import_data/export_data and the admin can transfer: name -> (model, export, import)
+KINDS = {
+    'logs': (LogEntry, export_logs, import_logs),
+    'contacts': (ContactSubmission, export_contacts, import_contacts),
+}
@@ -1,7 +1,16 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from django.views.generic import TemplateView
 
+# Native async read views under ASGI (see views.AsyncLogsView)
+if settings.ASYNC_VIEWS:
+    LogsView, LogDetailView, AllLogsView = views.AsyncLogsView, views.AsyncLogDetailView, views.AsyncAllLogsView
+    get_site_stats = views.get_site_stats_async
+else:
+    LogsView, LogDetailView, AllLogsView = views.LogsView, views.LogDetailView, views.AllLogsView
+    get_site_stats = views.get_site_stats
+
 urlpatterns = [
     # Main routes
     path('', views.SystemShellView.as_view(), name='index'),
@@ -20,17 +29,21 @@ urlpatterns = [
     # API routes for dynamic content loading (fetched by navigation.js)
     path('api/content/dashboard/', views.DashboardView.as_view(), name='api-dashboard'),
     path('api/content/achievements/', views.AchievementsView.as_view(), name='api-achievements'),
-    path('api/content/logs/', views.LogsView.as_view(), name='api-logs'),
-    path('api/content/log/<int:pk>/', views.LogDetailView.as_view(), name='api-log-detail'),
-    path('api/content/logs/all/', views.AllLogsView.as_view(), name='api-all-logs'),
+    path('api/content/logs/', LogsView.as_view(), name='api-logs'),
+    path('api/content/log/<int:pk>/', LogDetailView.as_view(), name='api-log-detail'),
+    path('api/content/logs/all/', AllLogsView.as_view(), name='api-all-logs'),
     path('api/content/creations/', views.CreationsView.as_view(), name='api-creations'),
     path('api/content/services/', views.ServicesView.as_view(), name='api-services'),
     path('api/content/service/<str:service_id>/', views.ServiceDetailView.as_view(), name='api-service-detail'),
     path('api/content/connect/', views.ConnectView.as_view(), name='api-connect'),
     path('api/content/profile/', views.ProfileView.as_view(), name='api-profile'),
+    path('api/content/batch/', views.content_batch, name='api-content-batch'),
     
     # Contact form submission API
     path('api/submit-contact/', views.submit_contact, name='api-submit-contact'),
     path('api/claim-reward/', views.claim_reward, name='api-claim-reward'),
-    path('api/site-stats/', views.get_site_stats, name='api-site-stats'),
+    path('api/site-stats/', get_site_stats, name='api-site-stats'),
+    path('api/site-stats/stream/', views.stats_stream, name='api-site-stats-stream'),
+    path('api/metrics/', views.metrics, name='api-metrics'),
+    path('api/analytics/view/', views.record_view, name='api-record-view'),
 ]
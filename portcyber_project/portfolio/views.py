@@ -1,12 +1,23 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, aget_object_or_404, get_object_or_404
 from django.views import View
-from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
-from django.template.loader import render_to_string
-from .models import SiteStats, ContactSubmission, LogEntry
-from django.db.models import Q
-from django.utils import timezone
+from django.http import Http404, JsonResponse, HttpResponse, QueryDict, StreamingHttpResponse
+from django.urls import Resolver404, resolve, reverse
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_http_methods, condition
+from django.views.decorators.cache import cache_control
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.template.loader import get_template, render_to_string
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router
+from .models import ContactSubmission, LogEntry
+from . import analytics, conditional, counters, events, fragments, ingest, instrumentation, logcache, pagination, routers, search, throttle, transfer
+from asgiref.sync import async_to_sync, sync_to_async
+import asyncio
+import copy
 import json
+import math
 
 # Dummy data for service details (in a real app, this would be from a DB)
 SERVICE_DETAILS = {
@@ -75,104 +86,269 @@ SERVICE_DETAILS = {
 }
 
 
+# Fragments are always revalidated; a matching If-None-Match gets a 304 before
+# the view runs, so nothing is queried or rendered. See portfolio/conditional.py.
+static_fragment = [
+    cache_control(no_cache=True),
+    condition(etag_func=conditional.fragment_etag),
+]
+log_fragment = [
+    routers.replica_reads,  # The validators too, so the ETag matches the content
+    cache_control(no_cache=True),
+    condition(etag_func=conditional.logs_etag, last_modified_func=conditional.logs_last_modified),
+]
+
+
 class LandingPageView(View):
     def get(self, request):
         return render(request, 'landing.html')
 
 class SystemShellView(View):
     def get(self, request):
-        site_stats = SiteStats.load()
-
-        # Daily coin reduction logic
-        today = timezone.now().date()
-        if site_stats.last_daily_reduction_check < today:
-            days_since_last_check = (today - site_stats.last_daily_reduction_check).days
-            reduction = days_since_last_check * 5
-            site_stats.coins = max(0, site_stats.coins - reduction)
-            site_stats.last_daily_reduction_check = today
-            site_stats.save()
-
+        # Read-only: the daily coin reduction is applied lazily from the stored
+        # anchor date (see counters.fold); only claims and rollups write.
+        stats = counters.snapshot()
         context = {
-            'level': site_stats.level,
-            'trophies': site_stats.trophies,
-            'coins': site_stats.coins,
+            'level': stats['level'],
+            'trophies': stats['trophies'],
+            'coins': stats['coins'],
             'profile_name': 'Nikhil Kaswan', # This is now static
             'profile_title': 'Web Developer',
             'company': 'Legacy.ai',
         }
         return render(request, 'index.html', context)
 
+@method_decorator(static_fragment, name='get')
 class DashboardView(View):
     def get(self, request):
-        html_fragment = render_to_string('modules/_dashboard_fragment.html', request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_dashboard_fragment.html')
 
+@method_decorator(static_fragment, name='get')
 class AchievementsView(View):
     def get(self, request):
-        html_fragment = render_to_string('modules/_achievements_fragment.html', request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_achievements_fragment.html')
 
+@method_decorator(log_fragment, name='get')
 class LogsView(View):
     def get(self, request):
-        all_logs = LogEntry.objects.prefetch_related('sections').order_by('-created_at')
-        
-        pinned_logs = all_logs.filter(is_pinned=True)
-        recent_logs = all_logs.filter(is_pinned=False)[:3]
+        return HttpResponse(logcache.fetch(request, logcache.HOME, self.render))
+
+    def render(self):
+        all_logs = LogEntry.objects.order_by('-created_at')
         
+        pinned_logs = list(all_logs.filter(is_pinned=True))
+        recent_logs = list(all_logs.filter(is_pinned=False)[:3])
+        logcache.remember_home(log.pk for log in pinned_logs + recent_logs)
+        return self.render_logs(pinned_logs, recent_logs)
+
+    def render_logs(self, pinned_logs, recent_logs):
         context = {
             'recent_logs': recent_logs,
             'pinned_logs': pinned_logs,
         }
         
-        html_fragment = render_to_string('modules/_logs_fragment.html', context, request=request)
-        return HttpResponse(html_fragment)
+        return render_to_string('modules/_logs_fragment.html', context)
 
+@method_decorator(log_fragment, name='get')
 class LogDetailView(View):
     def get(self, request, pk):
+        # Rendered once per version of the log; see portfolio/logcache.py
+        return HttpResponse(logcache.fetch(request, pk, lambda: self.render(pk)))
+
+    def render(self, pk):
         log = get_object_or_404(LogEntry, pk=pk)
+        return self.render_log(log)
+
+    def render_log(self, log):
         context = {
             'log': log,
         }
-        html_fragment = render_to_string('modules/_log_detail_fragment.html', context, request=request)
-        return HttpResponse(html_fragment)
+        return render_to_string('modules/_log_detail_fragment.html', context)
+
+# Ends each piece of a streamed ALL SYSTEM LOGS page, for navigation.js to split on
+STREAM_SEPARATOR = '<!-- chunk -->\n'
 
+@method_decorator(log_fragment, name='get')
 class AllLogsView(View):
+    stream_chunk_size = 200  # Logs per streamed piece
+
     def get(self, request):
-        logs = LogEntry.objects.prefetch_related('sections').all()
+        self.parse(request)
+        if self.streaming:
+            return self.stream(self.stream_chunks())
+        # Sort, then page through with a cursor (see portfolio/pagination.py).
+        # Only a listing by relevance stops at search.RESULT_LIMIT hits; the
+        # other sorts page through every match.
+        if self.sort_by == 'relevance':
+            hits, next_cursor = pagination.offset_page(self.search(), self.cursor)
+            logs = self.in_rank_order(hits, self.queryset().in_bulk([hit.pk for hit in hits]))
+        else:
+            logs, next_cursor = pagination.keyset_page(self.queryset(), self.sort_by, self.cursor)
+            hits = self.search(limit=None, pks=[log.pk for log in logs])  # For the snippets
+        return self.respond(logs, hits, next_cursor)
+
+    def parse(self, request):
+        self.query = request.GET.get('q')
+        self.search_content = request.GET.get('search_content')
+        self.cursor = pagination.decode_cursor(request.GET.get('cursor'))
+        self.streaming = bool(request.GET.get('stream'))  # Every match in one response, sent as rendered
+        self.sort_by = request.GET.get('sort', 'relevance' if self.query else pagination.DEFAULT_SORT)
+        if self.sort_by not in pagination.SORTS and not (self.sort_by == 'relevance' and self.query):
+            self.sort_by = pagination.DEFAULT_SORT
+
+    def search(self, limit=search.RESULT_LIMIT, pks=None, using=None):
+        """Ranked hits from the full-text index (see portfolio/search.py)"""
+        if not self.query:
+            return []
+        return search.search(self.query, include_content=bool(self.search_content), limit=limit, pks=pks, using=using)
+
+    def queryset(self):
+        logs = LogEntry.objects.all()
+        if not self.query:
+            return logs
+        return logs.filter(pk__in=search.matching(self.query, include_content=bool(self.search_content)))
+
+    def in_rank_order(self, page, by_pk):
+        return [by_pk[hit.pk] for hit in page if hit.pk in by_pk]
 
-        # Search
-        query = request.GET.get('q')
-        search_content = request.GET.get('search_content')
-        if query:
-            search_fields = Q(title__icontains=query)
-            if search_content:
-                search_fields |= Q(sections__content__icontains=query)
-            logs = logs.filter(search_fields).distinct()
+    def stream_chunks(self):
+        """(logs, their hits) for every matching log in display order, stream_chunk_size logs at a time.
 
-        # Sort
-        sort_by = request.GET.get('sort', '-created_at')
-        logs = logs.order_by(sort_by)
+        The response streams after the view has returned, and with it the
+        request's database routing, so the database to read is picked now.
+        """
+        using = router.db_for_read(LogEntry)
+        return self.read_chunks(self.queryset().using(using), using)
+
+    def read_chunks(self, logs, using):
+        # Not search.RESULT_LIMIT: a stream is every match, in rank order for a search by relevance
+        if self.sort_by == 'relevance':
+            for hits in transfer.chunks(self.search(limit=None, using=using), self.stream_chunk_size):
+                yield self.in_rank_order(hits, logs.in_bulk([hit.pk for hit in hits])), hits
+            return
+        logs, _ = pagination.keyset_query(logs, self.sort_by, None)
+        # The listing shows the stored excerpt, so there are no sections to prefetch
+        for page in transfer.chunks(logs.iterator(chunk_size=self.stream_chunk_size), self.stream_chunk_size):
+            yield page, self.search(limit=None, pks=[log.pk for log in page], using=using)
+
+    def stream(self, chunks):
+        response = StreamingHttpResponse(self.stream_pieces(chunks))
+        response['X-Next-Cursor'] = ''
+        return response
+
+    def stream_pieces(self, chunks):
+        """The page header and search form first, then the entries a chunk at a time"""
+        context = {
+            'search_query': self.query or "",
+            'search_content': self.search_content,
+            'sort_by': self.sort_by,
+            'streaming': True,
+        }
+        yield render_to_string('modules/_all_logs_fragment.html', context, request=self.request) + STREAM_SEPARATOR
+        page = get_template('modules/_all_logs_page_fragment.html')
+        count = 0
+        for logs, hits in chunks:
+            self.add_snippets(logs, hits)
+            yield page.render({'logs': logs}) + STREAM_SEPARATOR
+            count += len(logs)
+        empty = render_to_string('modules/_all_logs_empty_fragment.html') if not count else ''
+        yield f'{empty}</div>\n'
+
+    def add_snippets(self, logs, hits):
+        snippets = {hit.pk: hit.snippet for hit in hits}
+        for log in logs:
+            if log.pk in snippets:
+                log.search_snippet = snippets[log.pk]
+
+    def respond(self, logs, hits, next_cursor):
+        self.add_snippets(logs, hits)
+
+        next_url = None
+        if next_cursor:
+            params = self.request.GET.copy()
+            params['cursor'] = next_cursor
+            next_url = f"{self.request.path}?{params.urlencode()}"
 
         context = {
             'logs': logs,
-            'search_query': query or "",
-            'search_content': search_content,
-            'sort_by': sort_by,
+            'search_query': self.query or "",
+            'search_content': self.search_content,
+            'sort_by': self.sort_by,
+            'next_url': next_url,
         }
-        
-        html_fragment = render_to_string('modules/_all_logs_fragment.html', context, request=request)
-        return HttpResponse(html_fragment)
 
+        # Later pages are just the next batch of entries, appended by infinite scroll
+        template = 'modules/_all_logs_page_fragment.html' if 'cursor' in self.request.GET else 'modules/_all_logs_fragment.html'
+        html_fragment = render_to_string(template, context, request=self.request)
+        response = HttpResponse(html_fragment)
+        response['X-Next-Cursor'] = next_cursor or ''
+        return response
+
+# Async versions of the read views, routed instead of the ones above when
+# running under ASGI (settings.ASYNC_VIEWS, set by asgi.py). Queries go through
+# the async ORM and the validators run in a thread (conditional.async_condition),
+# so a request waiting on the database doesn't hold up the others. Django's
+# templates render synchronously; everything they show is fetched up front,
+# so rendering on the event loop never touches the database.
+async_log_fragment = [
+    routers.replica_reads,
+    cache_control(no_cache=True),
+    conditional.async_condition(etag_func=conditional.logs_etag, last_modified_func=conditional.logs_last_modified),
+]
+
+@method_decorator(async_log_fragment, name='get')
+class AsyncLogsView(LogsView):
+    async def get(self, request):
+        return HttpResponse(await logcache.afetch(request, logcache.HOME, self.arender))
+
+    async def arender(self):
+        all_logs = LogEntry.objects.order_by('-created_at')
+        pinned_logs = [log async for log in all_logs.filter(is_pinned=True)]
+        recent_logs = [log async for log in all_logs.filter(is_pinned=False)[:3]]
+        await sync_to_async(logcache.remember_home)([log.pk for log in pinned_logs + recent_logs])
+        return self.render_logs(pinned_logs, recent_logs)
+
+@method_decorator(async_log_fragment, name='get')
+class AsyncLogDetailView(LogDetailView):
+    async def get(self, request, pk):
+        return HttpResponse(await logcache.afetch(request, pk, lambda: self.arender(pk)))
+
+    async def arender(self, pk):
+        log = await aget_object_or_404(LogEntry.objects.prefetch_related('sections'), pk=pk)
+        return self.render_log(log)
+
+@method_decorator(async_log_fragment, name='get')
+class AsyncAllLogsView(AllLogsView):
+    async def get(self, request):
+        self.parse(request)
+        if self.streaming:
+            return self.stream(self.stream_chunks())
+        # Django has no async cursor for the raw full-text queries
+        if self.sort_by == 'relevance':
+            hits, next_cursor = pagination.offset_page(await sync_to_async(self.search)(), self.cursor)
+            logs = self.in_rank_order(hits, await self.queryset().ain_bulk([hit.pk for hit in hits]))
+        else:
+            logs, next_cursor = await pagination.akeyset_page(self.queryset(), self.sort_by, self.cursor)
+            hits = await sync_to_async(self.search)(limit=None, pks=[log.pk for log in logs])
+        return self.respond(logs, hits, next_cursor)
+
+    def stream(self, chunks):
+        response = super().stream(chunks)
+        # Each piece is queried and rendered in a thread; ASGI would read a sync iterator to the end before sending any
+        response.streaming_content = transfer.aiterate(response.streaming_content)
+        return response
+
+@method_decorator(static_fragment, name='get')
 class CreationsView(View):
     def get(self, request):
-        html_fragment = render_to_string('modules/_creations_fragment.html', request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_creations_fragment.html')
 
+@method_decorator(static_fragment, name='get')
 class ServicesView(View):
     def get(self, request):
-        html_fragment = render_to_string('modules/_services_fragment.html', request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_services_fragment.html')
 
+@method_decorator(static_fragment, name='get')
 class ServiceDetailView(View):
     def get(self, request, service_id):
         service_data = SERVICE_DETAILS.get(service_id)
@@ -183,14 +359,13 @@ class ServiceDetailView(View):
             'service': service_data,
             'service_id': service_id,
         }
-        html_fragment = render_to_string('modules/_service_detail_fragment.html', context, request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_service_detail_fragment.html', context, key=service_id)
 
 class ConnectView(View):
     def get(self, request):
-        html_fragment = render_to_string('modules/_connect_fragment.html', request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_connect_fragment.html')
 
+@method_decorator(static_fragment, name='get')
 class ProfileView(View):
     def get(self, request):
         context = {
@@ -198,17 +373,114 @@ class ProfileView(View):
             'profile_title': 'Web Developer',
             'company': 'Legacy.ai',
         }
-        html_fragment = render_to_string('modules/_profile_fragment.html', context, request=request)
-        return HttpResponse(html_fragment)
+        return fragments.serve(request, 'modules/_profile_fragment.html', context)
 
+@routers.replica_reads
 @require_http_methods(["GET"])
 def get_site_stats(request):
-    site_stats = SiteStats.load()
-    return JsonResponse({
-        'level': site_stats.level,
-        'trophies': site_stats.trophies,
-        'coins': site_stats.coins
-    })
+    return site_stats_response(request, *counters.state())
+
+@routers.replica_reads
+@require_http_methods(["GET"])
+async def get_site_stats_async(request):
+    return site_stats_response(request, *await counters.astate())
+
+def site_stats_response(request, stats, version):
+    etag = conditional.stats_etag(version, counters.today())
+    response = get_conditional_response(request, etag=etag) or JsonResponse(stats)
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+BATCH_LIMIT = 8  # fragments per /api/content/batch/ request
+
+@routers.replica_reads
+@require_http_methods(["GET"])
+def content_batch(request):
+    """Several /api/content/ fragments in one round trip: ?path=<url>&path=<url>...
+
+    Each is rendered by its own view, so it carries the same ETag as when
+    fetched alone and the client can revalidate it individually later.
+    """
+    results = {path: content_fragment(request, path) for path in request.GET.getlist('path')[:BATCH_LIMIT]}
+    response = JsonResponse({'fragments': results})
+    patch_cache_control(response, no_cache=True)
+    return fragments.compress(request, response)
+
+def content_fragment(request, path):
+    url, _, query = path.partition('?')
+    if not url.startswith('/api/content/') or url == reverse('api-content-batch'):
+        return {'status': 400}
+    try:
+        match = resolve(url)
+    except Resolver404:
+        return {'status': 404}
+
+    sub_request = copy.copy(request)
+    sub_request.path = sub_request.path_info = url
+    sub_request.GET = QueryDict(query)
+    sub_request.META = {**request.META, 'PATH_INFO': url, 'QUERY_STRING': query, 'HTTP_ACCEPT_ENCODING': 'identity'}
+    for header in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE'):
+        sub_request.META.pop(header, None)
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if asyncio.iscoroutine(response):  # An async read view (under ASGI)
+            response = async_to_sync(awaited)(response)
+    except Http404:
+        return {'status': 404}
+    # A fragment with a form may have asked for a CSRF cookie
+    for key in ('CSRF_COOKIE', 'CSRF_COOKIE_NEEDS_UPDATE'):
+        if key in sub_request.META:
+            request.META[key] = sub_request.META[key]
+    if response.streaming:
+        body = async_to_sync(collected)(response.streaming_content) if response.is_async else b''.join(response.streaming_content)
+    else:
+        body = response.content
+    return {'status': response.status_code, 'etag': response.get('ETag'), 'html': body.decode()}
+
+async def awaited(coroutine):
+    return await coroutine
+
+async def collected(chunks):
+    return b''.join([chunk async for chunk in chunks])
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Request metrics in the Prometheus text format (portfolio/instrumentation.py)"""
+    if not instrumentation.authorized(request):
+        return HttpResponse(status=403)
+    response = HttpResponse(instrumentation.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    patch_cache_control(response, no_store=True)
+    return response
+
+STATS_STREAM_KEEPALIVE = 15  # seconds; keeps proxies from closing idle streams
+
+@require_http_methods(["GET"])
+async def stats_stream(request):
+    """Server-sent events: current stats, then one event per claim"""
+    if not isinstance(request, ASGIRequest):
+        # A sync worker can't hold the connection open. 204 tells EventSource
+        # to stop reconnecting, and quest.js falls back to polling.
+        return HttpResponse(status=204)
+
+    async def stream():
+        subscription = await events.get_broker().subscribe(events.STATS_CHANNEL)
+        try:
+            stats = await sync_to_async(counters.snapshot)()
+            yield f"event: stats\ndata: {json.dumps(stats)}\n\n"
+            while True:
+                message = await subscription.get(timeout=STATS_STREAM_KEEPALIVE)
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: stats\ndata: {message}\n\n"
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 from django.views.decorators.csrf import csrf_exempt
 
@@ -220,29 +492,27 @@ def claim_reward(request):
     try:
         data = json.loads(request.body)
         reward_type = data.get('reward_type')
-        site_stats = SiteStats.load()
-
-        if reward_type == 'trophy':
-            site_stats.trophies += 5
-            if site_stats.trophies >= 100:
-                site_stats.level += 1
-                site_stats.trophies -= 100
-        elif reward_type == 'coin':
-            site_stats.coins += 25
-        else:
+
+        if reward_type not in counters.REWARDS:
             return JsonResponse({'status': 'error', 'message': 'Invalid reward type'}, status=400)
-        
-        site_stats.save()
-        return JsonResponse({
-            'status': 'success',
-            'level': site_stats.level,
-            'trophies': site_stats.trophies,
-            'coins': site_stats.coins
-        })
+
+        # Atomic database-side increment; see portfolio/counters.py
+        stats = counters.claim(reward_type)
+        events.publish(events.STATS_CHANNEL, json.dumps(stats))
+        return JsonResponse({'status': 'success', **stats})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
+@csrf_exempt  # A navigator.sendBeacon() POST can't carry the CSRF header; it only counts a view
 @require_http_methods(["POST"])
+def record_view(request):
+    """Count a view of the /api/content/ fragment in 'path', reported by navigation.js (portfolio/analytics.py)"""
+    if not analytics.record(request.POST.get('path', ''), request):
+        return HttpResponse(status=400)
+    return HttpResponse(status=204)
+
+@require_http_methods(["POST"])
+@throttle.per_client('contact')
 def submit_contact(request):
     """Handle contact form submissions"""
     try:
@@ -253,7 +523,20 @@ def submit_contact(request):
         if not all([name, email, message]):
             return JsonResponse({'status': 'error', 'message': 'Missing fields'}, status=400)
         
-        ContactSubmission.objects.create(name=name, email=email, message=message)
+        submission = ContactSubmission(name=name, email=email, message=message)
+        try:
+            # Here rather than in the database: one bad row would fail its whole batch
+            submission.full_clean(exclude=['submitted_at'])
+        except ValidationError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid fields'}, status=400)
+        
+        # Written in batches; see portfolio/ingest.py
+        if not ingest.contacts.put(submission):
+            response = JsonResponse({'status': 'error', 'message': 'Busy, try again shortly'}, status=503)
+            response['Retry-After'] = math.ceil(settings.CONTACT_FLUSH_INTERVAL)
+            return response
+        # Not written yet, but read from the primary as if it were
+        routers.queued(settings.CONTACT_FLUSH_INTERVAL)
         
         return JsonResponse({'status': 'success', 'message': 'Message received'})
     except Exception as e:
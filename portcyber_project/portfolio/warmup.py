@@ -0,0 +1,113 @@
+"""The work a fresh server process otherwise does on its first requests.
+
+run() does it up front:
+
+- compiles the module fragments (modules/_*_fragment.html) and the shell
+  pages into the cached template loader (DEBUG off);
+- renders the static fragments, the ones export_fragments exports without
+  database input plus the connect form, into fragments.py's per-process
+  cache (with FRAGMENT_CACHE on), compressed;
+- compiles every URL pattern and fills the resolver's reverse lookup;
+- works out what the process keeps for its lifetime: deploy_hash() and the
+  collectstatic manifests (assets.json, the image variant map);
+- opens each database's connection (or its pool, with DATABASE_POOL_SIZE),
+  which sync workers then keep for CONN_MAX_AGE.
+
+gunicorn.conf.py runs it without databases in the master once the app is
+preloaded, so every worker forks with the templates and URLs already in
+memory, and again in each worker after boot to open that worker's
+connections. Connections are never opened before the fork: a child would
+share the parent's socket. run() closes any a step did open.
+"""
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import get_resolver, reverse
+
+from . import assets, export, images
+from .conditional import TEMPLATE_DIR, deploy_hash
+
+
+def template_names():
+    """The module fragments, then the pages the shell and landing page render"""
+    fragments = sorted(f'modules/{path.name}' for path in (TEMPLATE_DIR / 'modules').glob('_*_fragment.html'))
+    pages = sorted(path.name for path in TEMPLATE_DIR.glob('*.html'))
+    return fragments + pages
+
+
+def compile_templates():
+    names = template_names()
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def render_fragments():
+    if not settings.FRAGMENT_CACHE:
+        return 0
+    from .views import SERVICE_DETAILS, content_fragment
+
+    paths = [
+        *(reverse(name) for name in [*export.STATIC_ROUTES, 'api-connect']),
+        *(reverse('api-service-detail', kwargs={'service_id': service_id}) for service_id in SERVICE_DETAILS),
+    ]
+    request = RequestFactory().get('/')
+    for path in paths:
+        content_fragment(request, path)
+    return len(paths)
+
+
+def compile_urls(patterns=None):
+    """Compile every pattern's regex (done lazily otherwise); returns how many"""
+    if patterns is None:
+        resolver = get_resolver()
+        resolver.reverse_dict  # Populated on first access
+        patterns = resolver.url_patterns
+    count = 0
+    for pattern in patterns:
+        pattern.pattern.regex
+        count += 1
+        if hasattr(pattern, 'url_patterns'):
+            count += compile_urls(pattern.url_patterns)
+    return count
+
+
+def load_lookups():
+    """The per-process values cached on first use"""
+    lookups = [deploy_hash, assets.manifest, images.variant_map]
+    for lookup in lookups:
+        lookup()
+    return len(lookups)
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def run(databases=True):
+    """Warm this process up; returns {step: (count, milliseconds)}"""
+    steps = [
+        ('templates', compile_templates),
+        ('fragments', render_fragments),
+        ('URL patterns', compile_urls),
+        ('lookups', load_lookups),
+    ]
+    if databases:
+        steps.append(('connections', open_connections))
+
+    report = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        report[name] = (step(), (time.perf_counter() - started) * 1000)
+    if not databases:
+        connections.close_all()
+    return report
+
+
+def summary(report):
+    return ', '.join(f"{count} {name} in {ms:.0f} ms" for name, (count, ms) in report.items())